@@ -8,30 +8,133 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Security: Validate required environment variables
+# Required credentials (validated at startup by validate_settings)
 REQUIRED_ENV_VARS = ['GEMINI_API_KEY', 'MONGODB_URI']
-missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
-if missing_vars:
-    raise RuntimeError(f"Missing required environment variables: {', '.join(missing_vars)}")
-
-# Configure Gemini
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY == "your_gemini_api_key_here" or len(GEMINI_API_KEY) < 30:
-    raise RuntimeError("Invalid Gemini API key detected. Please set a valid API key.")
-
-# MongoDB connection config
 MONGODB_URI = os.getenv('MONGODB_URI')
-if not MONGODB_URI:
-    raise RuntimeError("🚨 MONGODB_URI environment variable is required but not set!")
+
+# Gemini model used for text and vision requests
+GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-flash-latest')
+
+
+def validate_settings():
+    """
+    Security: Validate required environment variables.
+    Called from the app lifespan so that importing this module has no side effects.
+    """
+    # The Gemini key is only needed when Gemini is the LLM provider
+    required_vars = [var for var in REQUIRED_ENV_VARS if var != 'GEMINI_API_KEY' or LLM_PROVIDER == 'gemini']
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    if missing_vars:
+        raise RuntimeError(f"Missing required environment variables: {', '.join(missing_vars)}")
+    
+    if LLM_PROVIDER == 'gemini' and (GEMINI_API_KEY == "your_gemini_api_key_here" or len(GEMINI_API_KEY) < 30):
+        raise RuntimeError("Invalid Gemini API key detected. Please set a valid API key.")
+
+
+# MongoDB client settings
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 50))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 0))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 2000))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 5000))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 10000))
+MONGODB_READ_PREFERENCE = os.getenv('MONGODB_READ_PREFERENCE', 'primary')
+MONGODB_WRITE_CONCERN = os.getenv('MONGODB_WRITE_CONCERN', '1')  # a number or "majority"
+MONGODB_RECONNECT_INTERVAL_SECONDS = int(os.getenv('MONGODB_RECONNECT_INTERVAL_SECONDS', 30))
 
 # Rate limiting settings
-RATE_LIMIT_MAX_REQUESTS = 30
+RATE_LIMIT_MAX_REQUESTS = int(os.getenv('RATE_LIMIT_MAX_REQUESTS', 30))
 RATE_LIMIT_TIME_WINDOW = 60  # seconds
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))  # LRU-evicted beyond this
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # "memory" (per worker) or "mongo" (shared)
+
+# Thread pool used to keep blocking calls (pymongo, PIL) off the event loop
+BLOCKING_IO_MAX_WORKERS = int(os.getenv('BLOCKING_IO_MAX_WORKERS', 32))
+
+# Background learning queue settings
+LEARNING_QUEUE_MAX_SIZE = int(os.getenv('LEARNING_QUEUE_MAX_SIZE', 1000))
+LEARNING_QUEUE_WORKERS = int(os.getenv('LEARNING_QUEUE_WORKERS', 4))
+LEARNING_QUEUE_DURABLE = os.getenv('LEARNING_QUEUE_DURABLE', 'false').lower() == 'true'
+
+# Preference learning: half-life of the decayed per-session counters (0 disables decay).
+# Short enough that the last hour of a conversation outweighs its beginning
+LEARNING_DECAY_HALF_LIFE_HOURS = float(os.getenv('LEARNING_DECAY_HALF_LIFE_HOURS', 1))
+# Keyword counters kept per session (the heaviest ones) when counters are renormalized
+LEARNING_MAX_KEYWORDS = int(os.getenv('LEARNING_MAX_KEYWORDS', 50))
+
+# Write-behind batching of chat_history / user_feedback inserts
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 100))
+WRITE_BEHIND_FLUSH_INTERVAL_MS = int(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL_MS', 200))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', 5000))  # Writers flush inline beyond this
+
+# Gemini context caching of static system prompt prefixes
+CONTEXT_CACHE_ENABLED = os.getenv('CONTEXT_CACHE_ENABLED', 'false').lower() == 'true'
+# Cached requests must run on the same model as uncached ones. To use caching, pin GEMINI_MODEL_NAME
+# to a versioned model (e.g. gemini-2.5-flash): aliases such as gemini-flash-latest may not support it
+CONTEXT_CACHE_MODEL = GEMINI_MODEL_NAME if GEMINI_MODEL_NAME.startswith('models/') else f'models/{GEMINI_MODEL_NAME}'
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv('CONTEXT_CACHE_TTL_SECONDS', 3600))
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv('CONTEXT_CACHE_MIN_TOKENS', 1024))  # Gemini rejects smaller caches (Flash models)
+
+# Response cache for repeated context-free questions
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 5000))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 3600))
+RESPONSE_CACHE_MAX_MESSAGE_CHARS = int(os.getenv('RESPONSE_CACHE_MAX_MESSAGE_CHARS', 200))
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(os.getenv('RESPONSE_CACHE_SIMILARITY_THRESHOLD', 0))  # 0 disables the MinHash tier
+RESPONSE_CACHE_PERSISTENT = os.getenv('RESPONSE_CACHE_PERSISTENT', 'false').lower() == 'true'
+
+# Image result cache for re-uploaded images, keyed on a pixel digest and a perceptual hash
+IMAGE_CACHE_ENABLED = os.getenv('IMAGE_CACHE_ENABLED', 'false').lower() == 'true'
+IMAGE_CACHE_SIZE = int(os.getenv('IMAGE_CACHE_SIZE', 2000))
+IMAGE_CACHE_TTL_SECONDS = int(os.getenv('IMAGE_CACHE_TTL_SECONDS', 86400))
+IMAGE_CACHE_HASH_SIZE = int(os.getenv('IMAGE_CACHE_HASH_SIZE', 16))  # dHash grid; the hash has HASH_SIZE ** 2 bits
+IMAGE_CACHE_MAX_DISTANCE = int(os.getenv('IMAGE_CACHE_MAX_DISTANCE', 6))  # Hamming bits for a near-duplicate hit, 0 = exact only
+# Hashes with fewer set bits (text screenshots, flat images) only get exact pixel matches
+IMAGE_CACHE_MIN_HASH_BITS = int(os.getenv('IMAGE_CACHE_MIN_HASH_BITS', IMAGE_CACHE_HASH_SIZE ** 2 // 8))
+IMAGE_CACHE_PERSISTENT = os.getenv('IMAGE_CACHE_PERSISTENT', 'false').lower() == 'true'
+
+# LLM backend: "gemini", or "fake" for offline load testing (see services/llm_providers.py)
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini').lower()
+FAKE_LLM_LATENCY_DISTRIBUTION = os.getenv('FAKE_LLM_LATENCY_DISTRIBUTION', 'lognormal')  # constant, uniform, normal or lognormal
+FAKE_LLM_LATENCY_MS = float(os.getenv('FAKE_LLM_LATENCY_MS', 600))  # Median time to first token
+FAKE_LLM_LATENCY_JITTER = float(os.getenv('FAKE_LLM_LATENCY_JITTER', 0.4))  # Relative spread (sigma for lognormal)
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', 60))
+FAKE_LLM_RESPONSE_TOKENS = int(os.getenv('FAKE_LLM_RESPONSE_TOKENS', 250))
+FAKE_LLM_CHUNK_TOKENS = int(os.getenv('FAKE_LLM_CHUNK_TOKENS', 20))  # Tokens per streamed chunk
+FAKE_LLM_RATE_LIMIT_RATE = float(os.getenv('FAKE_LLM_RATE_LIMIT_RATE', 0))  # Share of requests failing with a 429
+FAKE_LLM_TIMEOUT_RATE = float(os.getenv('FAKE_LLM_TIMEOUT_RATE', 0))  # Share of requests timing out
+FAKE_LLM_TIMEOUT_SECONDS = float(os.getenv('FAKE_LLM_TIMEOUT_SECONDS', 10))
+FAKE_LLM_SEED = int(os.getenv('FAKE_LLM_SEED', 0))
+
+# Share one Gemini call between concurrent requests with an identical prompt
+LLM_SINGLE_FLIGHT_ENABLED = os.getenv('LLM_SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+
+# Per-session conversation state cache
+SESSION_CACHE_MAX_SESSIONS = int(os.getenv('SESSION_CACHE_MAX_SESSIONS', 10000))
+SESSION_CACHE_MAX_BYTES = int(os.getenv('SESSION_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+SESSION_CACHE_TTL_SECONDS = int(os.getenv('SESSION_CACHE_TTL_SECONDS', 1800))
+SESSION_CACHE_RECENT_MESSAGES = 5  # Covers recent context (3) and learning window (5)
+
+# Language detection tiers
+LANGUAGE_CACHE_SIZE = int(os.getenv('LANGUAGE_CACHE_SIZE', 10000))
+LANGUAGE_PRIOR_MAX_CHARS = 200  # Longer messages are never attributed to the session's language
+LANGUAGE_PRIOR_MAX_CONFIDENCE = 0.8  # langdetect votes in sevenths: below 6/7 the session's language may break the tie
+LANGUAGE_PRIOR_MIN_PROBABILITY = 0.2  # The session's language must be at least this likely according to the model
 
 # File upload settings
 MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 10485760))  # 10MB default
 ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
 
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 50_000_000))  # Decompression bomb guard, checked on the header
+IMAGE_DECODE_CONCURRENCY = int(os.getenv('IMAGE_DECODE_CONCURRENCY', 4))  # Full-resolution decodes in flight at once
+
+# Image preprocessing before Gemini vision
+IMAGE_MAX_EDGE = int(os.getenv('IMAGE_MAX_EDGE', 1536))  # Longest side sent to the model, in pixels
+IMAGE_ENCODE_FORMAT = os.getenv('IMAGE_ENCODE_FORMAT', 'WEBP').upper()  # "WEBP" or "JPEG"
+IMAGE_ENCODE_QUALITY = int(os.getenv('IMAGE_ENCODE_QUALITY', 85))
+
 # CORS settings
 ALLOWED_ORIGINS = [
     "http://localhost:3000",
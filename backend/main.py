@@ -1,19 +1,50 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 # Import config
-from config.settings import ALLOWED_ORIGINS, ENVIRONMENT
+from config.settings import ALLOWED_ORIGINS, ENVIRONMENT, WRITE_BEHIND_ENABLED, MAX_FILE_SIZE, validate_settings
 
 # Import routers
 from routes import chat, history, feedback, analytics, health
+import services.db_service as db_service
+from services.learning_queue import learning_queue
+from services.write_buffer import chat_history_buffer, feedback_buffer
+from services.context_cache import context_cache
+from utils.interaction import process_session_interactions
+from utils.concurrency import run_blocking
+from utils.uploads import UploadSizeLimitMiddleware, FORM_OVERHEAD_BYTES
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Security: fail fast on missing or placeholder credentials
+    validate_settings()
+    # MongoDB client and connection pool
+    await run_blocking(db_service.initialize_mongodb)
+    # Batched chat_history / user_feedback inserts
+    if WRITE_BEHIND_ENABLED:
+        chat_history_buffer.start(db_service.get_db)
+        feedback_buffer.start(db_service.get_db)
+    # Background learning workers
+    await learning_queue.start(process_session_interactions)
+    yield
+    await learning_queue.stop()
+    # Flush buffered writes before the connection pool closes
+    await run_blocking(chat_history_buffer.stop)
+    await run_blocking(feedback_buffer.stop)
+    await run_blocking(context_cache.close)
+    db_service.close_mongodb()
+
 
 app = FastAPI(
     title="AI Guru Multibot API",
     description="Secure AI Chat API with MongoDB integration",
     version="2.0.0",
     docs_url="/docs" if ENVIRONMENT != 'production' else None,
-    redoc_url=None
+    redoc_url=None,
+    lifespan=lifespan
 )
 
 # Security Headers Middleware
@@ -27,6 +58,14 @@ async def add_security_headers(request: Request, call_next):
     response.headers["Content-Security-Policy"] = "default-src 'self'"
     return response
 
+# Stop oversized image uploads while they are being received
+# (added before CORS so CORS stays outermost and its headers reach the 413s)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=MAX_FILE_SIZE + FORM_OVERHEAD_BYTES,
+    paths=["/image-chat"],
+)
+
 # Secure CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -4,6 +4,15 @@ Handles learning analytics and effectiveness metrics
 """
 from fastapi import APIRouter
 import services.db_service as db_service
+import services.prompt_templates as prompt_templates
+import services.ai_service as ai_service
+from services.context_cache import context_cache
+from services.response_cache import response_cache
+from services.image_cache import image_cache
+from services.learning_queue import learning_queue
+from services.session_cache import session_cache
+from utils.language import get_detection_stats
+from utils.image_processing import get_preprocessing_stats
 
 
 router = APIRouter(tags=["analytics"])
@@ -21,3 +30,69 @@ def get_learning_analytics_endpoint():
     if "error" not in analytics:
         analytics["learning_effectiveness"] = calculate_learning_effectiveness()
     return analytics
+
+
+@router.get("/learning-queue-metrics")
+def get_learning_queue_metrics():
+    """Get depth, lag and throughput of the background learning queue"""
+    return learning_queue.get_metrics()
+
+
+@router.get("/session-cache-metrics")
+def get_session_cache_metrics():
+    """Get size and hit rate of the per-session state cache"""
+    return session_cache.get_stats()
+
+
+@router.get("/db-pool-metrics")
+def get_db_pool_metrics():
+    """Get MongoDB connection pool utilization"""
+    return db_service.get_pool_metrics()
+
+
+@router.get("/write-buffer-metrics")
+def get_write_buffer_metrics():
+    """Get write-behind buffer depth and batch counters"""
+    return db_service.get_write_buffer_metrics()
+
+
+@router.get("/prompt-template-metrics")
+def get_prompt_template_metrics():
+    """Get static size and estimated token count of each rendered prompt variant"""
+    return prompt_templates.get_template_stats()
+
+
+@router.get("/context-cache-metrics")
+def get_context_cache_metrics():
+    """Get Gemini context cache usage per prompt variant"""
+    return context_cache.get_stats()
+
+
+@router.get("/response-cache-metrics")
+def get_response_cache_metrics():
+    """Get response cache hit ratio per tier and estimated latency saved"""
+    return response_cache.get_stats()
+
+
+@router.get("/image-cache-metrics")
+def get_image_cache_metrics():
+    """Get image result cache hit ratio per tier and time saved per hit"""
+    return image_cache.get_stats()
+
+
+@router.get("/single-flight-metrics")
+def get_single_flight_metrics():
+    """Get upstream Gemini calls made and requests coalesced onto them"""
+    return ai_service.text_flight.get_stats()
+
+
+@router.get("/image-preprocessing-metrics")
+def get_image_preprocessing_metrics():
+    """Get bytes saved by image preprocessing and its mean cost"""
+    return get_preprocessing_stats()
+
+
+@router.get("/language-detection-metrics")
+def get_language_detection_metrics():
+    """Get hit rates and latency of each language detection tier"""
+    return get_detection_stats()
@@ -1,24 +1,120 @@
-from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Body
-from PIL import Image
-import io
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Body, Depends
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import time
 import traceback
 from models.schemas import ChatRequest
-from config.settings import LANGUAGE_NAMES, ENVIRONMENT, MAX_FILE_SIZE, ALLOWED_IMAGE_TYPES
+from config.settings import LANGUAGE_NAMES, ENVIRONMENT
 import services.db_service as db_service
 import services.ai_service as ai_service
+import services.prompt_templates as prompt_templates
 from utils.rate_limiter import rate_limiter
 from utils.language import detect_language, detect_mixed_indian_language
-from utils.interaction import store_interaction
+from utils.interaction import record_interaction, get_recent_messages
+from utils.concurrency import run_blocking
+from utils.uploads import validate_image_upload, decode_image_upload
+from services.providers import get_chat_collection, get_text_provider, get_vision_provider
+from services.response_cache import response_cache
+from services.image_cache import image_cache
 
 router = APIRouter(tags=["chat"])
 
-# Get references for compatibility
-chat_collection = db_service.get_chat_collection()
-text_model = ai_service.get_text_model()
-vision_model = ai_service.get_vision_model()
+async def prepare_chat_prompt(text: str, session_id: str = None, chat_collection=None) -> dict:
+    """
+    Detect language, load personalization and build the full chat prompt
+    
+    Args:
+        text: User's message
+        session_id: Session identifier
+        chat_collection: chat_history collection, None in in-memory mode
+    
+    Returns:
+        Dictionary with the prompt and language detection results
+    """
+    # Detect input language with confidence (script scan shared with mixed-language detection)
+    mixed_lang = detect_mixed_indian_language(text)
+    # langdetect runs the n-gram model on a cache miss: keep it off the event loop
+    detected_lang, confidence, should_display = await run_blocking(detect_language, text, mixed_lang=mixed_lang, session_id=session_id)
+    language_name = LANGUAGE_NAMES.get(detected_lang, 'Unknown')
+    
+    # Get learned user preferences for personalization
+    learned_prefs = await run_blocking(db_service.get_learned_preferences, session_id) if session_id else {}
+    
+    # Get recent conversation context
+    recent_context = ""
+    if session_id and chat_collection is not None:
+        try:
+            recent_messages = await run_blocking(get_recent_messages, session_id, limit=3)
+            if recent_messages:
+                context_parts = []
+                for msg in reversed(recent_messages):
+                    context_parts.append(f"User: {msg.get('user_input', '')}")
+                    context_parts.append(f"AI: {msg.get('bot_response', '')}")
+                recent_context = "\n".join(context_parts[-4:])
+        except Exception as e:
+            print(f"Error getting conversation context: {e}")
+    
+    if ENVIRONMENT != 'production':
+        print(f"Received message length: {len(text)}")
+        if should_display:
+            print(f"Detected language: {language_name} ({detected_lang}) - Confidence: {confidence:.2f}")
+        if learned_prefs:
+            print(f"🧠 Using learned preferences: {learned_prefs}")
+    
+    # Build personalized system prompt
+    learned_format_pref = learned_prefs.get('preferred_format', 'neutral')
+    learned_formality = learned_prefs.get('formality_level', 'neutral')
+    learned_topics = learned_prefs.get('topics_of_interest', [])
+    
+    full_prompt = ai_service.build_chat_prompt(
+        text=text,
+        language_name=language_name,
+        detected_lang=detected_lang,
+        should_display=should_display,
+        learned_format_pref=learned_format_pref,
+        learned_formality=learned_formality,
+        learned_topics=learned_topics,
+        recent_context=recent_context,
+        mixed_lang=mixed_lang
+    )
+    
+    template = prompt_templates.select_chat_template(should_display, detected_lang, language_name, mixed_lang)
+    
+    return {
+        "prompt": full_prompt,
+        "template": template,
+        "cache_key": response_cache.make_key(
+            text,
+            template.name,
+            (learned_format_pref, learned_formality, tuple(learned_topics[:3])),
+            has_context=bool(recent_context)
+        ),
+        "detected_lang": detected_lang,
+        "language_name": language_name,
+        "confidence": confidence,
+        "should_display": should_display
+    }
+
+
+def build_language_fields(prepared: dict) -> dict:
+    """Language detection fields included in chat responses when detection is shown"""
+    if not prepared["should_display"]:
+        return {}
+    return {
+        "detected_language": prepared["detected_lang"],
+        "language_name": prepared["language_name"],
+        "confidence": prepared["confidence"]
+    }
+
 
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest, http_request: Request):
+async def chat_endpoint(
+    request: ChatRequest,
+    http_request: Request,
+    chat_collection=Depends(get_chat_collection),
+    text_provider=Depends(get_text_provider)
+):
     try:
         print(f"DEBUG: Processing chat request: {request.message[:50]}...")
         # Security: Rate limiting
@@ -26,72 +122,29 @@ async def chat_endpoint(request: ChatRequest, http_request: Request):
         text = request.message
         session_id = request.session_id
         
-        # Detect input language with confidence
-        detected_lang, confidence, should_display = detect_language(text)
-        language_name = LANGUAGE_NAMES.get(detected_lang, 'Unknown')
-        
-        # Get learned user preferences for personalization
-        learned_prefs = db_service.get_learned_preferences(session_id) if session_id else {}
-        
-        # Get recent conversation context
-        recent_context = ""
-        if session_id and chat_collection is not None:
-            try:
-                recent_messages = db_service.get_recent_messages(session_id, limit=3)
-                if recent_messages:
-                    context_parts = []
-                    for msg in reversed(recent_messages):
-                        context_parts.append(f"User: {msg.get('user_input', '')}")
-                        context_parts.append(f"AI: {msg.get('bot_response', '')}")
-                    recent_context = "\n".join(context_parts[-4:])
-            except Exception as e:
-                print(f"Error getting conversation context: {e}")
-        
-        if ENVIRONMENT != 'production':
-            print(f"Received message length: {len(text)}")
-            if should_display:
-                print(f"Detected language: {language_name} ({detected_lang}) - Confidence: {confidence:.2f}")
-            if learned_prefs:
-                print(f"🧠 Using learned preferences: {learned_prefs}")
-        
-        # Build personalized system prompt
-        learned_format_pref = learned_prefs.get('preferred_format', 'neutral')
-        learned_formality = learned_prefs.get('formality_level', 'neutral')
-        learned_topics = learned_prefs.get('topics_of_interest', [])
-        
-        mixed_lang = detect_mixed_indian_language(text)
-        
-        full_prompt = ai_service.build_chat_prompt(
-            text=text,
-            language_name=language_name,
-            detected_lang=detected_lang,
-            should_display=should_display,
-            learned_format_pref=learned_format_pref,
-            learned_formality=learned_formality,
-            learned_topics=learned_topics,
-            recent_context=recent_context,
-            mixed_lang=mixed_lang
-        )
+        prepared = await prepare_chat_prompt(text, session_id, chat_collection)
+        detected_lang = prepared["detected_lang"]
+        should_display = prepared["should_display"]
         
-        response = text_model.generate_content(full_prompt)
-        bot_response = response.text if response.text else "Sorry, I couldn't generate a response."
+        # Repeated context-free questions are answered from the response cache
+        bot_response = await response_cache.get(prepared["cache_key"])
+        if bot_response is None:
+            started_at = time.perf_counter()
+            bot_response = await ai_service.generate_text_response_async(prepared["prompt"], provider=text_provider, template=prepared["template"])
+            # Never serve the empty-completion apology to later askers
+            if bot_response != ai_service.FALLBACK_RESPONSE:
+                await response_cache.put(prepared["cache_key"], bot_response, time.perf_counter() - started_at)
         print(f"Gemini response: {bot_response[:100]}...")
         
         # Store interaction
-        session_id, interaction_id = store_interaction('text', text, bot_response, session_id, detected_lang if should_display else None)
+        session_id, interaction_id = await record_interaction('text', text, bot_response, session_id, detected_lang if should_display else None)
         
         response_data = {
             "response": bot_response, 
             "session_id": session_id,
             "interaction_id": interaction_id
         }
-        
-        if should_display:
-            response_data.update({
-                "detected_language": detected_lang,
-                "language_name": language_name,
-                "confidence": confidence
-            })
+        response_data.update(build_language_fields(prepared))
         
         return response_data
     except Exception as e:
@@ -104,25 +157,98 @@ async def chat_endpoint(request: ChatRequest, http_request: Request):
         else:
             raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+def format_sse(data: dict, event: str = None) -> str:
+    """Format a payload as a server-sent event frame"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _single_chunk(text: str):
+    """Stream a cached response as one chunk"""
+    yield text
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    http_request: Request,
+    chat_collection=Depends(get_chat_collection),
+    text_provider=Depends(get_text_provider)
+):
+    """Stream the chat response as server-sent events"""
+    await rate_limiter.check_rate_limit(http_request.client.host)
+    text = request.message
+    
+    try:
+        prepared = await prepare_chat_prompt(text, request.session_id, chat_collection)
+    except Exception as e:
+        print(f"Error preparing chat stream: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    
+    async def event_stream():
+        chunks = []
+        cached_response = await response_cache.get(prepared["cache_key"])
+        if cached_response is not None:
+            stream = _single_chunk(cached_response)
+        else:
+            stream = ai_service.stream_text_response(prepared["prompt"], provider=text_provider, template=prepared["template"])
+        started_at = time.perf_counter()
+        try:
+            async for chunk_text in stream:
+                if await http_request.is_disconnected():
+                    print("🔌 Client disconnected, cancelling generation")
+                    return
+                chunks.append(chunk_text)
+                yield format_sse({"delta": chunk_text})
+        except asyncio.CancelledError:
+            print("🔌 Chat stream cancelled, upstream generation abandoned")
+            raise
+        except Exception as e:
+            print(f"Error in chat stream: {str(e)}")
+            error_message = str(e)
+            if "quota" in error_message.lower() or "429" in error_message:
+                yield format_sse({"status": 429, "detail": "API quota exceeded. Please wait a moment and try again."}, event="error")
+            else:
+                yield format_sse({"status": 500, "detail": f"Error: {error_message}"}, event="error")
+            return
+        finally:
+            await stream.aclose()
+        
+        bot_response = "".join(chunks) or ai_service.FALLBACK_RESPONSE
+        if cached_response is None and chunks:
+            await response_cache.put(prepared["cache_key"], bot_response, time.perf_counter() - started_at)
+        
+        # Persist only once the full response has been assembled
+        detected_lang = prepared["detected_lang"] if prepared["should_display"] else None
+        session_id, interaction_id = await record_interaction('text', text, bot_response, request.session_id, detected_lang)
+        
+        done_data = {"session_id": session_id, "interaction_id": interaction_id}
+        done_data.update(build_language_fields(prepared))
+        yield format_sse(done_data, event="done")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/image-chat")
-async def image_chat(image: UploadFile = File(...), text: str = Body(..., embed=True), session_id: str = Body(None, embed=True), http_request: Request = None):
+async def image_chat(image: UploadFile = File(...), text: str = Body(..., embed=True), session_id: str = Body(None, embed=True), http_request: Request = None, vision_provider=Depends(get_vision_provider)):
     try:
         # Security: Rate limiting
         if http_request:
             await rate_limiter.check_rate_limit(http_request.client.host)
         
-        # Security: File validation
-        if image.size > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File too large. Max size: 10MB")
-        
-        if image.content_type not in ALLOWED_IMAGE_TYPES:
-            raise HTTPException(status_code=415, detail="Unsupported file type. Use JPEG, PNG, GIF, or WebP")
+        # Security: File validation (size as spooled, type from the file's magic bytes)
+        await validate_image_upload(image)
         
         if not text:
             text = "Describe this image."
         
-        # Detect input language
-        detected_lang, confidence, should_display = detect_language(text)
+        # Detect input language (script scan shared with mixed-language detection)
+        mixed_lang = detect_mixed_indian_language(text)
+        detected_lang, confidence, should_display = await run_blocking(detect_language, text, mixed_lang=mixed_lang, session_id=session_id)
         language_name = LANGUAGE_NAMES.get(detected_lang, 'Unknown')
         
         if len(text) > 1000:
@@ -131,12 +257,10 @@ async def image_chat(image: UploadFile = File(...), text: str = Body(..., embed=
         if should_display:
             print(f"Image chat - Detected language: {language_name} ({detected_lang}) - Confidence: {confidence:.2f}")
         
-        # Read image data
-        image_bytes = await image.read()
-        pil_image = Image.open(io.BytesIO(image_bytes))
-        
-        # Detect mixed language
-        mixed_lang = detect_mixed_indian_language(text)
+        # Decode from the spooled upload, then downscale / strip / re-encode it off the event loop
+        processed_image = await decode_image_upload(image)
+        if ENVIRONMENT != 'production':
+            print(f"🖼️ Image {processed_image.original_bytes} -> {len(processed_image.data)} bytes ({processed_image.size[0]}x{processed_image.size[1]})")
         
         # Build vision prompt
         vision_system_prompt = ai_service.build_vision_prompt(
@@ -147,12 +271,21 @@ async def image_chat(image: UploadFile = File(...), text: str = Body(..., embed=
             mixed_lang=mixed_lang
         )
         
-        # Generate response using Gemini Vision
-        response = vision_model.generate_content([vision_system_prompt, pil_image])
-        bot_response = response.text
+        # Generate response using Gemini Vision, unless this image and question were answered recently
+        vision_template = prompt_templates.select_vision_template(should_display, detected_lang, language_name, mixed_lang)
+        cache_key = image_cache.make_key(
+            processed_image.content_digest, processed_image.perceptual_hash, text, vision_template.name
+        )
+        bot_response = await image_cache.get(cache_key)
+        if bot_response is None:
+            started_at = time.perf_counter()
+            bot_response = await ai_service.generate_vision_response_async(
+                vision_system_prompt, processed_image.as_blob(), provider=vision_provider, template=vision_template
+            )
+            await image_cache.put(cache_key, bot_response, time.perf_counter() - started_at)
         
         # Store interaction
-        session_id, interaction_id = store_interaction('image', text, bot_response, session_id, detected_lang if should_display else None)
+        session_id, interaction_id = await record_interaction('image', text, bot_response, session_id, detected_lang if should_display else None)
         
         response_data = {
             "response": bot_response, 
@@ -168,5 +301,7 @@ async def image_chat(image: UploadFile = File(...), text: str = Body(..., embed=
             })
         
         return response_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
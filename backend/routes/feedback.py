@@ -1,17 +1,18 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Depends
 from datetime import datetime
 from models.schemas import FeedbackRequest
 import services.db_service as db_service
+import services.learning_service as learning_service
+from services.learning_queue import learning_queue
 from utils.rate_limiter import rate_limiter
 from utils.interaction import learn_from_feedback
+from utils.concurrency import run_blocking
+from services.providers import get_chat_collection
 
 router = APIRouter(tags=["feedback"])
 
-# Get references for compatibility
-chat_collection = db_service.get_chat_collection()
-
 @router.post("/feedback")
-async def submit_feedback(feedback: FeedbackRequest, http_request: Request):
+async def submit_feedback(feedback: FeedbackRequest, http_request: Request, chat_collection=Depends(get_chat_collection)):
     """Allow users to provide feedback on AI responses for continuous learning"""
     try:
         # Security: Rate limiting for feedback
@@ -20,11 +21,6 @@ async def submit_feedback(feedback: FeedbackRequest, http_request: Request):
         if chat_collection is None:
             raise HTTPException(status_code=503, detail="Database unavailable")
         
-        # Find the interaction to update using db_service
-        interaction = db_service.get_interaction_by_id(feedback.interaction_id)
-        if not interaction:
-            raise HTTPException(status_code=404, detail="Interaction not found")
-        
         # Update interaction with feedback
         feedback_data = {
             "feedback_type": feedback.feedback_type,
@@ -32,11 +28,28 @@ async def submit_feedback(feedback: FeedbackRequest, http_request: Request):
             "feedback_timestamp": datetime.utcnow()
         }
         
-        # Update using db_service
-        db_service.update_interaction_feedback(feedback.interaction_id, feedback_data)
+        # The interaction may still be waiting in the background learning queue
+        pending = await learning_queue.attach_feedback(feedback.interaction_id, feedback_data)
+        if pending:
+            session_id, queued = pending
+            # Not stored yet: learn from the same features the worker will store
+            interaction = {
+                "_id": feedback.interaction_id,
+                "session_id": session_id,
+                "user_input": queued["user_input"],
+                "bot_response": queued["bot_response"],
+                **learning_service.extract_interaction_features(queued["user_input"], queued["bot_response"])
+            }
+        else:
+            # A worker may be writing the interaction right now: let it land first
+            await learning_queue.wait_until_stored(feedback.interaction_id)
+            # Attach the feedback and fetch the interaction in one round trip
+            interaction = await run_blocking(db_service.update_interaction_feedback, feedback.interaction_id, feedback_data)
+            if not interaction:
+                raise HTTPException(status_code=404, detail="Interaction not found")
         
         # Learn from this feedback
-        learn_from_feedback(interaction, feedback_data)
+        await run_blocking(learn_from_feedback, interaction, feedback_data)
         
         return {
             "success": True, 
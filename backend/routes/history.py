@@ -2,18 +2,18 @@
 Chat History Routes
 Handles chat history retrieval and deletion
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Depends
+from datetime import datetime
+from typing import Optional
 import services.db_service as db_service
+from services.providers import get_chat_collection
 
 
 router = APIRouter(tags=["history"])
 
-# Get reference to chat_collection for compatibility
-chat_collection = db_service.get_chat_collection()
-
 
 @router.get("/chat-history")
-def get_chat_history():
+def get_chat_history(chat_collection=Depends(get_chat_collection)):
     try:
         # Return empty sessions if MongoDB is not available
         if chat_collection is None:
@@ -30,8 +30,7 @@ def get_chat_history():
             messages = db_service.get_session_messages(session_id)
             
             # Create session object with first message as title
-            first_message = session.get('first_message', '')
-            session_title = first_message[:50] + "..." if len(first_message) > 50 else first_message
+            session_title = format_session_title(session.get('first_message', ''))
             
             grouped_history.append({
                 'session_id': session_id,
@@ -46,6 +45,70 @@ def get_chat_history():
         raise HTTPException(status_code=500, detail=f"Error fetching chat history: {str(e)}")
 
 
+def format_session_title(first_message: str) -> str:
+    """Use the session's first message as its title"""
+    first_message = first_message or ''
+    return first_message[:50] + "..." if len(first_message) > 50 else first_message
+
+
+def encode_session_cursor(session: dict) -> str:
+    return f"{session['latest_timestamp'].isoformat()}|{session['_id']}"
+
+
+def decode_session_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, session_id = cursor.split("|", 1)
+        return datetime.fromisoformat(timestamp), session_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/sessions")
+def get_sessions(limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, chat_collection=Depends(get_chat_collection)):
+    """List sessions (titles and counts only), paginated by latest activity"""
+    try:
+        if chat_collection is None:
+            return {"sessions": [], "next_cursor": None, "total": 0, "status": "MongoDB unavailable - using temporary session storage"}
+        
+        before = decode_session_cursor(cursor) if cursor else None
+        page = db_service.get_sessions_page(limit=limit, before=before)
+        sessions = page["sessions"]
+        
+        return {
+            "sessions": [{
+                'session_id': session['_id'],
+                'session_title': format_session_title(session.get('first_message')),
+                'message_count': session['message_count'],
+                'latest_timestamp': session['latest_timestamp'].isoformat() if session['latest_timestamp'] else None
+            } for session in sessions],
+            "next_cursor": encode_session_cursor(sessions[-1]) if len(sessions) == limit and sessions[-1]['latest_timestamp'] else None,
+            "total": page["total"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching sessions: {str(e)}")
+
+
+@router.get("/session/{session_id}/messages")
+def get_session_messages_endpoint(session_id: str, before: Optional[datetime] = None, limit: int = Query(50, ge=1, le=200), chat_collection=Depends(get_chat_collection)):
+    """Get a page of a session's messages older than `before`, in chronological order"""
+    try:
+        if chat_collection is None:
+            return {"messages": [], "next_before": None}
+        
+        messages = db_service.get_session_messages_page(session_id, limit=limit, before=before)
+        
+        next_before = messages[0]['timestamp'].isoformat() if len(messages) == limit and messages[0].get('timestamp') else None
+        for msg in messages:
+            if msg.get('timestamp'):
+                msg['timestamp'] = msg['timestamp'].isoformat()
+        
+        return {"messages": messages, "next_before": next_before}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching session messages: {str(e)}")
+
+
 @router.delete("/chat-history/{chat_id}")
 def delete_chat_history(chat_id: str):
     """Delete a specific chat history entry"""
@@ -0,0 +1,3 @@
+"""
+Scripts package for GuruMultibot backend: benchmarks and load tests
+"""
@@ -0,0 +1,196 @@
+"""
+Feature Extraction Benchmark
+Compares the one-pass extractor (learning_service.extract_features_batch)
+with the per-feature implementation store_interaction used before it, on
+a generated corpus of interactions. tests/test_feature_extraction.py checks
+that both produce the same features.
+
+Usage:
+    python -m scripts.bench_feature_extraction [--interactions 5000] [--repeats 5]
+"""
+import argparse
+import random
+import re
+import time
+from typing import Dict, List, Tuple
+import services.learning_service as learning_service
+
+
+# The per-feature implementation store_interaction used before the
+# extractor: every helper lowercases and scans the interaction again.
+
+def _baseline_input_patterns(user_input):
+    user_input_lower = user_input.lower()
+    if any(word in user_input_lower for word in ['paragraph', 'write', 'describe', 'tell me about', 'essay']):
+        request_type = "paragraph"
+    elif any(word in user_input_lower for word in ['explain', 'list', 'break down', 'steps', 'outline']):
+        request_type = "structured"
+    elif any(word in user_input_lower for word in ['hi', 'hello', 'thanks', 'how are you']):
+        request_type = "casual"
+    else:
+        request_type = "mixed"
+
+    if any(word in user_input_lower for word in ['please', 'could you', 'would you', 'kindly', 'sir', 'madam']):
+        formality_level = "formal"
+    elif any(word in user_input_lower for word in ['hey', 'yo', 'sup', 'what\'s up', 'cool', 'awesome']):
+        formality_level = "casual"
+    else:
+        formality_level = "neutral"
+
+    if len(user_input) < 20:
+        length_preference = "short"
+    elif len(user_input) > 100:
+        length_preference = "detailed"
+    else:
+        length_preference = "medium"
+
+    words = re.findall(r'\b[a-zA-Z]{3,}\b', user_input.lower())
+    common_words = {'the', 'and', 'you', 'for', 'are', 'with', 'can', 'about', 'what', 'how', 'that', 'this'}
+    return {
+        "request_type": request_type,
+        "formality_level": formality_level,
+        "length_preference": length_preference,
+        "keywords": [word for word in words if word not in common_words][:10]
+    }
+
+
+def _baseline_response_format(bot_response):
+    if not bot_response:
+        return "empty"
+    format_info = {
+        "has_bullets": bool(re.search(r'^[\s]*[-•*]', bot_response, re.MULTILINE)),
+        "has_numbering": bool(re.search(r'^[\s]*\d+\.', bot_response, re.MULTILINE)),
+        "has_sections": bool(re.search(r'\*\*.*\*\*', bot_response)),
+        "has_emojis": bool(re.search(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', bot_response)),
+        "length": len(bot_response),
+        "format_type": ""
+    }
+    if format_info["has_sections"] and (format_info["has_bullets"] or format_info["has_numbering"]):
+        format_info["format_type"] = "structured"
+    elif not format_info["has_bullets"] and not format_info["has_numbering"] and not format_info["has_sections"]:
+        format_info["format_type"] = "paragraph"
+    else:
+        format_info["format_type"] = "mixed"
+    return format_info
+
+
+def _baseline_topic(text):
+    topics = {
+        'science': ['science', 'physics', 'chemistry', 'biology', 'research'],
+        'technology': ['AI', 'computer', 'software', 'programming', 'tech'],
+        'education': ['learn', 'study', 'school', 'education', 'knowledge'],
+    }
+    text_lower = text.lower()
+    for topic, keywords in topics.items():
+        if any(keyword in text_lower for keyword in keywords):
+            return topic
+    return 'general'
+
+
+def _baseline_sentiment(text):
+    text_lower = text.lower()
+    positive_count = sum(1 for word in ['good', 'great', 'awesome', 'excellent', 'love', 'like', 'amazing'] if word in text_lower)
+    negative_count = sum(1 for word in ['bad', 'terrible', 'hate', 'dislike', 'awful', 'wrong'] if word in text_lower)
+    if positive_count > negative_count:
+        return 'positive'
+    elif negative_count > positive_count:
+        return 'negative'
+    return 'neutral'
+
+
+def _baseline_complexity(text):
+    if len(text) < 30:
+        return 'simple'
+    elif len(text) > 100 or any(word in text.lower() for word in ['complex', 'detailed', 'comprehensive', 'analyze']):
+        return 'complex'
+    return 'medium'
+
+
+def _baseline_format_alignment(user_input, bot_response):
+    user_lower = user_input.lower()
+    has_structure = bool(re.search(r'\*\*.*\*\*', bot_response) or re.search(r'^[\s]*[-•*\d+\.]', bot_response, re.MULTILINE))
+    if any(word in user_lower for word in ['paragraph', 'write', 'describe']):
+        return not has_structure
+    elif any(word in user_lower for word in ['explain', 'list', 'break down', 'steps']):
+        return has_structure
+    return True
+
+
+def _baseline_topic_relevance(user_input, bot_response):
+    user_topics = set(re.findall(r'\b[a-zA-Z]{4,}\b', user_input.lower()))
+    response_topics = set(re.findall(r'\b[a-zA-Z]{4,}\b', bot_response.lower()))
+    if len(user_topics) > 0:
+        return len(user_topics.intersection(response_topics)) / len(user_topics) > 0.3
+    return True
+
+
+def baseline_features(user_input, bot_response):
+    return {
+        "input_patterns": _baseline_input_patterns(user_input),
+        "response_format": _baseline_response_format(bot_response),
+        "interaction_context": {
+            "topic": _baseline_topic(user_input),
+            "sentiment": _baseline_sentiment(user_input),
+            "complexity": _baseline_complexity(user_input),
+            "success_indicators": {
+                "format_match": _baseline_format_alignment(user_input, bot_response),
+                "appropriate_length": learning_service.check_length_appropriateness(user_input, bot_response),
+                "topic_relevance": _baseline_topic_relevance(user_input, bot_response)
+            }
+        }
+    }
+
+
+VOCABULARY = [
+    "please", "could you", "explain", "write", "describe", "a paragraph", "list", "the steps", "hey", "what's up",
+    "physics", "software", "AI", "study", "good", "great", "bad", "dislike", "awful", "likely", "wrongly",
+    "analyze", "detailed", "hello", "thanks", "tell me about", "photosynthesis", "history", "of", "and", "the",
+    "कृपया", "समझाइए", "😀", "sir", "yo", "outline", "break down", "essay", "kindly", "amazing", "goodness"
+]
+RESPONSE_LINES = [
+    "Photosynthesis turns light into chemical energy.", "- a bullet point", "1. first step", "**Section**",
+    "  * nested bullet", "Plain sentence about software and physics.", "🚀 launch", "2. second step", ""
+]
+
+
+def make_corpus(size: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """Random (user_input, bot_response) pairs mixing request styles, scripts and formats"""
+    generator = random.Random(seed)
+    return [
+        (
+            " ".join(generator.choices(VOCABULARY, k=generator.randint(0, 30))),
+            "\n".join(generator.choices(RESPONSE_LINES, k=generator.randint(0, 15)))
+        )
+        for _ in range(size)
+    ]
+
+
+def _best_seconds(func, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def benchmark(interactions: int, repeats: int) -> Dict:
+    """Best-of-`repeats` time to extract features for `interactions` interactions, both ways"""
+    corpus = make_corpus(interactions, seed=3)
+    per_feature = _best_seconds(lambda: [baseline_features(user_input, bot_response) for user_input, bot_response in corpus], repeats)
+    one_pass = _best_seconds(lambda: learning_service.extract_features_batch(corpus), repeats)
+    return {
+        "interactions": interactions,
+        "per_feature_us": round(per_feature / interactions * 1e6, 1),
+        "one_pass_us": round(one_pass / interactions * 1e6, 1),
+        "speedup": round(per_feature / one_pass, 2)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark one-pass feature extraction against the per-feature implementation")
+    parser.add_argument("--interactions", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"📊 {benchmark(args.interactions, args.repeats)}")
@@ -0,0 +1,87 @@
+"""
+Image Preprocessing Benchmark
+Compares sending raw PIL images with sending preprocessed blobs
+(utils.image_processing) to a fake vision model whose latency is a fixed
+base plus the upload time of the image bytes.
+
+Usage:
+    python -m scripts.bench_image_preprocessing [image paths...] [--bandwidth-mbps 20]
+"""
+import argparse
+import io
+import time
+from typing import Dict, List
+from PIL import Image
+from utils.image_processing import preprocess_image, get_preprocessing_stats
+
+
+class FakeVisionModel:
+    """Stands in for Gemini vision: latency is a fixed base plus upload time of the image bytes"""
+
+    def __init__(self, base_seconds: float = 0.8, bandwidth_mbps: float = 20.0):
+        self.base_seconds = base_seconds
+        self.bytes_per_second = bandwidth_mbps * 1_000_000 / 8
+
+    def generate_content(self, contents) -> float:
+        image = contents[1]
+        if isinstance(image, dict):
+            size = len(image["data"])
+        else:
+            # What the SDK does with an in-memory PIL image
+            buffer = io.BytesIO()
+            image.save(buffer, format="webp", lossless=True)
+            size = buffer.tell()
+        return self.base_seconds + size / self.bytes_per_second
+
+
+def _synthetic_photo(width: int = 4032, height: int = 3024) -> bytes:
+    """A noisy 12MP JPEG roughly the size of a phone photo"""
+    noise = Image.effect_noise((width, height), 40)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", [noise, gradient, noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)])
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def benchmark(samples: List[bytes], bandwidth_mbps: float) -> List[Dict]:
+    """Compare raw PIL images with preprocessed blobs against FakeVisionModel"""
+    model = FakeVisionModel(bandwidth_mbps=bandwidth_mbps)
+    results = []
+    for image_bytes in samples:
+        started_at = time.perf_counter()
+        raw_image = Image.open(io.BytesIO(image_bytes))
+        raw_image.load()
+        raw_seconds = (time.perf_counter() - started_at) + model.generate_content(["prompt", raw_image])
+
+        started_at = time.perf_counter()
+        processed = preprocess_image(image_bytes)
+        preprocess_seconds = time.perf_counter() - started_at
+        processed_seconds = preprocess_seconds + model.generate_content(["prompt", processed.as_blob()])
+
+        results.append({
+            "original": f"{processed.original_size[0]}x{processed.original_size[1]}, {len(image_bytes)} bytes",
+            "processed": f"{processed.size[0]}x{processed.size[1]}, {len(processed.data)} bytes",
+            "preprocess_ms": round(preprocess_seconds * 1000, 1),
+            "vision_seconds_raw": round(raw_seconds, 3),
+            "vision_seconds_processed": round(processed_seconds, 3)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing against a fake vision model")
+    parser.add_argument("paths", nargs="*", help="images to test (defaults to a synthetic 12MP photo)")
+    parser.add_argument("--bandwidth-mbps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    samples = []
+    for path in args.paths:
+        with open(path, "rb") as image_file:
+            samples.append(image_file.read())
+    if not samples:
+        samples.append(_synthetic_photo())
+
+    for result in benchmark(samples, args.bandwidth_mbps):
+        print(f"📊 {result}")
+    print(f"📉 {get_preprocessing_stats()}")
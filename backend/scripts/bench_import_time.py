@@ -0,0 +1,74 @@
+"""
+Import Time Benchmark
+Measures how long `import main` takes in a fresh interpreter, using
+`python -X importtime`, and lists the slowest modules. Point --tree at
+another checkout of backend/ (e.g. a git worktree of an older commit) to
+compare startup before and after a change.
+
+Usage:
+    python -m scripts.bench_import_time [--runs 5] [--top 10] [--tree path/to/backend]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every line -X importtime printed"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure(tree: str, module: str = "main") -> Dict:
+    """
+    Import `module` once in a new interpreter rooted at `tree`
+
+    Returns:
+        Dictionary with the module's cumulative import time and the
+        per-module breakdown
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [tree, os.environ.get("PYTHONPATH")])))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=tree, env=env, capture_output=True, text=True, timeout=120
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed in {tree}:\n{completed.stderr[-2000:]}")
+    modules = _parse_importtime(completed.stderr)
+    total_us = next(cumulative for name, _, cumulative in reversed(modules) if name == module)
+    return {"total_ms": total_us / 1000, "modules": modules}
+
+
+def benchmark(tree: str, runs: int, top: int) -> Dict:
+    """
+    Best-of-`runs` import time of main, with the slowest modules of that run
+
+    Returns:
+        Dictionary with total_ms and the `top` modules by cumulative time
+    """
+    best = min((measure(tree) for _ in range(runs)), key=lambda result: result["total_ms"])
+    slowest = sorted(best["modules"], key=lambda module: module[2], reverse=True)[:top]
+    return {
+        "total_ms": round(best["total_ms"], 1),
+        "slowest": [(name, round(cumulative / 1000, 1)) for name, _, cumulative in slowest]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the startup import time of the app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--tree", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    args = parser.parse_args()
+
+    result = benchmark(os.path.abspath(args.tree), args.runs, args.top)
+    print(f"📊 import main: {result['total_ms']} ms (best of {args.runs})")
+    for name, cumulative_ms in result["slowest"]:
+        print(f"   {cumulative_ms:>8} ms  {name}")
@@ -0,0 +1,115 @@
+"""
+Connection Pool Benchmark
+Measures MongoDB throughput and latency against maxPoolSize: a fixed
+number of threads (by default the blocking-I/O executor size, the most
+concurrent pymongo calls the app makes) run the chat request's queries
+through a client with each pool size.
+
+Usage:
+    python -m scripts.bench_mongo_pool [--pool-sizes 1,5,10,25,50,100] [--threads 32] [--seconds 10]
+"""
+import argparse
+import threading
+import time
+import uuid
+from typing import Dict, List
+from pymongo import MongoClient
+from config.settings import BLOCKING_IO_MAX_WORKERS, MONGODB_URI, MONGODB_WAIT_QUEUE_TIMEOUT_MS
+from services.db_indexes import ensure_indexes
+from services.pool_metrics import PoolMetricsListener
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+
+def benchmark(uri: str, pool_size: int, threads: int, seconds: float) -> Dict:
+    """
+    Run one chat request's worth of queries in a loop from `threads` threads
+
+    Each operation reads the session's recent messages and its learned
+    preferences, then inserts the new interaction, in a scratch database
+    that is dropped afterwards.
+
+    Returns:
+        Dictionary of throughput, latency percentiles and pool gauges
+    """
+    listener = PoolMetricsListener()
+    client = MongoClient(
+        uri,
+        maxPoolSize=pool_size,
+        waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        event_listeners=[listener]
+    )
+    database = client[f"pool_benchmark_{uuid.uuid4().hex[:8]}"]
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+
+    def worker(worker_id: int):
+        session_id = f"pool-benchmark-{worker_id}"
+        while time.perf_counter() < deadline:
+            started_at = time.perf_counter()
+            try:
+                list(database.chat_history.find({"session_id": session_id}).sort("timestamp", -1).limit(20))
+                database.learned_patterns.find_one({"session_id": session_id})
+                database.chat_history.insert_one({
+                    "session_id": session_id,
+                    "user_input": "x" * 200,
+                    "bot_response": "y" * 1500,
+                    "timestamp": time.time()
+                })
+            except Exception as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(time.perf_counter() - started_at)
+
+    try:
+        ensure_indexes(database)
+        workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+        started_at = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+    finally:
+        client.drop_database(database.name)
+        client.close()
+
+    pool = listener.get_metrics(pool_size)
+    return {
+        "pool_size": pool_size,
+        "ops_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_ms": {f"p{p}": round(_percentile(latencies, p) * 1000, 2) for p in (50, 99)},
+        "errors": len(errors),
+        "max_checked_out": pool["max_checked_out"],
+        "checkout_failures": pool["checkout_failures"]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MongoDB throughput against connection pool size")
+    parser.add_argument("--pool-sizes", default="1,5,10,25,50,100")
+    parser.add_argument("--threads", type=int, default=BLOCKING_IO_MAX_WORKERS)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--uri", default=MONGODB_URI or "mongodb://localhost:27017")
+    args = parser.parse_args()
+
+    probe = MongoClient(args.uri, serverSelectionTimeoutMS=2000)
+    try:
+        probe.admin.command("ping")
+    except Exception as e:
+        raise SystemExit(f"MongoDB unavailable: {e}")
+    finally:
+        probe.close()
+
+    for pool_size in (int(size) for size in args.pool_sizes.split(",")):
+        result = benchmark(args.uri, pool_size, args.threads, args.seconds)
+        print(f"📊 maxPoolSize {result['pool_size']:>4}: {result['ops_per_sec']} ops/s, "
+              f"p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms, "
+              f"max checked out {result['max_checked_out']}, checkout failures {result['checkout_failures']}, "
+              f"errors {result['errors']}")
@@ -0,0 +1,110 @@
+"""
+Rate Limiter Benchmark
+Measures per-check cost and memory of the in-memory token-bucket backend
+(utils.rate_limiter) against the sliding-window limiter it replaced, with
+up to a million distinct client keys.
+
+Usage:
+    python -m scripts.bench_rate_limiter [--keys 1000000] [--max-keys 100000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+from utils.rate_limiter import InMemoryTokenBucketBackend
+
+
+class SlidingWindowBaseline:
+    """The previous limiter: a list of request datetimes per key, filtered on every check"""
+
+    def __init__(self, max_requests: int, time_window: int):
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.requests = defaultdict(list)
+
+    def acquire(self, key: str) -> bool:
+        now = datetime.now()
+        self.requests[key] = [
+            req_time for req_time in self.requests[key]
+            if now - req_time < timedelta(seconds=self.time_window)
+        ]
+        if len(self.requests[key]) >= self.max_requests:
+            return False
+        self.requests[key].append(now)
+        return True
+
+
+def _token_bucket(max_keys: int, max_requests: int, time_window: int) -> Callable[[str], bool]:
+    backend = InMemoryTokenBucketBackend(max_keys=max_keys)
+    refill_rate = max_requests / time_window
+    return lambda key: backend.acquire(key, max_requests, refill_rate, time.time())
+
+
+def _sliding_window(max_requests: int, time_window: int) -> Callable[[str], bool]:
+    return SlidingWindowBaseline(max_requests, time_window).acquire
+
+
+def _run(make_check: Callable[[], Callable[[str], bool]], keys: list, repeat_per_key: int) -> Dict:
+    """ns per check over `keys` (each checked `repeat_per_key` times), and retained memory"""
+    check = make_check()
+    gc.collect()
+    started_at = time.perf_counter()
+    for key in keys:
+        for _ in range(repeat_per_key):
+            check(key)
+    elapsed = time.perf_counter() - started_at
+    del check
+    gc.collect()
+
+    # Memory is measured in a separate pass: tracemalloc slows allocation down
+    tracemalloc.start()
+    check = make_check()
+    for key in keys:
+        for _ in range(repeat_per_key):
+            check(key)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del check
+    gc.collect()
+
+    return {
+        "ns_per_check": round(elapsed / (len(keys) * repeat_per_key) * 1e9),
+        "retained_mb": round(retained / 2 ** 20, 1)
+    }
+
+
+def benchmark(keys: int, max_keys: int, max_requests: int = 30, time_window: int = 60) -> Dict:
+    """
+    Compare the limiters on two workloads
+
+    - distinct: `keys` clients sending one request each (memory growth)
+    - hot: 1000 clients sending max_requests requests each (a full window)
+
+    Returns:
+        Dictionary of workload -> limiter -> {"ns_per_check", "retained_mb"}
+    """
+    distinct_keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(keys)]
+    hot_keys = distinct_keys[:1000]
+    limiters = {
+        "sliding_window": lambda: _sliding_window(max_requests, time_window),
+        f"token_bucket_max_keys_{max_keys}": lambda: _token_bucket(max_keys, max_requests, time_window),
+        f"token_bucket_max_keys_{keys}": lambda: _token_bucket(keys, max_requests, time_window)
+    }
+    return {
+        "distinct": {name: _run(make, distinct_keys, 1) for name, make in limiters.items()},
+        "hot": {name: _run(make, hot_keys, max_requests) for name, make in limiters.items()}
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the token-bucket rate limiter against the sliding window")
+    parser.add_argument("--keys", type=int, default=1000000)
+    parser.add_argument("--max-keys", type=int, default=100000)
+    args = parser.parse_args()
+
+    for workload, results in benchmark(args.keys, args.max_keys).items():
+        for limiter, result in results.items():
+            print(f"📊 {workload:>8} {limiter}: {result['ns_per_check']} ns/check, {result['retained_mb']} MB retained")
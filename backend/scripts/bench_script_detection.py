@@ -0,0 +1,121 @@
+"""
+Script Detection Benchmark
+Compares utils.language.detect_mixed_indian_language with the eight
+per-script any() scans it replaced, on English, romanized, native-script
+and code-mixed messages in every supported Indic script.
+
+Usage:
+    python -m scripts.bench_script_detection [--messages 5000] [--length 300] [--repeats 5]
+"""
+import argparse
+import random
+import time
+from typing import Callable, Dict, List
+from utils.language import detect_mixed_indian_language
+
+
+def baseline_detect_mixed_indian_language(text: str) -> str:
+    """The previous implementation: one any() scan per script, in priority order"""
+    if any('\u0c00' <= char <= '\u0c7f' for char in text):
+        return 'te'
+    if any('\u0900' <= char <= '\u097f' for char in text):
+        return 'hi'
+    if any('\u0980' <= char <= '\u09ff' for char in text):
+        return 'bn'
+    if any('\u0b80' <= char <= '\u0bff' for char in text):
+        return 'ta'
+    if any('\u0a80' <= char <= '\u0aff' for char in text):
+        return 'gu'
+    if any('\u0c80' <= char <= '\u0cff' for char in text):
+        return 'kn'
+    if any('\u0d00' <= char <= '\u0d7f' for char in text):
+        return 'ml'
+    if any('\u0a00' <= char <= '\u0a7f' for char in text):
+        return 'pa'
+    return None
+
+
+ENGLISH_WORDS = "please explain how the weather will be tomorrow and what I should wear for the trip".split()
+ROMANIZED_WORDS = "mujhe kal ka mausam batao aur kya pehnna chahiye yaar bahut garmi hai".split()
+NATIVE_WORDS = {
+    "hi": "मुझे कल का मौसम बताओ और क्या पहनना चाहिए".split(),
+    "bn": "আমাকে আগামীকালের আবহাওয়া বলো এবং কী পরব".split(),
+    "pa": "ਮੈਨੂੰ ਕੱਲ੍ਹ ਦਾ ਮੌਸਮ ਦੱਸੋ ਅਤੇ ਕੀ ਪਹਿਨਣਾ ਚਾਹੀਦਾ".split(),
+    "gu": "મને કાલનું હવામાન કહો અને શું પહેરવું જોઈએ".split(),
+    "ta": "நாளை வானிலை எப்படி இருக்கும் என்ன அணிய வேண்டும்".split(),
+    "te": "రేపు వాతావరణం ఎలా ఉంటుంది ఏమి ధరించాలి".split(),
+    "kn": "ನಾಳೆ ಹವಾಮಾನ ಹೇಗಿರುತ್ತದೆ ಏನು ಧರಿಸಬೇಕು".split(),
+    "ml": "നാളെ കാലാവസ്ഥ എങ്ങനെ ആയിരിക്കും എന്ത് ധരിക്കണം".split(),
+}
+
+
+def _sentence(rng: random.Random, words: List[str], length: int) -> str:
+    parts = []
+    while sum(len(part) + 1 for part in parts) < length:
+        parts.append(rng.choice(words))
+    return " ".join(parts)
+
+
+def make_corpus(messages: int, length: int, seed: int = 7) -> Dict[str, List[str]]:
+    """
+    Messages of roughly `length` characters, grouped by kind
+
+    - english / romanized: no Indic characters at all
+    - native: one Indic script throughout
+    - code_mixed: English with a single Indic word near the end
+
+    Returns:
+        Dictionary of kind to list of messages
+    """
+    rng = random.Random(seed)
+    scripts = list(NATIVE_WORDS)
+    corpus = {"english": [], "romanized": [], "native": [], "code_mixed": []}
+    for index in range(messages):
+        script = scripts[index % len(scripts)]
+        corpus["english"].append(_sentence(rng, ENGLISH_WORDS, length))
+        corpus["romanized"].append(_sentence(rng, ROMANIZED_WORDS, length))
+        corpus["native"].append(_sentence(rng, NATIVE_WORDS[script], length))
+        corpus["code_mixed"].append(f"{_sentence(rng, ENGLISH_WORDS, length)} {rng.choice(NATIVE_WORDS[script])} please")
+    return corpus
+
+
+def _best_seconds(func: Callable[[str], str], texts: List[str], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def benchmark(corpus: Dict[str, List[str]], repeats: int) -> Dict:
+    """
+    Time both implementations on each kind of message and on the whole corpus
+
+    Returns:
+        Dictionary of kind to {"baseline_us", "current_us", "speedup"} per message
+    """
+    kinds = dict(corpus, all=[text for texts in corpus.values() for text in texts])
+    results = {}
+    for kind, texts in kinds.items():
+        assert [detect_mixed_indian_language(text) for text in texts] == [baseline_detect_mixed_indian_language(text) for text in texts]
+        baseline = _best_seconds(baseline_detect_mixed_indian_language, texts, repeats)
+        current = _best_seconds(detect_mixed_indian_language, texts, repeats)
+        results[kind] = {
+            "baseline_us": round(baseline / len(texts) * 1e6, 2),
+            "current_us": round(current / len(texts) * 1e6, 2),
+            "speedup": round(baseline / current, 1)
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Indic script detection against the per-script scans")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--length", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for kind, result in benchmark(make_corpus(args.messages, args.length), args.repeats).items():
+        print(f"📊 {kind:>10}: {result['baseline_us']} us -> {result['current_us']} us per message ({result['speedup']}x)")
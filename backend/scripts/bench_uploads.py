@@ -0,0 +1,145 @@
+"""
+Upload Memory Benchmark
+Compares peak memory of concurrent /image-chat uploads read into bytes
+(read_all) with the spool-decoding path in utils.uploads (streaming).
+Each path runs in its own process so the peaks do not mask each other.
+
+Usage:
+    python -m scripts.bench_uploads [--uploads 50] [--size-mb 10]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict
+from fastapi import UploadFile
+from PIL import Image
+from utils.concurrency import run_blocking
+from utils.image_processing import PreprocessedImage, preprocess_image
+from utils.uploads import SPOOL_MAX_SIZE, validate_image_upload, decode_image_upload
+
+
+class _AnonymousMemorySampler:
+    """Samples the process's anonymous RSS (heap, not page cache) in the background"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.baseline_kb = self._read()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self._read())
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _read() -> int:
+        try:
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith("RssAnon:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+
+def _spooled_upload(data: bytes) -> UploadFile:
+    """An UploadFile spooled the way Starlette's multipart parser does it"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for start in range(0, len(data), 64 * 1024):
+        spool.write(data[start:start + 64 * 1024])
+    spool.seek(0)
+    return UploadFile(file=spool, size=len(data), filename="upload.jpg")
+
+
+async def _read_all_path(upload: UploadFile) -> PreprocessedImage:
+    image_bytes = await upload.read()
+    return await run_blocking(preprocess_image, image_bytes)
+
+
+async def _streaming_path(upload: UploadFile) -> PreprocessedImage:
+    await validate_image_upload(upload, max_bytes=upload.size)
+    return await decode_image_upload(upload)
+
+
+def benchmark(path: str, data: bytes, uploads: int) -> Dict:
+    """Peak anonymous memory while preprocessing `uploads` concurrent uploads"""
+    ingest = _read_all_path if path == "read_all" else _streaming_path
+
+    async def run():
+        files = [_spooled_upload(data) for _ in range(uploads)]
+        try:
+            with _AnonymousMemorySampler() as sampler:
+                started_at = time.perf_counter()
+                await asyncio.gather(*(ingest(upload) for upload in files))
+                elapsed = time.perf_counter() - started_at
+        finally:
+            for upload in files:
+                upload.file.close()
+        return {
+            "path": path,
+            "uploads": uploads,
+            "upload_mb": round(len(data) / 1_000_000, 1),
+            "peak_extra_mb": round((sampler.peak_kb - sampler.baseline_kb) / 1024, 1),
+            "seconds": round(elapsed, 2)
+        }
+
+    return asyncio.run(run())
+
+
+def _benchmark_upload(size_mb: float) -> bytes:
+    """A noisy JPEG of roughly size_mb megabytes"""
+    side = 1024
+    while True:
+        noise = Image.effect_noise((side, side), 80)
+        image = Image.merge("RGB", [noise, noise.rotate(90), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)])
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=95)
+        if buffer.tell() >= size_mb * 1_000_000 * 0.9 or side >= 8192:
+            return buffer.getvalue()
+        side = int(side * 1.25)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare peak memory of reading uploads into bytes vs decoding from the spool")
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=10.0)
+    parser.add_argument("--path", choices=["read_all", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--sample", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.path:
+        # Child process: one path per process so peaks do not mask each other
+        with open(args.sample, "rb") as sample_file:
+            print(json.dumps(benchmark(args.path, sample_file.read(), args.uploads)))
+        sys.exit(0)
+
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as sample_file:
+        sample_file.write(_benchmark_upload(args.size_mb))
+    try:
+        for path in ("read_all", "streaming"):
+            output = subprocess.run(
+                [sys.executable, "-m", "scripts.bench_uploads", "--path", path, "--sample", sample_file.name,
+                 "--uploads", str(args.uploads)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            print(f"📊 {json.loads(output.strip().splitlines()[-1])}")
+    finally:
+        os.unlink(sample_file.name)
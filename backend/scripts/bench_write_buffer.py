@@ -0,0 +1,61 @@
+"""
+Write-Behind Benchmark
+Compares insert_one per document with the write-behind buffer
+(services.write_buffer) against the configured MongoDB.
+
+Usage:
+    python -m scripts.bench_write_buffer [--documents 2000] [--batch-size 100]
+"""
+import argparse
+import time
+from typing import Dict
+import services.db_service as db_service
+from config.settings import WRITE_BEHIND_BATCH_SIZE
+from services.write_buffer import WriteBehindBuffer
+
+
+def benchmark(db, documents: int, batch_size: int) -> Dict:
+    """
+    Compare insert_one per document with the write-behind buffer
+
+    Both runs write to a scratch collection that is dropped afterwards.
+
+    Returns:
+        Dictionary of ops/sec for each mode
+    """
+    collection_name = "write_buffer_benchmark"
+    sample = {"session_id": "benchmark", "user_input": "x" * 200, "bot_response": "y" * 1500}
+    results = {}
+    try:
+        db[collection_name].drop()
+        started_at = time.perf_counter()
+        for _ in range(documents):
+            db[collection_name].insert_one(dict(sample))
+        results["insert_one_ops_per_sec"] = round(documents / (time.perf_counter() - started_at), 1)
+
+        db[collection_name].drop()
+        buffer = WriteBehindBuffer(collection_name, batch_size=batch_size, max_pending=documents + 1)
+        buffer.start(lambda: db)
+        started_at = time.perf_counter()
+        for _ in range(documents):
+            buffer.add(dict(sample))
+        buffer.stop()
+        results["write_behind_ops_per_sec"] = round(documents / (time.perf_counter() - started_at), 1)
+    finally:
+        db[collection_name].drop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark insert_one against write-behind batching")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=WRITE_BEHIND_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db_service.initialize_mongodb()
+    database = db_service.get_db()
+    if database is None:
+        raise SystemExit("MongoDB unavailable")
+
+    for mode, ops in benchmark(database, args.documents, args.batch_size).items():
+        print(f"📊 {mode}: {ops}")
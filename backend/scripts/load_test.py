@@ -0,0 +1,152 @@
+"""
+Load Test
+Drives the whole FastAPI app with concurrent /chat or /chat/stream
+requests and reports throughput, latency percentiles and errors.
+
+By default the app runs in-process behind httpx's ASGI transport,
+including its lifespan, with LLM_PROVIDER=fake so no Gemini calls are
+made (tune the fake through the FAKE_LLM_* settings). MongoDB is used if
+MONGODB_URI is reachable; otherwise the app falls back to in-memory mode.
+With --url the requests go to a running server instead. Start it with
+LLM_PROVIDER=fake and a high RATE_LIMIT_MAX_REQUESTS. Time to first
+streamed chunk is only reported with --url, because the ASGI transport
+buffers response bodies.
+
+Usage:
+    python -m scripts.load_test [--requests 2000] [--concurrency 100] [--endpoint chat|stream]
+                                [--unique-messages 500] [--sessions 0] [--url http://localhost:8001]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+
+async def _send(client, endpoint: str, payload: Dict) -> Dict:
+    """One request; for streams the first-chunk latency is recorded too"""
+    started_at = time.perf_counter()
+    first_chunk = None
+    error_event = False
+    try:
+        if endpoint == "stream":
+            async with client.stream("POST", "/chat/stream", json=payload) as response:
+                async for line in response.aiter_lines():
+                    if first_chunk is None and line.startswith("data:"):
+                        first_chunk = time.perf_counter() - started_at
+                    if line.startswith("event: error"):
+                        error_event = True
+                status = response.status_code
+        else:
+            response = await client.post("/chat", json=payload)
+            status = response.status_code
+    except Exception as e:
+        return {"status": type(e).__name__, "seconds": time.perf_counter() - started_at, "first_chunk": None}
+
+    if error_event:
+        status = f"{status} (error event)"
+    return {"status": status, "seconds": time.perf_counter() - started_at, "first_chunk": first_chunk}
+
+
+async def run_load(client, endpoint: str, requests: int, concurrency: int, unique_messages: int, sessions: int) -> Dict:
+    """
+    Send `requests` requests from `concurrency` concurrent workers
+
+    Args:
+        client: httpx.AsyncClient pointed at the app
+        endpoint: "chat" or "stream"
+        requests: Total number of requests
+        concurrency: Requests in flight at once
+        unique_messages: Size of the message pool (smaller pools repeat prompts)
+        sessions: Number of session ids to spread requests over (0 = new session each)
+
+    Returns:
+        Throughput, latency percentiles and status counts
+    """
+    counter = iter(range(requests))
+    results = []
+
+    async def worker():
+        for index in counter:
+            payload = {"message": f"Explain topic number {index % unique_messages} in simple terms"}
+            if sessions:
+                payload["session_id"] = f"loadtest-{index % sessions}"
+            results.append(await _send(client, endpoint, payload))
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+
+    statuses = Counter(str(result["status"]) for result in results)
+    succeeded = [result["seconds"] for result in results if result["status"] == 200]
+    first_chunks = [result["first_chunk"] for result in results if result["first_chunk"] is not None]
+    report = {
+        "endpoint": endpoint,
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "statuses": dict(statuses),
+        "latency_ms": {f"p{p}": round(_percentile(succeeded, p) * 1000, 1) for p in (50, 95, 99)}
+    }
+    if endpoint == "stream":
+        report["first_chunk_ms"] = {f"p{p}": round(_percentile(first_chunks, p) * 1000, 1) for p in (50, 95, 99)}
+    return report
+
+
+async def main(args) -> Optional[Dict]:
+    import httpx
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            return await run_load(client, args.endpoint, args.requests, args.concurrency, args.unique_messages, args.sessions)
+
+    from main import app
+    from services.ai_service import get_text_provider
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            report = await run_load(client, args.endpoint, args.requests, args.concurrency, args.unique_messages, args.sessions)
+    # ASGITransport hands over a response only once its body is complete
+    report.pop("first_chunk_ms", None)
+    provider = get_text_provider()
+    if hasattr(provider, "get_stats"):
+        report["provider"] = provider.get_stats()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the chat endpoints, offline with the fake LLM provider")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--endpoint", choices=["chat", "stream"], default="chat")
+    parser.add_argument("--unique-messages", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--url", help="test a running server instead of an in-process app")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's per-request logging")
+    args = parser.parse_args()
+
+    # In-process defaults: fake LLM, no per-IP throttling of the single test client
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", str(10 ** 9))
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "2000")
+
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(sys.stdout if args.verbose or args.url else devnull):
+            report = asyncio.run(main(args))
+    print(f"📊 {report}")
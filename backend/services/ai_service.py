@@ -1,33 +1,59 @@
 """
 AI Service Module
-Handles all Gemini API interactions and AI model operations
+Handles all LLM interactions through the configured provider
+(services.llm_providers: Gemini, or a local fake for load testing)
+
+Providers are created on first use, so importing this module is cheap and
+has no side effects.
 """
-import google.generativeai as genai
+import hashlib
+import threading
 from PIL import Image
-from config.settings import GEMINI_API_KEY
+from config.settings import GEMINI_API_KEY, LLM_PROVIDER, LLM_SINGLE_FLIGHT_ENABLED
+import services.prompt_templates as prompt_templates
+from services.llm_providers import LLMProvider, create_provider
+from services.single_flight import SingleFlight
+
+
+# Returned when the model produces no text (e.g. a safety-blocked completion)
+FALLBACK_RESPONSE = "Sorry, I couldn't generate a response."
 
+# LLM providers (created lazily by get_text_provider / get_vision_provider)
+_text_provider = None
+_vision_provider = None
+_provider_lock = threading.Lock()
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
+# Concurrent text requests with an identical prompt share one upstream call
+text_flight = SingleFlight(enabled=LLM_SINGLE_FLIGHT_ENABLED)
 
-# Initialize Gemini models
-text_model = genai.GenerativeModel('gemini-flash-latest')
-vision_model = genai.GenerativeModel('gemini-flash-latest')
+
+def _init_providers():
+    """Build the text and vision providers once"""
+    global _text_provider, _vision_provider
+    
+    with _provider_lock:
+        if _text_provider is None:
+            _vision_provider = create_provider(LLM_PROVIDER)
+            _text_provider = create_provider(LLM_PROVIDER)
 
 
-def get_text_model():
-    """Get the text model instance"""
-    return text_model
+def get_text_provider() -> LLMProvider:
+    """Get the text provider instance"""
+    if _text_provider is None:
+        _init_providers()
+    return _text_provider
 
 
-def get_vision_model():
-    """Get the vision model instance"""
-    return vision_model
+def get_vision_provider() -> LLMProvider:
+    """Get the vision provider instance"""
+    if _vision_provider is None:
+        _init_providers()
+    return _vision_provider
 
 
 def generate_text_response(prompt: str) -> str:
     """
-    Generate text response using Gemini text model
+    Generate text response using the text provider
     
     Args:
         prompt: The full prompt to send to the model
@@ -35,13 +61,13 @@ def generate_text_response(prompt: str) -> str:
     Returns:
         Generated text response
     """
-    response = text_model.generate_content(prompt)
-    return response.text if response.text else "Sorry, I couldn't generate a response."
+    response_text = get_text_provider().generate(prompt)
+    return response_text if response_text else FALLBACK_RESPONSE
 
 
 def generate_vision_response(prompt: str, image: Image.Image) -> str:
     """
-    Generate response using Gemini vision model with image
+    Generate response using the vision provider with image
     
     Args:
         prompt: The text prompt to send with the image
@@ -50,26 +76,97 @@ def generate_vision_response(prompt: str, image: Image.Image) -> str:
     Returns:
         Generated text response
     """
-    response = vision_model.generate_content([prompt, image])
-    return response.text
+    return get_vision_provider().generate([prompt, image])
+
+
+def _flight_key(prompt: str, provider: LLMProvider) -> str:
+    """Single-flight key: the fully built prompt and the provider it is sent to"""
+    return f"{id(provider)}:" + hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+
+
+async def generate_text_response_async(prompt: str, provider: LLMProvider = None, template=None) -> str:
+    """
+    Generate text response without blocking the event loop
+    
+    Concurrent calls with the same prompt await one upstream request.
+    
+    Args:
+        prompt: The full prompt to send to the model
+        provider: Text provider to use (defaults to the shared text provider)
+        template: PromptTemplate the prompt was rendered from, enabling context caching
+    
+    Returns:
+        Generated text response
+    """
+    provider = provider or get_text_provider()
+    
+    async def generate():
+        response_text = await provider.generate_async(prompt, template=template)
+        return response_text if response_text else FALLBACK_RESPONSE
+    
+    return await text_flight.do(_flight_key(prompt, provider), generate)
+
+
+async def stream_text_response(prompt: str, provider: LLMProvider = None, template=None):
+    """
+    Stream a text response chunk by chunk
+    
+    Concurrent streams with the same prompt share one upstream stream.
+    Closing the generator (e.g. when the client disconnects) stops
+    consuming the upstream stream once no other subscriber is left, so
+    generation is abandoned.
+    
+    Args:
+        prompt: The full prompt to send to the model
+        provider: Text provider to use (defaults to the shared text provider)
+        template: PromptTemplate the prompt was rendered from, enabling context caching
+    
+    Yields:
+        Text fragments as they are produced
+    """
+    provider = provider or get_text_provider()
+    subscription = text_flight.stream(_flight_key(prompt, provider), lambda: provider.stream(prompt, template=template))
+    try:
+        async for chunk_text in subscription:
+            yield chunk_text
+    finally:
+        await subscription.aclose()
+
+
+async def generate_vision_response_async(prompt: str, image, provider: LLMProvider = None, template=None) -> str:
+    """
+    Generate vision response without blocking the event loop
+    
+    Args:
+        prompt: The text prompt to send with the image
+        image: PIL Image object, or an inline {"mime_type", "data"} blob
+            (see utils.image_processing)
+        provider: Vision provider to use (defaults to the shared vision provider)
+        template: PromptTemplate the prompt was rendered from, enabling context caching
+    
+    Returns:
+        Generated text response
+    """
+    provider = provider or get_vision_provider()
+    return await provider.generate_async([prompt, image], template=template)
 
 
 def test_gemini_connection() -> dict:
     """
-    Test Gemini API connection
+    Test the LLM provider connection
     
     Returns:
         Dictionary with status and response
     """
     try:
-        if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
+        if LLM_PROVIDER == 'gemini' and (not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here"):
             return {"status": "error", "message": "Gemini API key not configured"}
         
         # Test simple request
-        response = text_model.generate_content("Say hello")
-        return {"status": "success", "message": "Gemini API working", "response": response.text}
+        response_text = get_text_provider().generate("Say hello")
+        return {"status": "success", "message": f"{LLM_PROVIDER} provider working", "response": response_text}
     except Exception as e:
-        return {"status": "error", "message": f"Gemini API error: {str(e)}"}
+        return {"status": "error", "message": f"{LLM_PROVIDER} provider error: {str(e)}"}
 
 
 def build_chat_prompt(
@@ -85,55 +182,21 @@ def build_chat_prompt(
 ) -> str:
     """
     Build personalized system prompt for chat
-    """
-    if should_display and detected_lang != 'en':
-        system_prompt = f"""You are an intelligent AI assistant.
-Your goal is to be helpful, harmless, and honest.
-
-Key Behavior:
-- Be helpful and direct. Skip wordy intros like "I can help" or "Great question".
-- CONCISE BY DEFAULT: Get straight to the answer. Avoid fluff to save tokens.
-- Match user's energy and format (list vs paragraph) without over-explaining.
-
-Learned Preferences:
-- Format: {learned_format_pref}
-- Tone: {learned_formality}
-- Topics: {', '.join(learned_topics[:3]) if learned_topics else "None yet"}
-
-Language Rules:
-- User is speaking: {language_name} ({detected_lang})
-- RESPOND ONLY IN {language_name.upper()}.
-- Match their dialect/script exactly (e.g., Hinglish).
-
-Context:
-{f"Recent conversation:{chr(10)}{recent_context}{chr(10)}" if recent_context else ""}
-User Message: """
-    else:
-        from config.settings import LANGUAGE_NAMES
-        system_prompt = f"""You are an intelligent AI assistant.
-Your goal is to be helpful, harmless, and honest.
-
-Key Behavior:
-- Be direct and efficient. Do not use filler introductions or small talk.
-- CONCISE BY DEFAULT: Provide the solution or answer immediately to save tokens.
-- Match user's investment level. Short question = short, direct answer.
-
-Learned Preferences:
-- Format: {learned_format_pref}
-- Tone: {learned_formality}
-- Topics: {', '.join(learned_topics[:3]) if learned_topics else "None yet"}
-
-Language Rules:
-- {f"User is mixing {LANGUAGE_NAMES.get(mixed_lang, mixed_lang)} with English." if mixed_lang else "User is speaking English."}
-- Match their language style exactly.
-
-Context:
-{f"Recent conversation:{chr(10)}{recent_context}{chr(10)}" if recent_context else ""}
-User Message: """
     
-    # Combine system prompt with user message
-    full_prompt = system_prompt + text.strip()
-    return full_prompt
+    The static part of the prompt is pre-rendered once per language variant
+    (see services.prompt_templates); only the dynamic slots are filled here.
+    """
+    return prompt_templates.render_chat_prompt(
+        text=text,
+        language_name=language_name,
+        detected_lang=detected_lang,
+        should_display=should_display,
+        learned_format_pref=learned_format_pref,
+        learned_formality=learned_formality,
+        learned_topics=learned_topics,
+        recent_context=recent_context,
+        mixed_lang=mixed_lang
+    )
 
 
 def build_vision_prompt(
@@ -156,102 +219,10 @@ def build_vision_prompt(
     Returns:
         Vision system prompt string
     """
-    if should_display and detected_lang != 'en':
-        vision_system_prompt = f"""You are an intelligent AI assistant that analyzes images while perfectly adapting to the user's communication style and needs.
-
-🌍 CRITICAL LANGUAGE & CULTURAL RULES:
-- The user is speaking in {language_name} (code: {detected_lang})
-- **ABSOLUTE REQUIREMENT: RESPOND ONLY IN {language_name.upper()}** 
-- If user mixes languages, match their EXACT mixed style
-- Never respond in a different language unless specifically asked to translate
-- Use culturally relevant references from their region
-
-🔄 TRANSLATION EXCEPTION:
-- ONLY if the user explicitly asks for translation, then provide it
-- Otherwise, ALWAYS respond in {language_name}
-
-ADAPTIVE IMAGE ANALYSIS:
-- ANALYZE their request style: Simple curiosity or detailed analysis?
-- SIMPLE requests ("What's this?", "Describe this") = Brief, natural description matching their tone
-- DETAILED requests ("Analyze this image", "Tell me everything") = Full structured format
-- CASUAL tone = Relaxed, conversational description with minimal formatting
-- PROFESSIONAL context = Organized, structured analysis with appropriate sections
-
-SMART FORMATTING (Use based on their request complexity):
-- For SIMPLE questions: Natural description, minimal structure
-- For COMPLEX analysis: Use **bold**, emojis 📸🎨🔍, sections, bullet points
-- For TECHNICAL requests: Focus on relevant technical details with clear organization
-- For EMOTIONAL/PERSONAL requests: Match their energy and use appropriate emojis
-
-RESPONSE APPROACH & TOKEN EFFICIENCY:
-- **NO INTRODUCTORY FLUFF**: Do not start with "I can help you with that" or "This image looks interesting". Start the description immediately.
-- **MATCH INVESTMENT**: SHORT curiosity = SHORT, 1-2 sentence answer.
-- **DETAILED analysis request** = Full structured breakdown.
-- Be honest about unclear elements. No filler words.
-
-**FINAL INSTRUCTION: RESPOND IN {language_name.upper()} ONLY** (unless specifically asked to translate). Match their exact language pattern and request style. User's request about this image: """ + text
-    else:
-        from config.settings import LANGUAGE_NAMES
-        # For English or mixed language image requests  
-        vision_system_prompt = f"""You are an intelligent AI assistant that analyzes images while perfectly adapting to the user's communication style and needs.
-
-🌍 CRITICAL LANGUAGE RULES:
-{"- **MIXED LANGUAGE DETECTED**: User is mixing " + LANGUAGE_NAMES.get(mixed_lang, mixed_lang) + " with English" if mixed_lang else "- **PRIMARY LANGUAGE**: English"}
-- **ABSOLUTE REQUIREMENT: Match the user's EXACT language pattern**
-- If they mix languages (Hinglish, Tenglish, etc.), respond in the SAME mixed style
-- If they write pure English, respond in English
-- Never randomly switch to other languages unless asked for translation
-
-🔄 TRANSLATION EXCEPTION:
-- ONLY if user explicitly asks for translation, provide it
-- Otherwise, ALWAYS match their language pattern exactly
-
-ADAPTIVE IMAGE ANALYSIS:
-- ANALYZE their request style: Simple curiosity or detailed analysis?
-- SIMPLE requests ("What's this?", "Describe this") = Brief, natural description matching their tone
-- DETAILED requests ("Analyze this image", "Tell me everything") = Full structured format
-- CASUAL tone = Relaxed, conversational description with minimal formatting  
-- PROFESSIONAL context = Organized, structured analysis with appropriate sections
-
-MANDATORY SYSTEMATIC IMAGE ANALYSIS:
-- **NEVER write in paragraphs** for image descriptions
-- **ALWAYS use this exact format:**
-
-**📸 1. Main Subject**
-- Key observation 1
-- Key observation 2
-
-**🎨 2. Visual Details**
-- Color details
-- Composition details
-
-**🔍 3. Context & Setting**
-- Environment details
-- Background elements
-
-- **Use numbered sections with emojis and bold headings**
-- **Use bullet points under each section**
-- **No paragraph descriptions allowed**
-- **ONLY use paragraphs** if user specifically says "describe in paragraph form"
-
-TOKEN-EFFICIENT & DIRECT RESPONSES:
-- **NO SMALL TALK**: Don't say "I've analyzed the image" or "Sure, here's what I see".
-- **START IMMEDIATELY**: Begin with the first section or description line.
-- SHORT question = SHORT answer. don't over-explain if curiosity is simple.
-- Match their investment level with your response depth.
-
-CONVERSATION STYLE MATCHING:
-- Match the user's energy and speaking style completely
-- If they're casual, be casual back with natural language
-- If they mix languages or use slang, mirror that naturally
-- Be enthusiastic when they're excited, professional when they're formal
-- Ask follow-ups only when it fits their conversation style
-
-**FINAL LANGUAGE INSTRUCTION:**
-{f"- **RESPOND IN MIXED {LANGUAGE_NAMES.get(mixed_lang, mixed_lang).upper()} + ENGLISH** (match their exact mixed pattern)" if mixed_lang else "- **RESPOND IN ENGLISH** (unless specifically asked to translate)"}
-- Never randomly switch languages - match their exact input pattern
-- If they ask for translation, provide it; otherwise stick to their language style
-
-Use systematic structure by default - organize information clearly with headings and bullets. User's request about this image: """ + text
-    
-    return vision_system_prompt
+    return prompt_templates.render_vision_prompt(
+        text=text,
+        language_name=language_name,
+        detected_lang=detected_lang,
+        should_display=should_display,
+        mixed_lang=mixed_lang
+    )
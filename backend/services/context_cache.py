@@ -0,0 +1,181 @@
+"""
+Context Cache Manager
+Serves the static prefix of each system prompt variant from a Gemini
+cached content so repeated requests do not pay its input tokens and
+prefill time again.
+
+A cached content is created per prompt variant on first use, its TTL is
+extended shortly before it expires, and the request then only sends the
+rest of the prompt. The cache is created for CONTEXT_CACHE_MODEL, the
+same model regular requests use. Variants whose static prefix is below
+CONTEXT_CACHE_MIN_TOKENS are never cached (Gemini rejects small caches);
+services.prompt_templates adds style examples to every variant's prefix
+when caching is enabled so that they qualify.
+If a cache cannot be created, has expired or is rejected, the request
+falls back to the full prompt on the regular model.
+"""
+import asyncio
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+from config.settings import (
+    CONTEXT_CACHE_ENABLED,
+    CONTEXT_CACHE_MODEL,
+    CONTEXT_CACHE_TTL_SECONDS,
+    CONTEXT_CACHE_MIN_TOKENS
+)
+from utils.concurrency import run_blocking
+
+
+# Errors from a cached-content request that mean the cache itself is gone
+# or unusable, so retrying with the full prompt is worthwhile
+CACHE_ERRORS = {"NotFound", "PermissionDenied", "FailedPrecondition", "InvalidArgument"}
+
+
+class _CachedVariant:
+    __slots__ = ("cached_content", "model", "expires_at")
+
+    def __init__(self, cached_content, model, expires_at: float):
+        self.cached_content = cached_content
+        self.model = model
+        self.expires_at = expires_at
+
+
+class ContextCacheManager:
+    """Creates, refreshes and hands out cached-content models per prompt variant"""
+
+    def __init__(self, model_name: str, ttl_seconds: int = 3600, min_tokens: int = 1024, enabled: bool = False,
+                 refresh_margin_seconds: int = 60, retry_after_seconds: int = 300, genai=None):
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.enabled = enabled
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_after_seconds = retry_after_seconds
+        # google.generativeai, or a stand-in with its caching API; imported on first use
+        self._genai = genai
+        self._variants: Dict[str, _CachedVariant] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._stats = {"hits": 0, "created": 0, "refreshed": 0, "failures": 0, "fallbacks": 0, "too_small": 0}
+
+    async def resolve(self, template, prompt: str, model) -> Tuple[object, str]:
+        """
+        Pick the model and prompt to send for a rendered prompt
+
+        Args:
+            template: PromptTemplate the prompt was rendered from (or None)
+            prompt: Full rendered prompt
+            model: Regular model to use without a cache
+
+        Returns:
+            tuple: (model, prompt) - a cached-content model with the prompt
+            minus its cached prefix, or the inputs unchanged
+        """
+        if not self.enabled or template is None:
+            return model, prompt
+        if template.prefix_tokens < self.min_tokens:
+            self._stats["too_small"] += 1
+            return model, prompt
+
+        cached_model = await self._get_model(template)
+        if cached_model is None:
+            return model, prompt
+
+        self._stats["hits"] += 1
+        return cached_model, prompt[len(template.prefix):]
+
+    def is_cache_error(self, error: Exception) -> bool:
+        """Whether a failed cached-content request should be retried without the cache"""
+        return type(error).__name__ in CACHE_ERRORS
+
+    def invalidate(self, template, error: Exception):
+        """Drop a variant's cache after it was rejected; the next request recreates it"""
+        self._variants.pop(template.name, None)
+        self._stats["fallbacks"] += 1
+        print(f"⚠️ Context cache for {template.name} rejected, using full prompt: {error}")
+
+    def close(self):
+        """Delete every cached content (they are billed for storage until they expire)"""
+        for name, variant in list(self._variants.items()):
+            try:
+                variant.cached_content.delete()
+            except Exception as e:
+                print(f"⚠️ Failed to delete context cache {name}: {e}")
+        self._variants.clear()
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "model": self.model_name,
+            "min_tokens": self.min_tokens,
+            "cached_variants": {
+                name: round(variant.expires_at - now, 1) for name, variant in self._variants.items()
+            },
+            **self._stats
+        }
+
+    async def _get_model(self, template):
+        name = template.name
+        variant = self._variants.get(name)
+        if variant is not None and self._is_fresh(variant):
+            return variant.model
+        if self._failed_until.get(name, 0.0) > time.monotonic():
+            return None
+
+        # One create/refresh per variant at a time; other requests wait for it
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            variant = self._variants.get(name)
+            if variant is not None and self._is_fresh(variant):
+                return variant.model
+            try:
+                variant = await run_blocking(self._create_or_refresh, template, variant)
+            except Exception as e:
+                self._variants.pop(name, None)
+                self._failed_until[name] = time.monotonic() + self.retry_after_seconds
+                self._stats["failures"] += 1
+                print(f"⚠️ Failed to create context cache for {name}: {e}")
+                return None
+            self._variants[name] = variant
+            return variant.model
+
+    def _is_fresh(self, variant: _CachedVariant) -> bool:
+        return variant.expires_at - self.refresh_margin_seconds > time.monotonic()
+
+    def _create_or_refresh(self, template, variant: Optional[_CachedVariant]) -> _CachedVariant:
+        if self._genai is None:
+            import google.generativeai
+            self._genai = google.generativeai
+        genai = self._genai
+
+        ttl = timedelta(seconds=self.ttl_seconds)
+        if variant is not None:
+            try:
+                variant.cached_content.update(ttl=ttl)
+                variant.expires_at = time.monotonic() + self.ttl_seconds
+                self._stats["refreshed"] += 1
+                return variant
+            except Exception as e:
+                print(f"⚠️ Context cache for {template.name} could not be refreshed, recreating: {e}")
+
+        cached_content = genai.caching.CachedContent.create(
+            model=self.model_name,
+            display_name=template.name,
+            system_instruction=template.prefix,
+            ttl=ttl
+        )
+        model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+        self._stats["created"] += 1
+        print(f"🗄️ Created context cache for {template.name} (~{template.prefix_tokens} tokens)")
+        return _CachedVariant(cached_content, model, time.monotonic() + self.ttl_seconds)
+
+
+# Global context cache manager
+context_cache = ContextCacheManager(
+    model_name=CONTEXT_CACHE_MODEL,
+    ttl_seconds=CONTEXT_CACHE_TTL_SECONDS,
+    min_tokens=CONTEXT_CACHE_MIN_TOKENS,
+    enabled=CONTEXT_CACHE_ENABLED
+)
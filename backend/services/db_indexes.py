@@ -0,0 +1,162 @@
+"""
+MongoDB Index Management
+Creates the indexes db_service queries rely on and verifies that those
+queries are served by index scans.
+
+Usage (verify query plans against the configured database):
+    python -m services.db_indexes
+"""
+from datetime import datetime
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+
+# collection name -> indexes db_service needs on it
+INDEX_SPECS = {
+    "chat_history": [
+        # get_recent_messages / get_recent_interactions / get_session_messages,
+        # delete_session and session summary repair
+        IndexModel([("session_id", ASCENDING), ("timestamp", DESCENDING)], name="session_id_timestamp"),
+    ],
+    "sessions": [
+        # get_sessions_page / get_all_sessions
+        IndexModel([("latest_timestamp", DESCENDING), ("_id", DESCENDING)], name="latest_timestamp_id"),
+    ],
+    "learned_patterns": [
+        IndexModel([("session_id", ASCENDING)], name="session_id_unique", unique=True),
+    ],
+    "rate_limits": [
+        # Idle token buckets of the shared rate limiter expire on their own
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "response_cache": [
+        # Persistent tier of the response cache
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "image_cache": [
+        # Persistent tier of the image result cache
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "learning_jobs": [
+        # Durable learning queue replays jobs oldest first on startup
+        IndexModel([("interaction.enqueued_at", ASCENDING)], name="interaction_enqueued_at"),
+    ],
+    "user_feedback": [
+        IndexModel([("feedback_timestamp", DESCENDING)], name="feedback_timestamp"),
+        IndexModel([("session_id", ASCENDING), ("feedback_timestamp", DESCENDING)], name="session_id_feedback_timestamp"),
+    ],
+}
+
+INDEX_STAGES = {"IXSCAN", "IDHACK", "EXPRESS_IXSCAN", "EXPRESS_CLUSTERED_IXSCAN", "COUNT_SCAN", "DISTINCT_SCAN"}
+
+
+def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create all required indexes. Safe to call on every startup: existing
+    indexes with the same definition are left untouched.
+
+    Args:
+        db: pymongo Database instance
+
+    Returns:
+        Dictionary of collection name to created/confirmed index names
+    """
+    created = {}
+    for collection_name, indexes in INDEX_SPECS.items():
+        try:
+            created[collection_name] = db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate session_id values blocking the unique index
+            print(f"⚠️ Failed to create indexes on {collection_name}: {e}")
+            created[collection_name] = []
+    print(f"📇 MongoDB indexes ensured for {', '.join(created)}")
+    return created
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    """Flatten the stage names of an explain() plan tree"""
+    stages = [plan.get("stage")] if plan.get("stage") else []
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def _winning_stages(explain_result: Dict) -> List[str]:
+    planner = explain_result.get("queryPlanner", {})
+    return _plan_stages(planner.get("winningPlan", {}))
+
+
+def planned_queries(db, sample_session_id: str = "index-check") -> Dict:
+    """
+    The queries db_service and the learning queue issue, as unexecuted cursors
+
+    Args:
+        db: pymongo Database instance
+        sample_session_id: Session identifier used in query filters
+
+    Returns:
+        Dictionary of query name to cursor
+    """
+    chat = db.chat_history
+    before = datetime(2025, 1, 1)
+    return {
+        "get_recent_messages": chat.find({"session_id": sample_session_id}).sort("timestamp", -1).limit(20),
+        "get_session_messages": chat.find({"session_id": sample_session_id}).sort("timestamp", 1),
+        "get_session_messages_page": chat.find({"session_id": sample_session_id}).sort("timestamp", -1).limit(50),
+        "get_session_messages_page_before": chat.find(
+            {"session_id": sample_session_id, "timestamp": {"$lt": before}}
+        ).sort("timestamp", -1).limit(50),
+        "get_interaction_by_id": chat.find({"_id": sample_session_id}).limit(1),
+        "delete_session": chat.find({"session_id": sample_session_id}),
+        "get_sessions_page": db.sessions.find({}).sort([("latest_timestamp", -1), ("_id", -1)]).limit(20),
+        "get_sessions_page_before": db.sessions.find({"$or": [
+            {"latest_timestamp": {"$lt": before}},
+            {"latest_timestamp": before, "_id": {"$lt": sample_session_id}}
+        ]}).sort([("latest_timestamp", -1), ("_id", -1)]).limit(20),
+        "get_learned_preferences": db.learned_patterns.find({"session_id": sample_session_id}).limit(1),
+        "calculate_learning_effectiveness": db.user_feedback.find({}).sort("feedback_timestamp", -1).limit(50),
+        "load_pending_learning_jobs": db.learning_jobs.find({}).sort("interaction.enqueued_at", 1),
+    }
+
+
+def verify_query_plans(db, sample_session_id: str = "index-check") -> Dict[str, Dict]:
+    """
+    Explain every query in planned_queries and report whether each one is
+    served by an index scan
+
+    Args:
+        db: pymongo Database instance
+        sample_session_id: Session identifier used in query filters
+
+    Returns:
+        Dictionary of query name to {"stages": [...], "uses_index": bool}
+    """
+    report = {}
+    for name, cursor in planned_queries(db, sample_session_id).items():
+        stages = _winning_stages(cursor.explain())
+        report[name] = {
+            "stages": stages,
+            "uses_index": bool(INDEX_STAGES.intersection(stages)) and "COLLSCAN" not in stages
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import services.db_service as db_service
+
+    db_service.initialize_mongodb()
+    database = db_service.get_db()
+    if database is None:
+        raise SystemExit("MongoDB unavailable")
+
+    ensure_indexes(database)
+    results = verify_query_plans(database)
+    for query_name, result in results.items():
+        marker = "✅" if result["uses_index"] else "❌"
+        print(f"{marker} {query_name}: {' <- '.join(result['stages'])}")
+    if not all(result["uses_index"] for result in results.values()):
+        raise SystemExit(1)
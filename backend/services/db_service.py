@@ -2,47 +2,132 @@
 MongoDB Database Service
 Handles all MongoDB connections, operations, and data persistence
 """
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+import threading
+import time
 import uuid
 from typing import Optional, Dict, List, Any
-from config.settings import MONGODB_URI, LANGUAGE_NAMES
-
-
-# MongoDB connection setup
+from config.settings import (
+    MONGODB_URI,
+    LANGUAGE_NAMES,
+    SESSION_CACHE_RECENT_MESSAGES,
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_MIN_POOL_SIZE,
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_CONNECT_TIMEOUT_MS,
+    MONGODB_SOCKET_TIMEOUT_MS,
+    MONGODB_READ_PREFERENCE,
+    MONGODB_WRITE_CONCERN,
+    MONGODB_RECONNECT_INTERVAL_SECONDS,
+    LEARNING_MAX_KEYWORDS
+)
+from services.session_cache import session_cache
+from services.db_indexes import ensure_indexes
+from services.pool_metrics import pool_metrics
+from services.write_buffer import chat_history_buffer, feedback_buffer
+import services.session_summaries as session_summaries
+import services.learning_service as learning_service
+
+
+# MongoDB connection setup (created by the app lifespan, see main.py)
 client = None
 db = None
 chat_collection = None
+_last_connect_attempt = 0.0
+_connect_lock = threading.Lock()
+
+# Optimistic retries of a preference counter update that raced a landmark roll
+LEARNING_UPDATE_ATTEMPTS = 5
 
 
 def initialize_mongodb():
     """Initialize MongoDB connection with proper settings"""
-    global client, db, chat_collection
+    global client, db, chat_collection, _last_connect_attempt
     
+    _last_connect_attempt = time.monotonic()
     try:
+        write_concern = int(MONGODB_WRITE_CONCERN) if MONGODB_WRITE_CONCERN.isdigit() else MONGODB_WRITE_CONCERN
+        
         # Configure MongoDB client with proper settings
         client = MongoClient(
             MONGODB_URI,
             tlsInsecure=True,  # Disable SSL certificate verification
-            serverSelectionTimeoutMS=10000,
-            connectTimeoutMS=10000,
-            socketTimeoutMS=10000,
-            maxPoolSize=1
+            serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            readPreference=MONGODB_READ_PREFERENCE,
+            w=write_concern,
+            event_listeners=[pool_metrics]
         )
         # Test the connection
         client.admin.command('ping')
-        print("✅ MongoDB connection successful")
+        print(f"✅ MongoDB connection successful (pool size {MONGODB_MIN_POOL_SIZE}-{MONGODB_MAX_POOL_SIZE})")
         db = client.guru_multibot
         chat_collection = db.chat_history
+        ensure_indexes(db)
     except Exception as e:
         print(f"❌ MongoDB connection failed: {e}")
         print("📝 Using fallback in-memory storage")
         # Fallback to in-memory storage if MongoDB fails
+        if client is not None:
+            client.close()
         client = None
         db = None
         chat_collection = None
 
 
+def reconnect_due() -> bool:
+    """Whether the app is in fallback mode and may retry connecting"""
+    return client is None and time.monotonic() - _last_connect_attempt >= MONGODB_RECONNECT_INTERVAL_SECONDS
+
+
+def ensure_connection():
+    """
+    Retry the MongoDB connection if a previous attempt failed, at most once
+    per MONGODB_RECONNECT_INTERVAL_SECONDS, so a worker that started during
+    a database outage recovers once MongoDB is reachable again
+    """
+    if not reconnect_due():
+        return
+    with _connect_lock:
+        if reconnect_due():
+            print("🔄 Retrying MongoDB connection")
+            initialize_mongodb()
+
+
+def close_mongodb():
+    """Close the MongoDB client and its connection pool"""
+    global client, db, chat_collection
+    
+    if client is not None:
+        client.close()
+        print("🔌 MongoDB connection closed")
+    client = None
+    db = None
+    chat_collection = None
+
+
+def get_write_buffer_metrics() -> Dict:
+    """Get write-behind buffer depth and throughput counters"""
+    return {
+        "chat_history": chat_history_buffer.get_stats(),
+        "user_feedback": feedback_buffer.get_stats()
+    }
+
+
+def get_pool_metrics() -> Dict:
+    """Get connection pool utilization gauges"""
+    metrics = pool_metrics.get_metrics(MONGODB_MAX_POOL_SIZE)
+    metrics["connected"] = client is not None
+    return metrics
+
+
 def get_chat_collection():
     """Get the chat collection instance"""
     return chat_collection
@@ -53,6 +138,28 @@ def get_db():
     return db
 
 
+def assign_interaction_ids(session_id: Optional[str] = None) -> tuple:
+    """
+    Assign session and interaction identifiers ahead of persistence
+    
+    Args:
+        session_id: Existing session identifier, if any
+    
+    Returns:
+        tuple: (session_id, interaction_id)
+    """
+    if not session_id:
+        session_id = str(uuid.uuid4())[:8]  # Short session ID
+        session_cache.prime_new_session(session_id)
+    
+    if chat_collection is not None:
+        interaction_id = str(uuid.uuid4())
+    else:
+        interaction_id = f"{session_id}_{int(datetime.utcnow().timestamp())}"  # Fallback ID
+    
+    return session_id, interaction_id
+
+
 def store_interaction(
     input_type: str,
     user_input: str,
@@ -62,7 +169,9 @@ def store_interaction(
     user_feedback: Optional[Dict] = None,
     input_patterns: Optional[Dict] = None,
     response_format: Optional[Dict] = None,
-    interaction_context: Optional[Dict] = None
+    interaction_context: Optional[Dict] = None,
+    interaction_id: Optional[str] = None,
+    timestamp: Optional[datetime] = None
 ) -> tuple:
     """
     Store interaction in MongoDB
@@ -77,6 +186,8 @@ def store_interaction(
         input_patterns: Analyzed input patterns
         response_format: Detected response format
         interaction_context: Contextual features
+        interaction_id: Pre-assigned interaction ID (see assign_interaction_ids)
+        timestamp: When the interaction happened (default: now)
     
     Returns:
         tuple: (session_id, interaction_id)
@@ -85,13 +196,12 @@ def store_interaction(
     if not session_id:
         session_id = str(uuid.uuid4())[:8]  # Short session ID
     
-    interaction_id = None
-    
     # Only store in MongoDB if connection is available
     if chat_collection is not None:
         try:
             # Generate a unique interaction ID
-            interaction_id = str(uuid.uuid4())
+            if not interaction_id:
+                interaction_id = str(uuid.uuid4())
             
             # Create document for MongoDB with learning data
             document = {
@@ -102,7 +212,7 @@ def store_interaction(
                 "session_id": session_id,
                 "language_code": language_code,
                 "language_name": LANGUAGE_NAMES.get(language_code, 'Unknown') if language_code else None,
-                "timestamp": datetime.utcnow(),
+                "timestamp": timestamp or datetime.utcnow(),
                 "user_feedback": user_feedback,  # Store user feedback for learning
                 "response_length": len(bot_response) if bot_response else 0,
                 "input_patterns": input_patterns,
@@ -110,16 +220,27 @@ def store_interaction(
                 "interaction_context": interaction_context
             }
             
-            # Insert into MongoDB
-            chat_collection.insert_one(document)
+            # Insert into MongoDB (batched when the write-behind buffer is running)
+            if chat_history_buffer.running:
+                chat_history_buffer.add(document)
+            else:
+                chat_collection.insert_one(document)
+            session_cache.append_message(session_id, document)
+            
+            # Keep the materialized session summary in step
+            try:
+                session_summaries.record_message(db, document)
+            except Exception as e:
+                print(f"⚠️ Failed to update session summary: {e}")
+            
             print(f"💾 Stored interaction for session {session_id} (Language: {LANGUAGE_NAMES.get(language_code, 'Unknown')})")
             
         except Exception as e:
             print(f"⚠️ Failed to store interaction: {e}")
-            interaction_id = f"{session_id}_{int(datetime.utcnow().timestamp())}"  # Fallback ID
+            interaction_id = interaction_id or f"{session_id}_{int(datetime.utcnow().timestamp())}"  # Fallback ID
     else:
         print(f"📝 In-memory mode: interaction not persisted for session {session_id}")
-        interaction_id = f"{session_id}_{int(datetime.utcnow().timestamp())}"  # Fallback ID
+        interaction_id = interaction_id or f"{session_id}_{int(datetime.utcnow().timestamp())}"  # Fallback ID
     
     return session_id, interaction_id
 
@@ -138,11 +259,13 @@ def get_recent_interactions(session_id: str, limit: int = 5) -> List[Dict]:
     if chat_collection is None:
         return []
     
+    cached = session_cache.get_recent_messages(session_id, limit)
+    if cached is not None:
+        return cached
+    
     try:
-        recent_interactions = list(chat_collection.find({
-            "session_id": session_id
-        }).sort("timestamp", -1).limit(limit))
-        return recent_interactions
+        recent_interactions = _load_recent_into_cache(session_id)
+        return recent_interactions[:limit]
     except Exception as e:
         print(f"⚠️ Failed to get recent interactions: {e}")
         return []
@@ -162,46 +285,164 @@ def get_recent_messages(session_id: str, limit: int = 3) -> List[Dict]:
     if chat_collection is None:
         return []
     
+    cached = session_cache.get_recent_messages(session_id, limit)
+    if cached is not None:
+        return cached
+    
     try:
-        recent_messages = list(chat_collection.find({
-            "session_id": session_id
-        }).sort("timestamp", -1).limit(limit))
-        return recent_messages
+        recent_messages = _load_recent_into_cache(session_id)
+        return recent_messages[:limit]
     except Exception as e:
         print(f"Error getting conversation context: {e}")
         return []
 
 
+def _load_recent_into_cache(session_id: str) -> List[Dict]:
+    """Load the session's recent-message window (newest first) and cache it"""
+    recent = list(chat_collection.find({
+        "session_id": session_id
+    }).sort("timestamp", -1).limit(SESSION_CACHE_RECENT_MESSAGES))
+    
+    # Overlay interactions still waiting in the write-behind buffer
+    buffered = chat_history_buffer.pending(lambda document: document["session_id"] == session_id)
+    if buffered:
+        stored_ids = {message["_id"] for message in recent}
+        recent.extend(message for message in buffered if message["_id"] not in stored_ids)
+        recent.sort(key=lambda message: message["timestamp"], reverse=True)
+        recent = recent[:SESSION_CACHE_RECENT_MESSAGES]
+    
+    # Merged with anything stored while the query ran
+    return session_cache.set_recent_messages(session_id, recent)
+
+
+def increment_learned_patterns(session_id: str, preference_counts: Dict, interaction_count: int,
+                               observed_at: Optional[datetime] = None) -> Optional[Dict]:
+    """
+    Atomically add decayed preference observations to a session's counters
+    
+    Counters are stored relative to the session's decay_landmark. While the
+    landmark is current this is a single $inc; when it has rolled forward
+    the counters are renormalized onto the new landmark first, and keyword
+    counters are pruned once they grow past twice LEARNING_MAX_KEYWORDS.
+    
+    Args:
+        session_id: Session identifier
+        preference_counts: {dimension: {value: count}} from learning_service.count_preferences
+        interaction_count: Number of interactions the counts cover
+        observed_at: When the interactions happened (default: now)
+    
+    Returns:
+        Updated document with preference_counts and interaction_count, or None
+    """
+    if db is None:
+        return None
+    
+    observed_at = observed_at or datetime.utcnow()
+    landmark = learning_service.decay_landmark(observed_at)
+    projection = {"preference_counts": 1, "interaction_count": 1, "decay_landmark": 1}
+    
+    try:
+        for _ in range(LEARNING_UPDATE_ATTEMPTS):
+            weight = learning_service.decay_weight(observed_at, landmark)
+            update = {
+                "$inc": {
+                    "interaction_count": interaction_count,
+                    **{
+                        f"preference_counts.{dimension}.{value}": count * weight
+                        for dimension, counts in preference_counts.items()
+                        for value, count in counts.items()
+                    }
+                },
+                "$set": {"last_updated": datetime.utcnow()}
+            }
+            # Single $inc: no read, and concurrent messages cannot lose counts
+            learned = db.learned_patterns.find_one_and_update(
+                {"session_id": session_id, "decay_landmark": landmark},
+                update,
+                projection=projection,
+                return_document=ReturnDocument.AFTER
+            )
+            if learned is not None:
+                if len(learned.get("preference_counts", {}).get("keywords", {})) > 2 * LEARNING_MAX_KEYWORDS:
+                    _renormalize_learned_patterns(session_id, learned, landmark)
+                return learned
+            
+            current = db.learned_patterns.find_one({"session_id": session_id}, projection)
+            if current is None:
+                try:
+                    return db.learned_patterns.find_one_and_update(
+                        {"session_id": session_id, "decay_landmark": landmark},
+                        update,
+                        projection=projection,
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER
+                    )
+                except DuplicateKeyError:
+                    # Another message created the session's document first
+                    continue
+            
+            current_landmark = current.get("decay_landmark")
+            if current_landmark is not None and current_landmark > landmark:
+                # Another worker already rolled the landmark forward: weigh against it
+                landmark = current_landmark
+            else:
+                _renormalize_learned_patterns(session_id, current, landmark)
+        
+        print(f"⚠️ Gave up updating preference counts for session {session_id} after {LEARNING_UPDATE_ATTEMPTS} attempts")
+        return None
+    except Exception as e:
+        print(f"⚠️ Failed to update preference counts: {e}")
+        return None
+
+
+def _renormalize_learned_patterns(session_id: str, learned: Dict, landmark: datetime):
+    """
+    Rewrite a session's counters relative to `landmark`, pruning negligible
+    and surplus keyword counters
+    
+    Conditional on interaction_count, so it is a no-op if any increment
+    landed since `learned` was read; the caller then simply retries.
+    """
+    # Documents written before landmarks existed were weighted against DECAY_EPOCH
+    previous_landmark = learned.get("decay_landmark") or learning_service.DECAY_EPOCH
+    preference_counts = learning_service.renormalize_counts(
+        learned.get("preference_counts"), previous_landmark, landmark
+    )
+    db.learned_patterns.update_one(
+        {
+            "session_id": session_id,
+            "decay_landmark": learned.get("decay_landmark"),
+            "interaction_count": learned.get("interaction_count")
+        },
+        {"$set": {"preference_counts": preference_counts, "decay_landmark": landmark}}
+    )
+
+
 def store_learned_patterns(session_id: str, user_preferences: Dict, interaction_count: int):
     """
-    Store learned patterns in a separate collection
+    Store the preferences derived from a session's counters
     
     Args:
         session_id: Session identifier
-        user_preferences: Analyzed user preferences
-        interaction_count: Number of interactions analyzed
+        user_preferences: Preferences derived from preference_counts
+        interaction_count: interaction_count the preferences were derived at
     """
     if db is None:
         return
     
+    # Skip the write when the derived preferences did not change
+    if session_cache.get_preferences(session_id) == user_preferences:
+        return
+    
     try:
-        learning_collection = db.learned_patterns
-        
-        learning_document = {
-            "session_id": session_id,
-            "user_preferences": user_preferences,
-            "last_updated": datetime.utcnow(),
-            "interaction_count": interaction_count
-        }
-        
-        # Upsert (update or insert) learning data
-        learning_collection.replace_one(
-            {"session_id": session_id},
-            learning_document,
-            upsert=True
+        # Only the derivation from the latest counters may overwrite preferences
+        result = db.learned_patterns.update_one(
+            {"session_id": session_id, "interaction_count": interaction_count},
+            {"$set": {"user_preferences": user_preferences}}
         )
-        
-        print(f"🧠 Updated learning patterns for session {session_id}")
+        if result.matched_count:
+            session_cache.set_preferences(session_id, user_preferences)
+            print(f"🧠 Updated learning patterns for session {session_id}")
         
     except Exception as e:
         print(f"⚠️ Failed to store learned patterns: {e}")
@@ -221,11 +462,16 @@ def get_learned_preferences(session_id: str) -> Dict:
         if db is None:
             return {}
         
+        cached = session_cache.get_preferences(session_id)
+        if cached is not None:
+            return cached
+        
         learning_collection = db.learned_patterns
         learned_data = learning_collection.find_one({"session_id": session_id})
         
-        if learned_data and "user_preferences" in learned_data:
-            return learned_data["user_preferences"]
+        preferences = (learned_data or {}).get("user_preferences") or {}
+        session_cache.set_preferences(session_id, preferences)
+        return preferences
         
     except Exception as e:
         print(f"⚠️ Failed to retrieve learned preferences: {e}")
@@ -243,28 +489,7 @@ def get_all_sessions(limit: int = 20) -> List[Dict]:
     Returns:
         List of session documents
     """
-    if chat_collection is None:
-        return []
-    
-    try:
-        pipeline = [
-            {"$match": {"session_id": {"$exists": True, "$ne": None}}},
-            {"$group": {
-                "_id": "$session_id",
-                "latest_timestamp": {"$max": "$timestamp"},
-                "message_count": {"$sum": 1},
-                "first_message": {"$first": "$user_input"}
-            }},
-            {"$sort": {"latest_timestamp": -1}},
-            {"$limit": limit}
-        ]
-        
-        sessions = list(chat_collection.aggregate(pipeline))
-        return sessions
-        
-    except Exception as e:
-        print(f"⚠️ Failed to get sessions: {e}")
-        return []
+    return get_sessions_page(limit=limit)["sessions"]
 
 
 def get_session_messages(session_id: str) -> List[Dict]:
@@ -299,6 +524,88 @@ def get_session_messages(session_id: str) -> List[Dict]:
         return []
 
 
+def get_sessions_page(limit: int = 20, before: Optional[tuple] = None) -> Dict:
+    """
+    Get one page of chat sessions (metadata only) ordered by latest activity
+    
+    Reads the materialized `sessions` collection maintained on write by
+    services.session_summaries.
+    
+    Args:
+        limit: Maximum number of sessions in the page
+        before: Cursor (latest_timestamp, session_id) of the last session
+            on the previous page
+    
+    Returns:
+        Dictionary with "sessions" and "total" session count
+    """
+    if db is None:
+        return {"sessions": [], "total": 0}
+    
+    query = {}
+    if before:
+        before_timestamp, before_session_id = before
+        query = {"$or": [
+            {"latest_timestamp": {"$lt": before_timestamp}},
+            {"latest_timestamp": before_timestamp, "_id": {"$lt": before_session_id}}
+        ]}
+    
+    try:
+        sessions = list(db.sessions.find(
+            query,
+            {"latest_timestamp": 1, "message_count": 1, "first_message": 1}
+        ).sort([("latest_timestamp", -1), ("_id", -1)]).limit(limit))
+        return {"sessions": sessions, "total": db.sessions.estimated_document_count()}
+        
+    except Exception as e:
+        print(f"⚠️ Failed to get sessions page: {e}")
+        return {"sessions": [], "total": 0}
+
+
+MESSAGE_PAGE_PROJECTION = {
+    "_id": 1,
+    "input_type": 1,
+    "user_input": 1,
+    "bot_response": 1,
+    "session_id": 1,
+    "language_code": 1,
+    "language_name": 1,
+    "timestamp": 1,
+    "user_feedback.feedback_type": 1
+}
+
+
+def get_session_messages_page(session_id: str, limit: int = 50, before: Optional[datetime] = None) -> List[Dict]:
+    """
+    Get one page of a session's messages, newest page first
+    
+    Args:
+        session_id: Session identifier
+        limit: Maximum number of messages in the page
+        before: Only return messages older than this timestamp
+    
+    Returns:
+        List of message documents in chronological order
+    """
+    if chat_collection is None:
+        return []
+    
+    query = {"session_id": session_id}
+    if before:
+        query["timestamp"] = {"$lt": before}
+    
+    try:
+        messages = list(chat_collection.find(
+            query, MESSAGE_PAGE_PROJECTION
+        ).sort("timestamp", -1).limit(limit))
+        messages.reverse()
+        return messages
+        
+    except Exception as e:
+        print(f"⚠️ Failed to get session messages page: {e}")
+        return []
+
+
 def delete_chat_by_id(chat_id: str) -> Dict:
     """
     Delete a specific chat history entry
@@ -313,6 +620,9 @@ def delete_chat_by_id(chat_id: str) -> Dict:
         return {"success": False, "message": "Database unavailable"}
     
     try:
+        # Make sure buffered interactions are visible to the delete
+        chat_history_buffer.flush()
+        
         # Check if the record exists
         existing_record = chat_collection.find_one({"_id": chat_id})
         if not existing_record:
@@ -320,8 +630,10 @@ def delete_chat_by_id(chat_id: str) -> Dict:
         
         # Delete the record
         result = chat_collection.delete_one({"_id": chat_id})
+        session_cache.invalidate(existing_record.get("session_id"))
         
         if result.deleted_count > 0:
+            session_summaries.record_deletion(db, existing_record)
             return {"success": True, "message": "Chat history deleted successfully"}
         else:
             return {"success": False, "message": "Failed to delete chat history"}
@@ -340,8 +652,11 @@ def delete_all_chats() -> Dict:
         return {"success": False, "message": "Database unavailable"}
     
     try:
+        chat_history_buffer.flush()
         result = chat_collection.delete_many({})
         deleted_count = result.deleted_count
+        session_cache.clear()
+        db.sessions.delete_many({})
         
         return {"success": True, "message": f"Deleted {deleted_count} chat history entries"}
     except Exception as e:
@@ -362,6 +677,8 @@ def delete_session(session_id: str) -> Dict:
         return {"success": False, "message": "Database unavailable"}
     
     try:
+        chat_history_buffer.flush()
+        
         # Check if the session exists
         count = chat_collection.count_documents({"session_id": session_id})
         
@@ -371,11 +688,13 @@ def delete_session(session_id: str) -> Dict:
         # Delete all messages in the session
         result = chat_collection.delete_many({"session_id": session_id})
         deleted_count = result.deleted_count
+        session_cache.invalidate(session_id)
         
-        # Also delete learned patterns for this session
+        # Also delete learned patterns and the session summary
         if db is not None:
             learning_collection = db.learned_patterns
             learning_collection.delete_one({"session_id": session_id})
+            session_summaries.remove_session(db, session_id)
         
         return {"success": True, "message": f"Session deleted successfully. {deleted_count} messages removed."}
     except Exception as e:
@@ -403,29 +722,46 @@ def get_interaction_by_id(interaction_id: str) -> Optional[Dict]:
         return None
 
 
-def update_interaction_feedback(interaction_id: str, feedback_data: Dict) -> bool:
+# Interaction fields feedback learning needs
+FEEDBACK_INTERACTION_PROJECTION = {
+    "session_id": 1,
+    "user_input": 1,
+    "bot_response": 1,
+    "input_patterns": 1,
+    "response_format": 1
+}
+
+
+def update_interaction_feedback(interaction_id: str, feedback_data: Dict) -> Optional[Dict]:
     """
-    Update interaction with user feedback
+    Attach user feedback to an interaction in a single round trip
     
     Args:
         interaction_id: Interaction identifier
         feedback_data: Feedback data to store
     
     Returns:
-        True if successful, False otherwise
+        The interaction's learning fields, or None if it does not exist
     """
     if chat_collection is None:
-        return False
+        return None
     
     try:
-        chat_collection.update_one(
+        # The interaction may not have left the write-behind buffer yet
+        if chat_history_buffer.pending(lambda document: document["_id"] == interaction_id):
+            chat_history_buffer.flush()
+        
+        interaction = chat_collection.find_one_and_update(
             {"_id": interaction_id},
-            {"$set": {"user_feedback": feedback_data}}
+            {"$set": {"user_feedback": feedback_data}},
+            projection=FEEDBACK_INTERACTION_PROJECTION
         )
-        return True
+        if interaction:
+            session_cache.update_message(interaction.get("session_id"), interaction_id, {"user_feedback": feedback_data})
+        return interaction
     except Exception as e:
         print(f"⚠️ Failed to update feedback: {e}")
-        return False
+        return None
 
 
 def store_feedback_analysis(feedback_analysis: Dict):
@@ -439,15 +775,18 @@ def store_feedback_analysis(feedback_analysis: Dict):
         return
     
     try:
-        feedback_collection = db.user_feedback
-        feedback_collection.insert_one(feedback_analysis)
+        if feedback_buffer.running:
+            feedback_buffer.add(feedback_analysis)
+        else:
+            feedback_collection = db.user_feedback
+            feedback_collection.insert_one(feedback_analysis)
     except Exception as e:
         print(f"⚠️ Failed to store feedback analysis: {e}")
 
 
 def update_learned_patterns_from_feedback(
     session_id: str,
-    current_patterns: Dict,
+    preference_updates: Dict,
     feedback_type: str,
     interaction: Dict,
     feedback_timestamp: datetime
@@ -455,9 +794,12 @@ def update_learned_patterns_from_feedback(
     """
     Update learned patterns based on user feedback
     
+    Applied as one atomic update, so concurrent feedback for the same
+    session cannot overwrite each other's history or preferences.
+    
     Args:
         session_id: Session identifier
-        current_patterns: Current learned patterns
+        preference_updates: Preferences changed by this feedback
         feedback_type: Type of feedback
         interaction: Interaction data
         feedback_timestamp: Timestamp of feedback
@@ -468,30 +810,7 @@ def update_learned_patterns_from_feedback(
     try:
         learning_collection = db.learned_patterns
         
-        # Update patterns based on feedback
-        user_prefs = current_patterns.get("user_preferences", {})
-        
-        if feedback_type == "format_mismatch":
-            # User didn't like the format - adjust preference
-            input_patterns = interaction.get("input_patterns", {})
-            requested_format = input_patterns.get("request_type", "unknown")
-            user_prefs["preferred_format"] = requested_format
-        
-        elif feedback_type == "too_long":
-            user_prefs["preferred_length"] = "short"
-        
-        elif feedback_type == "too_short":
-            user_prefs["preferred_length"] = "detailed"
-        
-        elif feedback_type == "thumbs_up":
-            # Reinforce current patterns
-            response_format = interaction.get("response_format", {})
-            if "format_type" in response_format:
-                user_prefs["preferred_format"] = response_format["format_type"]
-        
-        # Add feedback to history
-        feedback_history = current_patterns.get("feedback_history", [])
-        feedback_history.append({
+        feedback_entry = {
             "feedback_type": feedback_type,
             "timestamp": feedback_timestamp,
             "interaction_context": {
@@ -499,25 +818,24 @@ def update_learned_patterns_from_feedback(
                 "response_format": interaction.get("response_format", {}).get("format_type"),
                 "response_length": len(interaction.get("bot_response", ""))
             }
-        })
-        
-        # Keep only recent feedback (last 20 items)
-        feedback_history = feedback_history[-20:]
-        
-        # Update the document
-        updated_patterns = {
-            "session_id": session_id,
-            "user_preferences": user_prefs,
-            "feedback_history": feedback_history,
-            "last_updated": datetime.utcnow(),
-            "total_feedback_count": len(feedback_history)
         }
         
-        learning_collection.replace_one(
+        updates = {f"user_preferences.{key}": value for key, value in preference_updates.items()}
+        updates["last_updated"] = datetime.utcnow()
+        
+        learned = learning_collection.find_one_and_update(
             {"session_id": session_id},
-            updated_patterns,
-            upsert=True
+            {
+                "$set": updates,
+                # Keep only recent feedback (last 20 items)
+                "$push": {"feedback_history": {"$each": [feedback_entry], "$slice": -20}},
+                "$inc": {"total_feedback_count": 1}
+            },
+            projection={"user_preferences": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
+        session_cache.set_preferences(session_id, (learned or {}).get("user_preferences") or {})
         
         print(f"🎯 Updated learning patterns for session {session_id} based on {feedback_type} feedback")
         
@@ -623,6 +941,3 @@ def calculate_learning_effectiveness() -> Any:
     except Exception as e:
         return f"Error calculating effectiveness: {str(e)}"
 
-
-# Initialize MongoDB connection when module is imported
-initialize_mongodb()
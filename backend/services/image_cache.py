@@ -0,0 +1,322 @@
+"""
+Image Result Cache
+Answers re-uploaded images (the same screenshot or meme, possibly
+re-encoded or resized on the way) without another Gemini vision call.
+
+Entries are keyed on a digest of the normalized image's pixels together
+with the prompt variant (which encodes the language handling) and the
+normalized question, i.e. everything the vision request is built from.
+Lookups go through:
+
+1. exact pixel match in a bounded in-process LRU with TTL
+2. optional near-duplicate match: the entry whose perceptual hash
+   (utils.image_processing.difference_hash) is closest within
+   IMAGE_CACHE_MAX_DISTANCE bits, found through a BK-tree per prompt
+3. optional exact pixel match in the `image_cache` collection, shared by
+   all workers and expired by a TTL index
+
+Near-duplicate matching is skipped for hashes with fewer than
+IMAGE_CACHE_MIN_HASH_BITS set bits: flat images and text screenshots
+reduce to nearly empty hashes that cannot tell different texts apart.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config.settings import (
+    IMAGE_CACHE_ENABLED,
+    IMAGE_CACHE_SIZE,
+    IMAGE_CACHE_TTL_SECONDS,
+    IMAGE_CACHE_MAX_DISTANCE,
+    IMAGE_CACHE_MIN_HASH_BITS,
+    IMAGE_CACHE_PERSISTENT
+)
+import services.db_service as db_service
+from services.response_cache import normalize_message
+from utils.concurrency import run_blocking
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(first ^ second).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes under Hamming distance
+
+    Each child edge is labelled with its distance to the parent, so a
+    search for hashes within d of a query only descends edges labelled
+    within d of the query's distance to the node (triangle inequality).
+    Removal is not supported: callers filter stale hashes and rebuild.
+    """
+
+    def __init__(self, values=()):
+        self._root = None
+        self.size = 0
+        for value in values:
+            self.add(value)
+
+    def add(self, value: int):
+        if self._root is None:
+            self._root = (value, {})
+            self.size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (value, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """All (distance, hash) pairs within max_distance of value"""
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                matches.append((distance, node_value))
+            for edge in range(max(1, distance - max_distance), distance + max_distance + 1):
+                child = children.get(edge)
+                if child is not None:
+                    stack.append(child)
+        return matches
+
+
+class ImageCacheKey:
+    """Identifies a cacheable vision request: image pixels, prompt variant and question"""
+    __slots__ = ("content_digest", "image_hash", "context", "perceptual", "digest")
+
+    def __init__(self, content_digest: str, image_hash: int, context: str, perceptual: bool):
+        self.content_digest = content_digest
+        self.image_hash = image_hash
+        self.context = context
+        self.perceptual = perceptual
+        self.digest = f"{hashlib.blake2b(context.encode('utf-8'), digest_size=12).hexdigest()}:{content_digest}"
+
+
+class _PromptIndex:
+    """Near-duplicate index of the live perceptual hashes cached for one prompt"""
+    __slots__ = ("tree", "live")
+
+    def __init__(self):
+        self.tree = BKTree()
+        # Perceptual hash -> content digest of the newest live entry with that hash
+        self.live: Dict[int, str] = {}
+
+
+class ImageCache:
+    """LRU + TTL cache of vision responses with a Hamming-distance near-duplicate index"""
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: int = 86400, max_distance: int = 0,
+                 min_hash_bits: int = 32, persistent: bool = False, enabled: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.min_hash_bits = min_hash_bits
+        self.persistent = persistent
+        self.enabled = enabled
+        # (context, content digest) -> (response, expires_at, perceptual hash)
+        self._entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._indexes: Dict[str, _PromptIndex] = {}
+        self._lock = threading.Lock()
+        self._generation_seconds = 0.0
+        self._generations = 0
+        self._stats = {"exact_hits": 0, "near_hits": 0, "persistent_hits": 0, "misses": 0, "stores": 0,
+                       "evictions": 0, "low_entropy": 0, "seconds_saved": 0.0}
+
+    def make_key(self, content_digest: str, image_hash: int, text: str, template_name: str) -> Optional[ImageCacheKey]:
+        """
+        Build the cache key for a vision request, or None if caching is off
+
+        Args:
+            content_digest: Digest of the preprocessed image's pixels
+            image_hash: Perceptual hash of the preprocessed image
+            text: User's question about the image
+            template_name: Vision prompt variant name (encodes the language handling)
+        """
+        if not self.enabled or not content_digest:
+            return None
+        perceptual = bin(image_hash).count("1") >= self.min_hash_bits
+        if not perceptual:
+            self._stats["low_entropy"] += 1
+        return ImageCacheKey(content_digest, image_hash, f"{template_name}|{normalize_message(text)}", perceptual)
+
+    async def get(self, key: Optional[ImageCacheKey]) -> Optional[str]:
+        """Look a request up in every tier; returns the cached response or None"""
+        if key is None:
+            return None
+
+        response = self._get_local(key)
+        if response is None and self.persistent:
+            response = await run_blocking(self._get_persistent, key)
+            if response is not None:
+                self._put_local(key, response)
+                self._record_hit("persistent_hits")
+
+        if response is None:
+            self._stats["misses"] += 1
+        return response
+
+    async def put(self, key: Optional[ImageCacheKey], response: str, generation_seconds: float):
+        """
+        Cache a freshly generated vision response
+
+        Args:
+            key: Key from make_key (None is ignored)
+            response: Generated response
+            generation_seconds: How long the vision call took, used to estimate time saved by hits
+        """
+        if key is None or not response:
+            return
+        self._generation_seconds += generation_seconds
+        self._generations += 1
+        self._put_local(key, response)
+        self._stats["stores"] += 1
+        if self.persistent:
+            await run_blocking(self._put_persistent, key, response)
+
+    def get_stats(self) -> Dict:
+        hits = self._stats["exact_hits"] + self._stats["near_hits"] + self._stats["persistent_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "min_hash_bits": self.min_hash_bits,
+            "persistent": self.persistent,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "avg_seconds_saved_per_hit": round(self._stats["seconds_saved"] / hits, 3) if hits else 0.0,
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in self._stats.items()}
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+
+    def _record_hit(self, tier: str):
+        self._stats[tier] += 1
+        if self._generations:
+            self._stats["seconds_saved"] += self._generation_seconds / self._generations
+
+    def _get_local(self, key: ImageCacheKey) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry_key = self._find(key, now)
+            if entry_key is None:
+                return None
+            self._entries.move_to_end(entry_key)
+            response = self._entries[entry_key][0]
+
+        self._record_hit("exact_hits" if entry_key[1] == key.content_digest else "near_hits")
+        return response
+
+    def _find(self, key: ImageCacheKey, now: float) -> Optional[Tuple[str, str]]:
+        entry_key = (key.context, key.content_digest)
+        if self._is_live(entry_key, now):
+            return entry_key
+        index = self._indexes.get(key.context)
+        if self.max_distance <= 0 or not key.perceptual or index is None:
+            return None
+
+        for _, image_hash in sorted(index.tree.search(key.image_hash, self.max_distance)):
+            content_digest = index.live.get(image_hash)
+            if content_digest is None:
+                continue
+            candidate = (key.context, content_digest)
+            if self._is_live(candidate, now):
+                return candidate
+        return None
+
+    def _is_live(self, entry_key: Tuple[str, str], now: float) -> bool:
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return False
+        if entry[1] < now:
+            self._remove(entry_key)
+            return False
+        return True
+
+    def _put_local(self, key: ImageCacheKey, response: str):
+        entry_key = (key.context, key.content_digest)
+        with self._lock:
+            self._remove(entry_key)
+            self._entries[entry_key] = (response, time.monotonic() + self.ttl_seconds, key.image_hash)
+            if key.perceptual:
+                index = self._indexes.get(key.context)
+                if index is None:
+                    index = self._indexes[key.context] = _PromptIndex()
+                if key.image_hash not in index.live:
+                    index.tree.add(key.image_hash)
+                index.live[key.image_hash] = key.content_digest
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, entry_key: Tuple[str, str]):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        context, content_digest = entry_key
+        image_hash = entry[2]
+        index = self._indexes.get(context)
+        if index is None or index.live.get(image_hash) != content_digest:
+            return
+        del index.live[image_hash]
+        if not index.live:
+            del self._indexes[context]
+        elif index.tree.size > 2 * len(index.live) + 32:
+            # Mostly evicted hashes left in the tree: rebuild it from the live ones
+            index.tree = BKTree(index.live)
+
+    def _get_persistent(self, key: ImageCacheKey) -> Optional[str]:
+        db = db_service.get_db()
+        if db is None:
+            return None
+        try:
+            document = db.image_cache.find_one(
+                {"_id": key.digest, "expires_at": {"$gt": datetime.utcnow()}},
+                {"response": 1}
+            )
+            return document["response"] if document else None
+        except Exception as e:
+            print(f"⚠️ Failed to read image cache: {e}")
+            return None
+
+    def _put_persistent(self, key: ImageCacheKey, response: str):
+        db = db_service.get_db()
+        if db is None:
+            return
+        try:
+            now = datetime.utcnow()
+            db.image_cache.replace_one(
+                {"_id": key.digest},
+                {"response": response, "created_at": now, "expires_at": now + timedelta(seconds=self.ttl_seconds)},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to store image cache entry: {e}")
+
+
+# Global image result cache instance
+image_cache = ImageCache(
+    max_entries=IMAGE_CACHE_SIZE,
+    ttl_seconds=IMAGE_CACHE_TTL_SECONDS,
+    max_distance=IMAGE_CACHE_MAX_DISTANCE,
+    min_hash_bits=IMAGE_CACHE_MIN_HASH_BITS,
+    persistent=IMAGE_CACHE_PERSISTENT,
+    enabled=IMAGE_CACHE_ENABLED
+)
@@ -0,0 +1,112 @@
+"""
+Language Backfill
+Re-labels language_code / language_name on historical chat_history
+documents with the current detect_language rules.
+
+Documents are read in _id order in fixed-size batches (each batch is a
+fresh indexed range query, so no long-lived cursor is held), classified
+across a process pool and written back with unordered bulk updates.
+Progress is checkpointed in the `backfill_checkpoints` collection so an
+interrupted run resumes where it stopped.
+
+Usage:
+    python -m services.language_backfill [--batch-size 1000] [--workers 4] [--restart]
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+from pymongo import UpdateOne
+from config.settings import LANGUAGE_NAMES
+from utils.language import detect_languages_batch
+
+
+CHECKPOINT_ID = "language_backfill"
+
+
+def load_checkpoint(db) -> Dict:
+    return db.backfill_checkpoints.find_one({"_id": CHECKPOINT_ID}) or {"last_id": None, "processed": 0, "updated": 0}
+
+
+def save_checkpoint(db, checkpoint: Dict):
+    db.backfill_checkpoints.replace_one(
+        {"_id": CHECKPOINT_ID},
+        {**checkpoint, "_id": CHECKPOINT_ID, "updated_at": datetime.utcnow()},
+        upsert=True
+    )
+
+
+def build_language_fields(detection: tuple) -> Dict:
+    """Language fields exactly as store_interaction records them"""
+    language_code, _, should_display = detection
+    language_code = language_code if should_display else None
+    return {
+        "language_code": language_code,
+        "language_name": LANGUAGE_NAMES.get(language_code, 'Unknown') if language_code else None
+    }
+
+
+def backfill_languages(db, batch_size: int = 1000, workers: Optional[int] = None, restart: bool = False) -> Dict:
+    """
+    Re-detect and update the language fields of every chat_history document
+
+    Args:
+        db: pymongo Database instance
+        batch_size: Documents read and written per batch
+        workers: Detection processes (defaults to the CPU count)
+        restart: Ignore any saved checkpoint and start from the beginning
+
+    Returns:
+        Final checkpoint with processed/updated counts
+    """
+    checkpoint = {"last_id": None, "processed": 0, "updated": 0} if restart else load_checkpoint(db)
+    if checkpoint["last_id"] is not None:
+        print(f"♻️ Resuming after {checkpoint['last_id']} ({checkpoint['processed']} processed)")
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        while True:
+            query = {"_id": {"$gt": checkpoint["last_id"]}} if checkpoint["last_id"] is not None else {}
+            batch = list(db.chat_history.find(
+                query,
+                {"user_input": 1, "language_code": 1, "language_name": 1}
+            ).sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+
+            detections = detect_languages_batch([doc.get("user_input") or "" for doc in batch], executor=executor)
+
+            updates = []
+            for doc, detection in zip(batch, detections):
+                fields = build_language_fields(detection)
+                if doc.get("language_code") != fields["language_code"] or doc.get("language_name") != fields["language_name"]:
+                    updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+
+            if updates:
+                result = db.chat_history.bulk_write(updates, ordered=False)
+                checkpoint["updated"] += result.modified_count
+
+            checkpoint["last_id"] = batch[-1]["_id"]
+            checkpoint["processed"] += len(batch)
+            save_checkpoint(db, checkpoint)
+            print(f"🌍 {checkpoint['processed']} processed, {checkpoint['updated']} re-labelled")
+
+    return checkpoint
+
+
+if __name__ == "__main__":
+    import services.db_service as db_service
+
+    parser = argparse.ArgumentParser(description="Re-label language fields on chat_history")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    db_service.initialize_mongodb()
+    database = db_service.get_db()
+    if database is None:
+        raise SystemExit("MongoDB unavailable")
+
+    result = backfill_languages(database, batch_size=args.batch_size, workers=args.workers, restart=args.restart)
+    print(f"✅ Language backfill complete: {result['processed']} processed, {result['updated']} re-labelled")
@@ -0,0 +1,306 @@
+"""
+Background Learning Queue
+Moves interaction persistence and preference learning off the request path.
+
+Interactions are queued per session: while a session is waiting (or being
+processed) further interactions for it are appended to the same batch, so
+the learning pass runs once per batch instead of once per message.
+
+A batch stays visible (queued_messages, wait_until_stored) while its
+worker is writing it, so an interaction is never neither queued nor stored.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from config.settings import LEARNING_QUEUE_MAX_SIZE, LEARNING_QUEUE_WORKERS, LEARNING_QUEUE_DURABLE
+import services.db_service as db_service
+from utils.concurrency import run_blocking
+
+
+class LearningJobStore(ABC):
+    """Interface for durably recording queued interactions until they are processed"""
+
+    @abstractmethod
+    def save(self, session_id: str, interaction: Dict):
+        """Record a queued interaction"""
+
+    @abstractmethod
+    def set_feedback(self, interaction_id: str, feedback_data: Dict):
+        """Record feedback given on a queued interaction"""
+
+    @abstractmethod
+    def remove(self, interaction_ids: List[str]):
+        """Forget interactions that have been processed"""
+
+    @abstractmethod
+    def load_pending(self) -> List[Tuple[str, Dict]]:
+        """(session_id, interaction) pairs still to process, oldest first"""
+
+
+class MongoLearningJobStore(LearningJobStore):
+    """Job store backed by the `learning_jobs` collection"""
+
+    def _collection(self):
+        db = db_service.get_db()
+        return db.learning_jobs if db is not None else None
+
+    def save(self, session_id: str, interaction: Dict):
+        collection = self._collection()
+        if collection is None:
+            return
+        collection.insert_one({
+            "_id": interaction["interaction_id"],
+            "session_id": session_id,
+            "interaction": interaction
+        })
+
+    def set_feedback(self, interaction_id: str, feedback_data: Dict):
+        collection = self._collection()
+        if collection is None:
+            return
+        collection.update_one({"_id": interaction_id}, {"$set": {"interaction.user_feedback": feedback_data}})
+
+    def remove(self, interaction_ids: List[str]):
+        collection = self._collection()
+        if collection is None:
+            return
+        collection.delete_many({"_id": {"$in": interaction_ids}})
+
+    def load_pending(self) -> List[Tuple[str, Dict]]:
+        collection = self._collection()
+        if collection is None:
+            return []
+        jobs = collection.find({}).sort("interaction.enqueued_at", 1)
+        return [(job["session_id"], job["interaction"]) for job in jobs]
+
+
+class LearningQueue:
+    """Bounded in-process queue with worker tasks and per-session coalescing"""
+
+    def __init__(self, max_size: int = 1000, workers: int = 4, job_store: Optional[LearningJobStore] = None):
+        self.max_size = max_size
+        self.worker_count = workers
+        self.job_store = job_store
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[str, List[Dict]] = {}
+        self._pending_count = 0
+        # Batch each worker is writing, and an event set once it is written
+        self._in_flight: Dict[str, Tuple[List[Dict], asyncio.Event]] = {}
+        self._workers: List[asyncio.Task] = []
+        self._processor: Optional[Callable] = None
+        self._metrics = {
+            "enqueued": 0,
+            "processed": 0,
+            "coalesced": 0,
+            "rejected": 0,
+            "failed": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0
+        }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self, processor: Callable):
+        """
+        Start worker tasks
+
+        Args:
+            processor: Blocking callable taking (session_id, interactions)
+        """
+        if self.running:
+            return
+
+        self._processor = processor
+        self._queue = asyncio.Queue()
+
+        if self.job_store is not None:
+            try:
+                pending_jobs = await run_blocking(self.job_store.load_pending)
+                for session_id, interaction in pending_jobs:
+                    self._add(session_id, interaction)
+                if pending_jobs:
+                    print(f"♻️ Recovered {len(pending_jobs)} queued learning jobs")
+            except Exception as e:
+                print(f"⚠️ Failed to recover learning jobs: {e}")
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        print(f"🧵 Learning queue started with {self.worker_count} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        """Drain queued work (up to timeout) and stop the workers"""
+        if not self.running:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Learning queue stopped with {self._pending_count} interactions still pending")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(self, session_id: str, interaction: Dict) -> bool:
+        """
+        Queue an interaction for background persistence and learning
+
+        Returns:
+            True if queued, False if the caller should process it inline
+        """
+        if not self.running:
+            return False
+
+        if self._pending_count >= self.max_size:
+            self._metrics["rejected"] += 1
+            return False
+
+        interaction = dict(interaction, enqueued_at=time.time())
+
+        if self.job_store is not None:
+            try:
+                await run_blocking(self.job_store.save, session_id, interaction)
+            except Exception as e:
+                print(f"⚠️ Failed to persist learning job: {e}")
+
+        self._add(session_id, interaction)
+        self._metrics["enqueued"] += 1
+        return True
+
+    def find_pending(self, interaction_id: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Look up an interaction that is queued and not yet picked up by a worker
+
+        The returned interaction can still be modified before it is stored.
+        """
+        for session_id, interactions in self._pending.items():
+            for interaction in interactions:
+                if interaction["interaction_id"] == interaction_id:
+                    return session_id, interaction
+        return None
+
+    async def attach_feedback(self, interaction_id: str, feedback_data: Dict) -> Optional[Tuple[str, Dict]]:
+        """
+        Attach feedback to an interaction that is still waiting in the queue
+
+        The feedback is stored with the interaction when a worker writes it,
+        and recorded in the job store so a replayed job keeps it.
+
+        Returns:
+            (session_id, interaction) if the interaction was waiting, else None
+        """
+        pending = self.find_pending(interaction_id)
+        if pending is None:
+            return None
+        pending[1]["user_feedback"] = feedback_data
+        if self.job_store is not None:
+            try:
+                await run_blocking(self.job_store.set_feedback, interaction_id, feedback_data)
+            except Exception as e:
+                print(f"⚠️ Failed to persist feedback on learning job: {e}")
+        return pending
+
+    async def wait_until_stored(self, interaction_id: str) -> bool:
+        """
+        Wait for the write of the batch an interaction is in, if a worker is writing it
+
+        Returns:
+            True if the interaction was being written (it is stored now, or failed)
+        """
+        for interactions, stored in list(self._in_flight.values()):
+            if any(interaction["interaction_id"] == interaction_id for interaction in interactions):
+                await stored.wait()
+                return True
+        return False
+
+    def queued_messages(self, session_id: str) -> List[Dict]:
+        """
+        A session's queued interactions (being written or waiting), shaped
+        like chat_history documents, newest first
+
+        Safe to call from worker threads: it only copies the session's lists.
+        """
+        in_flight = self._in_flight.get(session_id)
+        interactions = list(in_flight[0]) if in_flight else []
+        interactions.extend(list(self._pending.get(session_id, ())))
+        return [
+            {
+                "_id": interaction["interaction_id"],
+                "session_id": session_id,
+                "input_type": interaction["input_type"],
+                "user_input": interaction["user_input"],
+                "bot_response": interaction["bot_response"],
+                "language_code": interaction.get("language_code"),
+                "timestamp": interaction.get("timestamp") or datetime.utcfromtimestamp(interaction["enqueued_at"]),
+                "user_feedback": interaction.get("user_feedback")
+            }
+            for interaction in reversed(interactions)
+        ]
+
+    def get_metrics(self) -> Dict:
+        """Queue depth, lag and throughput counters"""
+        oldest = min(
+            (interactions[0]["enqueued_at"] for interactions in self._pending.values() if interactions),
+            default=None
+        )
+        return {
+            "running": self.running,
+            "workers": len(self._workers),
+            "depth": self._pending_count,
+            "sessions_waiting": len(self._pending),
+            "sessions_in_flight": len(self._in_flight),
+            "max_size": self.max_size,
+            "oldest_pending_age_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            **self._metrics
+        }
+
+    def _add(self, session_id: str, interaction: Dict):
+        if session_id in self._pending:
+            self._pending[session_id].append(interaction)
+            self._metrics["coalesced"] += 1
+        else:
+            self._pending[session_id] = [interaction]
+            # A session being processed is re-queued by its worker when done
+            if session_id not in self._in_flight:
+                self._queue.put_nowait(session_id)
+        self._pending_count += 1
+
+    async def _worker(self):
+        while True:
+            session_id = await self._queue.get()
+            interactions = self._pending.pop(session_id, [])
+            self._pending_count -= len(interactions)
+            stored = asyncio.Event()
+            self._in_flight[session_id] = (interactions, stored)
+            try:
+                if interactions:
+                    lag = time.time() - interactions[0]["enqueued_at"]
+                    self._metrics["last_lag_seconds"] = round(lag, 3)
+                    self._metrics["max_lag_seconds"] = round(max(self._metrics["max_lag_seconds"], lag), 3)
+
+                    await run_blocking(self._processor, session_id, interactions)
+                    self._metrics["processed"] += len(interactions)
+
+                    if self.job_store is not None:
+                        await run_blocking(self.job_store.remove, [i["interaction_id"] for i in interactions])
+            except Exception as e:
+                self._metrics["failed"] += len(interactions)
+                print(f"⚠️ Background learning failed for session {session_id}: {e}")
+            finally:
+                del self._in_flight[session_id]
+                stored.set()
+                if session_id in self._pending:
+                    self._queue.put_nowait(session_id)
+                self._queue.task_done()
+
+
+# Global learning queue instance
+learning_queue = LearningQueue(
+    max_size=LEARNING_QUEUE_MAX_SIZE,
+    workers=LEARNING_QUEUE_WORKERS,
+    job_store=MongoLearningJobStore() if LEARNING_QUEUE_DURABLE else None
+)
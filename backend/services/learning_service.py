@@ -1,14 +1,62 @@
 """
 Learning Service Module
 Handles all learning, feedback, and pattern analysis logic
+
+Keyword families are compiled once into a single alternation regex each,
+and extract_interaction_features lowercases and tokenizes an interaction
+once for every feature store_interaction records.
 """
+import heapq
 import re
-from typing import Dict, List, Any
-from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterable, Tuple, Optional
+from config.settings import LEARNING_DECAY_HALF_LIFE_HOURS, LEARNING_MAX_KEYWORDS
 
 
-def analyze_input_patterns(user_input: str) -> Dict[str, Any]:
-    """Analyze patterns in user input to learn preferences"""
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """One alternation regex with the same substring semantics as `keyword in text`"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+
+# Request type keyword families (checked in this order)
+PARAGRAPH_REQUEST_PATTERN = _keyword_pattern(['paragraph', 'write', 'describe', 'tell me about', 'essay'])
+STRUCTURED_REQUEST_PATTERN = _keyword_pattern(['explain', 'list', 'break down', 'steps', 'outline'])
+CASUAL_REQUEST_PATTERN = _keyword_pattern(['hi', 'hello', 'thanks', 'how are you'])
+
+# Formality indicators
+FORMAL_PATTERN = _keyword_pattern(['please', 'could you', 'would you', 'kindly', 'sir', 'madam'])
+CASUAL_PATTERN = _keyword_pattern(['hey', 'yo', 'sup', 'what\'s up', 'cool', 'awesome'])
+
+# Topics (checked in this order; keywords are matched against lowercased text)
+TOPIC_PATTERNS = [
+    ('science', _keyword_pattern(['science', 'physics', 'chemistry', 'biology', 'research'])),
+    ('technology', _keyword_pattern(['AI', 'computer', 'software', 'programming', 'tech'])),
+    ('education', _keyword_pattern(['learn', 'study', 'school', 'education', 'knowledge'])),
+]
+
+# Sentiment counts distinct keywords present (overlaps included); plain
+# substring checks beat a lookahead regex scanning every position
+POSITIVE_KEYWORDS = ('good', 'great', 'awesome', 'excellent', 'love', 'like', 'amazing')
+NEGATIVE_KEYWORDS = ('bad', 'terrible', 'hate', 'dislike', 'awful', 'wrong')
+
+COMPLEXITY_PATTERN = _keyword_pattern(['complex', 'detailed', 'comprehensive', 'analyze'])
+
+# Format alignment requests
+PARAGRAPH_FORMAT_PATTERN = _keyword_pattern(['paragraph', 'write', 'describe'])
+STRUCTURED_FORMAT_PATTERN = _keyword_pattern(['explain', 'list', 'break down', 'steps'])
+
+# Response structure
+BULLET_PATTERN = re.compile(r'^[\s]*[-•*]', re.MULTILINE)
+NUMBERING_PATTERN = re.compile(r'^[\s]*\d+\.', re.MULTILINE)
+SECTION_PATTERN = re.compile(r'\*\*.*\*\*')
+STRUCTURE_LINE_PATTERN = re.compile(r'^[\s]*[-•*\d+\.]', re.MULTILINE)
+EMOJI_PATTERN = re.compile('[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]')
+
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]{3,}\b')
+COMMON_WORDS = frozenset({'the', 'and', 'you', 'for', 'are', 'with', 'can', 'about', 'what', 'how', 'that', 'this'})
+
+
+def _input_patterns(user_input: str, user_input_lower: str, words: List[str]) -> Dict[str, Any]:
     patterns = {
         "request_type": "",
         "formality_level": "",
@@ -16,25 +64,20 @@ def analyze_input_patterns(user_input: str) -> Dict[str, Any]:
         "keywords": []
     }
     
-    user_input_lower = user_input.lower()
-    
     # Detect request type
-    if any(word in user_input_lower for word in ['paragraph', 'write', 'describe', 'tell me about', 'essay']):
+    if PARAGRAPH_REQUEST_PATTERN.search(user_input_lower):
         patterns["request_type"] = "paragraph"
-    elif any(word in user_input_lower for word in ['explain', 'list', 'break down', 'steps', 'outline']):
+    elif STRUCTURED_REQUEST_PATTERN.search(user_input_lower):
         patterns["request_type"] = "structured"
-    elif any(word in user_input_lower for word in ['hi', 'hello', 'thanks', 'how are you']):
+    elif CASUAL_REQUEST_PATTERN.search(user_input_lower):
         patterns["request_type"] = "casual"
     else:
         patterns["request_type"] = "mixed"
     
     # Detect formality level
-    formal_indicators = ['please', 'could you', 'would you', 'kindly', 'sir', 'madam']
-    casual_indicators = ['hey', 'yo', 'sup', 'what\'s up', 'cool', 'awesome']
-    
-    if any(word in user_input_lower for word in formal_indicators):
+    if FORMAL_PATTERN.search(user_input_lower):
         patterns["formality_level"] = "formal"
-    elif any(word in user_input_lower for word in casual_indicators):
+    elif CASUAL_PATTERN.search(user_input_lower):
         patterns["formality_level"] = "casual"
     else:
         patterns["formality_level"] = "neutral"
@@ -48,23 +91,113 @@ def analyze_input_patterns(user_input: str) -> Dict[str, Any]:
         patterns["length_preference"] = "medium"
     
     # Extract key topics/keywords
-    words = re.findall(r'\b[a-zA-Z]{3,}\b', user_input.lower())
-    common_words = {'the', 'and', 'you', 'for', 'are', 'with', 'can', 'about', 'what', 'how', 'that', 'this'}
-    patterns["keywords"] = [word for word in words if word not in common_words][:10]
+    patterns["keywords"] = [word for word in words if word not in COMMON_WORDS][:10]
     
     return patterns
 
 
+def _topic(text_lower: str) -> str:
+    for topic, pattern in TOPIC_PATTERNS:
+        if pattern.search(text_lower):
+            return topic
+    return 'general'
+
+
+def _sentiment(text_lower: str) -> str:
+    positive_count = sum(1 for keyword in POSITIVE_KEYWORDS if keyword in text_lower)
+    negative_count = sum(1 for keyword in NEGATIVE_KEYWORDS if keyword in text_lower)
+    
+    if positive_count > negative_count:
+        return 'positive'
+    elif negative_count > positive_count:
+        return 'negative'
+    return 'neutral'
+
+
+def _complexity(text: str, text_lower: str) -> str:
+    if len(text) < 30:
+        return 'simple'
+    elif len(text) > 100 or COMPLEXITY_PATTERN.search(text_lower):
+        return 'complex'
+    return 'medium'
+
+
+def _has_structure(bot_response: str) -> bool:
+    return bool(SECTION_PATTERN.search(bot_response) or STRUCTURE_LINE_PATTERN.search(bot_response))
+
+
+def _format_alignment(user_input_lower: str, bot_response: str) -> bool:
+    # User asked for paragraph
+    if PARAGRAPH_FORMAT_PATTERN.search(user_input_lower):
+        return not _has_structure(bot_response)  # Success if no structure when paragraph requested
+    
+    # User asked for structure
+    elif STRUCTURED_FORMAT_PATTERN.search(user_input_lower):
+        return _has_structure(bot_response)  # Success if structured when structure requested
+    
+    return True  # Neutral case
+
+
+def _topic_relevance(words: List[str], bot_response: str) -> bool:
+    user_topics = {word for word in words if len(word) >= 4}
+    if len(user_topics) > 0:
+        response_topics = {word for word in WORD_PATTERN.findall(bot_response.lower()) if len(word) >= 4}
+        relevance_score = len(user_topics.intersection(response_topics)) / len(user_topics)
+        return relevance_score > 0.3  # At least 30% topic overlap
+    return True
+
+
+def _context_features(user_input: str, user_input_lower: str, words: List[str], bot_response: str) -> Dict[str, Any]:
+    return {
+        "topic": _topic(user_input_lower),
+        "sentiment": _sentiment(user_input_lower),
+        "complexity": _complexity(user_input, user_input_lower),
+        "success_indicators": {
+            "format_match": _format_alignment(user_input_lower, bot_response),
+            "appropriate_length": check_length_appropriateness(user_input, bot_response),
+            "topic_relevance": _topic_relevance(words, bot_response)
+        }
+    }
+
+
+def extract_interaction_features(user_input: str, bot_response: str) -> Dict[str, Any]:
+    """
+    Extract every learning feature of an interaction in a single pass
+    
+    Returns:
+        Dictionary with "input_patterns", "response_format" and
+        "interaction_context", as stored on chat_history documents
+    """
+    user_input_lower = user_input.lower()
+    words = WORD_PATTERN.findall(user_input_lower)
+    return {
+        "input_patterns": _input_patterns(user_input, user_input_lower, words),
+        "response_format": detect_response_format(bot_response),
+        "interaction_context": _context_features(user_input, user_input_lower, words, bot_response)
+    }
+
+
+def extract_features_batch(interactions: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Extract features for many (user_input, bot_response) pairs, e.g. for offline reprocessing"""
+    return [extract_interaction_features(user_input, bot_response) for user_input, bot_response in interactions]
+
+
+def analyze_input_patterns(user_input: str) -> Dict[str, Any]:
+    """Analyze patterns in user input to learn preferences"""
+    user_input_lower = user_input.lower()
+    return _input_patterns(user_input, user_input_lower, WORD_PATTERN.findall(user_input_lower))
+
+
 def detect_response_format(bot_response: str) -> Dict[str, Any]:
     """Analyze the format of bot response"""
     if not bot_response:
         return "empty"
     
     format_info = {
-        "has_bullets": bool(re.search(r'^[\s]*[-•*]', bot_response, re.MULTILINE)),
-        "has_numbering": bool(re.search(r'^[\s]*\d+\.', bot_response, re.MULTILINE)),
-        "has_sections": bool(re.search(r'\*\*.*\*\*', bot_response)),
-        "has_emojis": bool(re.search(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', bot_response)),
+        "has_bullets": bool(BULLET_PATTERN.search(bot_response)),
+        "has_numbering": bool(NUMBERING_PATTERN.search(bot_response)),
+        "has_sections": bool(SECTION_PATTERN.search(bot_response)),
+        "has_emojis": bool(EMOJI_PATTERN.search(bot_response)),
         "length": len(bot_response),
         "format_type": ""
     }
@@ -81,80 +214,33 @@ def detect_response_format(bot_response: str) -> Dict[str, Any]:
 
 def extract_context_features(user_input: str, bot_response: str) -> Dict[str, Any]:
     """Extract contextual features for learning"""
-    return {
-        "topic": extract_topic(user_input),
-        "sentiment": detect_sentiment(user_input),
-        "complexity": assess_complexity(user_input),
-        "success_indicators": detect_success_patterns(user_input, bot_response)
-    }
+    user_input_lower = user_input.lower()
+    return _context_features(user_input, user_input_lower, WORD_PATTERN.findall(user_input_lower), bot_response)
 
 
 def extract_topic(text: str) -> str:
     """Simple topic extraction"""
-    topics = {
-        'science': ['science', 'physics', 'chemistry', 'biology', 'research'],
-        'technology': ['AI', 'computer', 'software', 'programming', 'tech'],
-        'education': ['learn', 'study', 'school', 'education', 'knowledge'],
-        'general': []
-    }
-    
-    text_lower = text.lower()
-    for topic, keywords in topics.items():
-        if any(keyword in text_lower for keyword in keywords):
-            return topic
-    return 'general'
+    return _topic(text.lower())
 
 
 def detect_sentiment(text: str) -> str:
     """Simple sentiment detection"""
-    positive_words = ['good', 'great', 'awesome', 'excellent', 'love', 'like', 'amazing']
-    negative_words = ['bad', 'terrible', 'hate', 'dislike', 'awful', 'wrong']
-    
-    text_lower = text.lower()
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
-    
-    if positive_count > negative_count:
-        return 'positive'
-    elif negative_count > positive_count:
-        return 'negative'
-    return 'neutral'
+    return _sentiment(text.lower())
 
 
 def assess_complexity(text: str) -> str:
     """Assess input complexity"""
-    if len(text) < 30:
-        return 'simple'
-    elif len(text) > 100 or any(word in text.lower() for word in ['complex', 'detailed', 'comprehensive', 'analyze']):
-        return 'complex'
-    return 'medium'
+    return _complexity(text, text.lower())
 
 
 def detect_success_patterns(user_input: str, bot_response: str) -> Dict[str, bool]:
     """Detect patterns that indicate successful interactions"""
-    success_patterns = {
-        "format_match": check_format_alignment(user_input, bot_response),
-        "appropriate_length": check_length_appropriateness(user_input, bot_response),
-        "topic_relevance": check_topic_relevance(user_input, bot_response)
-    }
-    return success_patterns
+    return extract_context_features(user_input, bot_response)["success_indicators"]
 
 
 def check_format_alignment(user_input: str, bot_response: str) -> bool:
     """Check if response format matches user request"""
-    user_lower = user_input.lower()
-    
-    # User asked for paragraph
-    if any(word in user_lower for word in ['paragraph', 'write', 'describe']):
-        has_structure = bool(re.search(r'\*\*.*\*\*', bot_response) or re.search(r'^[\s]*[-•*\d+\.]', bot_response, re.MULTILINE))
-        return not has_structure  # Success if no structure when paragraph requested
-    
-    # User asked for structure
-    elif any(word in user_lower for word in ['explain', 'list', 'break down', 'steps']):
-        has_structure = bool(re.search(r'\*\*.*\*\*', bot_response) or re.search(r'^[\s]*[-•*\d+\.]', bot_response, re.MULTILINE))
-        return has_structure  # Success if structured when structure requested
-    
-    return True  # Neutral case
+    return _format_alignment(user_input.lower(), bot_response)
 
 
 def check_length_appropriateness(user_input: str, bot_response: str) -> bool:
@@ -168,20 +254,111 @@ def check_length_appropriateness(user_input: str, bot_response: str) -> bool:
 
 def check_topic_relevance(user_input: str, bot_response: str) -> bool:
     """Simple topic relevance check"""
-    user_topics = set(re.findall(r'\b[a-zA-Z]{4,}\b', user_input.lower()))
-    response_topics = set(re.findall(r'\b[a-zA-Z]{4,}\b', bot_response.lower()))
+    return _topic_relevance(WORD_PATTERN.findall(user_input.lower()), bot_response)
+
+
+# Input pattern fields counted per session, and the preference each one drives
+PREFERENCE_DIMENSIONS = {
+    "request_type": "preferred_format",
+    "length_preference": "preferred_length",
+    "formality_level": "formality_level"
+}
+DECAY_EPOCH = datetime(2025, 1, 1)
+# Counters are kept relative to a landmark time that rolls forward every
+# DECAY_WINDOW_HALF_LIVES half-lives, so weights never exceed 2 ** DECAY_WINDOW_HALF_LIVES
+DECAY_WINDOW_HALF_LIVES = 8
+# Counters that decayed below this are dropped when a session is renormalized
+MIN_PREFERENCE_COUNT = 0.01
+
+
+def decay_landmark(timestamp: datetime, half_life_hours: float = LEARNING_DECAY_HALF_LIFE_HOURS) -> datetime:
+    """
+    Landmark that observations made at `timestamp` are weighted against
+
+    Landmarks are the starts of fixed windows of DECAY_WINDOW_HALF_LIVES
+    half-lives counted from DECAY_EPOCH, so every worker picks the same one.
+    """
+    if half_life_hours <= 0:
+        return DECAY_EPOCH
+    window = timedelta(hours=half_life_hours * DECAY_WINDOW_HALF_LIVES)
+    return DECAY_EPOCH + window * ((timestamp - DECAY_EPOCH) // window)
+
+
+def decay_weight(timestamp: datetime, landmark: Optional[datetime] = None,
+                 half_life_hours: float = LEARNING_DECAY_HALF_LIFE_HOURS) -> float:
+    """
+    Forward-decay weight of an observation made at `timestamp`
     
-    if len(user_topics) > 0:
-        relevance_score = len(user_topics.intersection(response_topics)) / len(user_topics)
-        return relevance_score > 0.3  # At least 30% topic overlap
-    return True
+    Rather than shrinking old counts, each new observation weighs twice as
+    much per half-life elapsed since the landmark. Relative weights are the
+    same as with exponential decay, so stored counters only need $inc until
+    the landmark rolls forward and they are renormalized once
+    (renormalize_counts). The exponent is clamped to one window, so weights
+    stay bounded even against a stale landmark.
+    
+    Args:
+        timestamp: When the observation was made (UTC)
+        landmark: Time the counters are kept relative to (default: decay_landmark(timestamp))
+        half_life_hours: Decay half-life; 0 gives plain running counts
+    """
+    if half_life_hours <= 0:
+        return 1.0
+    if landmark is None:
+        landmark = decay_landmark(timestamp, half_life_hours)
+    exponent = (timestamp - landmark).total_seconds() / 3600 / half_life_hours
+    return 2.0 ** min(exponent, DECAY_WINDOW_HALF_LIVES)
 
 
-def analyze_user_preferences(interactions: List[Dict]) -> Dict[str, Any]:
-    """Analyze user preferences from interaction history"""
-    if not interactions:
-        return {}
+def renormalize_counts(
+    preference_counts: Optional[Dict[str, Dict[str, float]]],
+    from_landmark: datetime,
+    to_landmark: datetime,
+    half_life_hours: float = LEARNING_DECAY_HALF_LIFE_HOURS,
+    max_keywords: int = LEARNING_MAX_KEYWORDS
+) -> Dict[str, Dict[str, float]]:
+    """
+    Move counters kept relative to one landmark onto a later one
+
+    Counters are scaled down by the decay between the two landmarks; those
+    that fall below MIN_PREFERENCE_COUNT are dropped, and only the
+    max_keywords heaviest keywords are kept.
+
+    Returns:
+        The renormalized preference counts
+    """
+    factor = decay_weight(from_landmark, to_landmark, half_life_hours)
+    renormalized = {}
+    for dimension, counts in (preference_counts or {}).items():
+        scaled = {value: count * factor for value, count in counts.items() if count * factor >= MIN_PREFERENCE_COUNT}
+        if dimension == "keywords" and len(scaled) > max_keywords:
+            scaled = dict(heapq.nlargest(max_keywords, scaled.items(), key=lambda item: item[1]))
+        if scaled:
+            renormalized[dimension] = scaled
+    return renormalized
+
+
+def count_preferences(input_patterns_list: Iterable[Dict], weight: float = 1.0) -> Dict[str, Dict[str, float]]:
+    """
+    Weighted counts of each preference dimension value and keyword
     
+    Returns:
+        Dictionary of dimension ("request_type", ..., "keywords") to
+        {value: weight}, the shape stored as learned_patterns.preference_counts
+    """
+    counts = {dimension: {} for dimension in PREFERENCE_DIMENSIONS}
+    counts["keywords"] = {}
+    for input_patterns in input_patterns_list:
+        for dimension in PREFERENCE_DIMENSIONS:
+            value = input_patterns.get(dimension)
+            if value:
+                counts[dimension][value] = counts[dimension].get(value, 0.0) + weight
+        for keyword in input_patterns.get("keywords", []):
+            counts["keywords"][keyword] = counts["keywords"].get(keyword, 0.0) + weight
+    return {dimension: values for dimension, values in counts.items() if values}
+
+
+def preferences_from_counts(preference_counts: Optional[Dict[str, Dict[str, float]]]) -> Dict[str, Any]:
+    """Derive user preferences from (possibly decayed) preference counts"""
     preferences = {
         "preferred_format": "neutral",
         "preferred_length": "medium",
@@ -189,34 +366,50 @@ def analyze_user_preferences(interactions: List[Dict]) -> Dict[str, Any]:
         "topics_of_interest": [],
         "successful_patterns": []
     }
+    preference_counts = preference_counts or {}
+    
+    for dimension, preference in PREFERENCE_DIMENSIONS.items():
+        counts = preference_counts.get(dimension)
+        if counts:
+            preferences[preference] = max(counts, key=counts.get)
     
-    # Analyze format preferences
-    format_requests = [i["input_patterns"]["request_type"] for i in interactions if "input_patterns" in i]
-    if format_requests:
-        most_common_format = max(set(format_requests), key=format_requests.count)
-        preferences["preferred_format"] = most_common_format
+    keyword_counts = preference_counts.get("keywords")
+    if keyword_counts:
+        preferences["topics_of_interest"] = heapq.nlargest(10, keyword_counts, key=keyword_counts.get)
     
-    # Analyze length preferences
-    length_prefs = [i["input_patterns"]["length_preference"] for i in interactions if "input_patterns" in i]
-    if length_prefs:
-        preferences["preferred_length"] = max(set(length_prefs), key=length_prefs.count)
+    return preferences
+
+
+def analyze_user_preferences(interactions: List[Dict]) -> Dict[str, Any]:
+    """Analyze user preferences from interaction history"""
+    if not interactions:
+        return {}
+    
+    return preferences_from_counts(
+        count_preferences(i["input_patterns"] for i in interactions if "input_patterns" in i)
+    )
+
+
+def feedback_preference_updates(feedback_type: str, interaction: Dict) -> Dict[str, str]:
+    """Preferences that a piece of feedback overrides"""
+    if feedback_type == "format_mismatch":
+        # User didn't like the format - adjust preference
+        input_patterns = interaction.get("input_patterns", {})
+        return {"preferred_format": input_patterns.get("request_type", "unknown")}
     
-    # Analyze formality preferences
-    formality_levels = [i["input_patterns"]["formality_level"] for i in interactions if "input_patterns" in i]
-    if formality_levels:
-        preferences["formality_level"] = max(set(formality_levels), key=formality_levels.count)
+    elif feedback_type == "too_long":
+        return {"preferred_length": "short"}
     
-    # Extract topics of interest
-    all_keywords = []
-    for interaction in interactions:
-        if "input_patterns" in interaction and "keywords" in interaction["input_patterns"]:
-            all_keywords.extend(interaction["input_patterns"]["keywords"])
+    elif feedback_type == "too_short":
+        return {"preferred_length": "detailed"}
     
-    if all_keywords:
-        keyword_counts = Counter(all_keywords)
-        preferences["topics_of_interest"] = [word for word, count in keyword_counts.most_common(10)]
+    elif feedback_type == "thumbs_up":
+        # Reinforce current patterns
+        response_format = interaction.get("response_format", {})
+        if "format_type" in response_format:
+            return {"preferred_format": response_format["format_type"]}
     
-    return preferences
+    return {}
 
 
 def generate_improvement_suggestions(interaction: Dict, feedback_data: Dict) -> List[str]:
@@ -0,0 +1,325 @@
+"""
+LLM Providers
+The model backends ai_service talks to, behind one small interface with
+sync, async and streaming generation:
+
+- GeminiProvider: google-generativeai, with static prompt prefixes served
+  from Gemini context caches (services.context_cache)
+- FakeProvider: a local, deterministic stand-in with configurable latency
+  distribution, token rate, streaming chunk cadence and injected 429s and
+  timeouts, so the whole app can be load-tested offline
+
+LLM_PROVIDER selects the backend ("gemini" or "fake").
+"""
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Union
+from config.settings import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL_NAME,
+    FAKE_LLM_LATENCY_DISTRIBUTION,
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_LATENCY_JITTER,
+    FAKE_LLM_TOKENS_PER_SECOND,
+    FAKE_LLM_RESPONSE_TOKENS,
+    FAKE_LLM_CHUNK_TOKENS,
+    FAKE_LLM_RATE_LIMIT_RATE,
+    FAKE_LLM_TIMEOUT_RATE,
+    FAKE_LLM_TIMEOUT_SECONDS,
+    FAKE_LLM_SEED
+)
+from services.context_cache import context_cache
+
+try:
+    # Same exception types the Gemini SDK raises, so error handling sees no difference
+    from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
+except ImportError:
+    class ResourceExhausted(Exception):
+        code = 429
+
+        def __str__(self):
+            return f"{self.code} {super().__str__()}"
+
+    class DeadlineExceeded(Exception):
+        code = 504
+
+        def __str__(self):
+            return f"{self.code} {super().__str__()}"
+
+
+# Contents accepted by generate*: a prompt string, or [prompt, image]
+Contents = Union[str, list]
+
+
+class LLMProvider(ABC):
+    """Interface of a text/vision model backend"""
+
+    name = "base"
+
+    @abstractmethod
+    def generate(self, contents: Contents, template=None) -> str:
+        """
+        Generate a complete response, blocking the calling thread
+
+        Args:
+            contents: Prompt string, or [prompt, image]
+            template: PromptTemplate the prompt was rendered from (or None)
+
+        Returns:
+            Generated text
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def generate_async(self, contents: Contents, template=None) -> str:
+        """Generate a complete response without blocking the event loop"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stream(self, contents: Contents, template=None) -> AsyncIterator[str]:
+        """
+        Stream a response as text fragments
+
+        Closing the generator early abandons the generation upstream.
+        """
+        raise NotImplementedError
+        yield
+
+
+class GeminiProvider(LLMProvider):
+    """Gemini through google-generativeai, configured and built on first use"""
+
+    name = "gemini"
+    _configure_lock = threading.Lock()
+    _configured = False
+
+    def __init__(self, model_name: str = GEMINI_MODEL_NAME, api_key: str = GEMINI_API_KEY):
+        self.model_name = model_name
+        self.api_key = api_key
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The underlying genai.GenerativeModel"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    with GeminiProvider._configure_lock:
+                        if not GeminiProvider._configured:
+                            genai.configure(api_key=self.api_key)
+                            GeminiProvider._configured = True
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, contents: Contents, template=None) -> str:
+        return self.model.generate_content(contents).text
+
+    async def generate_async(self, contents: Contents, template=None) -> str:
+        response = await self._generate_content_async(contents, template)
+        return response.text
+
+    async def stream(self, contents: Contents, template=None) -> AsyncIterator[str]:
+        # Closing this generator stops iterating the response; once the
+        # response is released the SDK's streaming call is cancelled with it
+        response = await self._generate_content_async(contents, template, stream=True)
+        async for chunk in response:
+            try:
+                chunk_text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata only)
+                continue
+            if chunk_text:
+                yield chunk_text
+
+    async def _generate_content_async(self, contents: Contents, template, **kwargs):
+        """
+        Call generate_content_async, serving the prompt's static prefix from a
+        context cache when one is live and falling back to the full prompt if
+        the cache is rejected
+
+        Args:
+            contents: Full prompt string, or [prompt, image]
+            template: PromptTemplate the prompt was rendered from (or None)
+        """
+        model = self.model
+        prompt = contents[0] if isinstance(contents, list) else contents
+        request_model, request_prompt = await context_cache.resolve(template, prompt, model)
+        if request_model is model:
+            return await model.generate_content_async(contents, **kwargs)
+
+        request_contents = [request_prompt] + contents[1:] if isinstance(contents, list) else request_prompt
+        try:
+            return await request_model.generate_content_async(request_contents, **kwargs)
+        except Exception as e:
+            if not context_cache.is_cache_error(e):
+                raise
+            context_cache.invalidate(template, e)
+            return await model.generate_content_async(contents, **kwargs)
+
+
+FAKE_VOCABULARY = (
+    "the of and to in is that for it as with was on be by this are or from at an which have not "
+    "answer image light energy plants water system example step first second result because "
+    "simple process important learn language model question explain detail people time way"
+).split()
+
+
+class _FakeCall:
+    """Timing and outcome of one fake request, drawn up front"""
+    __slots__ = ("latency", "chunks", "chunk_interval", "error")
+
+    def __init__(self, latency: float, chunks: list, chunk_interval: float, error):
+        self.latency = latency
+        self.chunks = chunks
+        self.chunk_interval = chunk_interval
+        self.error = error
+
+
+class FakeProvider(LLMProvider):
+    """
+    Local stand-in for an LLM
+
+    Each request waits for a time to first token drawn from the latency
+    distribution, then produces response_tokens words at tokens_per_second,
+    streamed chunk_tokens at a time. A rate_limit_rate share of requests
+    fail with a 429 right away and a timeout_rate share fail with a
+    DeadlineExceeded after timeout_seconds. Outcomes and responses are
+    seeded by the prompt and how often it was seen, so runs are
+    reproducible regardless of request interleaving. Occurrences are
+    tracked for the max_tracked_prompts most recently seen prompts.
+    """
+
+    name = "fake"
+    DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+
+    def __init__(self, latency_distribution: str = "lognormal", latency_ms: float = 600.0, jitter: float = 0.4,
+                 tokens_per_second: float = 60.0, response_tokens: int = 250, chunk_tokens: int = 20,
+                 rate_limit_rate: float = 0.0, timeout_rate: float = 0.0, timeout_seconds: float = 10.0, seed: int = 0,
+                 max_tracked_prompts: int = 10000):
+        if latency_distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {latency_distribution!r}, use one of {self.DISTRIBUTIONS}")
+        self.latency_distribution = latency_distribution
+        self.latency_seconds = latency_ms / 1000
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.seed = seed
+        self.max_tracked_prompts = max(1, max_tracked_prompts)
+        # prompt digest -> times seen, least recently seen first
+        self._seen: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "rate_limited": 0, "timeouts": 0, "tokens": 0}
+
+    def generate(self, contents: Contents, template=None) -> str:
+        call = self._plan(contents)
+        if call.error is not None:
+            time.sleep(call.latency)
+            raise call.error
+        time.sleep(call.latency + call.chunk_interval * max(0, len(call.chunks) - 1))
+        return "".join(call.chunks)
+
+    async def generate_async(self, contents: Contents, template=None) -> str:
+        call = self._plan(contents)
+        if call.error is not None:
+            await asyncio.sleep(call.latency)
+            raise call.error
+        await asyncio.sleep(call.latency + call.chunk_interval * max(0, len(call.chunks) - 1))
+        return "".join(call.chunks)
+
+    async def stream(self, contents: Contents, template=None) -> AsyncIterator[str]:
+        call = self._plan(contents)
+        await asyncio.sleep(call.latency)
+        if call.error is not None:
+            raise call.error
+        for index, chunk in enumerate(call.chunks):
+            if index:
+                await asyncio.sleep(call.chunk_interval)
+            yield chunk
+
+    def get_stats(self) -> Dict:
+        return {"provider": self.name, "latency_distribution": self.latency_distribution, **self._stats}
+
+    def _plan(self, contents: Contents) -> _FakeCall:
+        prompt = contents[0] if isinstance(contents, list) else contents
+        digest = hashlib.blake2b(prompt.encode('utf-8'), digest_size=8).hexdigest()
+        with self._lock:
+            occurrence = self._seen.pop(digest, 0)
+            self._seen[digest] = occurrence + 1
+            if len(self._seen) > self.max_tracked_prompts:
+                self._seen.popitem(last=False)
+            self._stats["requests"] += 1
+        rng = random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+        outcome = rng.random()
+        if outcome < self.rate_limit_rate:
+            self._count("rate_limited")
+            return _FakeCall(0.0, [], 0.0, ResourceExhausted("Resource has been exhausted (e.g. check quota)."))
+        if outcome < self.rate_limit_rate + self.timeout_rate:
+            self._count("timeouts")
+            return _FakeCall(self.timeout_seconds, [], 0.0, DeadlineExceeded("Deadline Exceeded"))
+
+        # The text depends on the prompt only, so identical prompts get identical answers
+        words_rng = random.Random(f"{self.seed}:{digest}")
+        words = [words_rng.choice(FAKE_VOCABULARY) for _ in range(self.response_tokens)]
+        chunks = [
+            " ".join(words[start:start + self.chunk_tokens]) + " "
+            for start in range(0, len(words), self.chunk_tokens)
+        ]
+        self._count("tokens", len(words))
+        chunk_interval = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return _FakeCall(self._sample_latency(rng), chunks, chunk_interval, None)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _sample_latency(self, rng: random.Random) -> float:
+        median = self.latency_seconds
+        if self.latency_distribution == "constant":
+            return median
+        if self.latency_distribution == "uniform":
+            return max(0.0, rng.uniform(median * (1 - self.jitter), median * (1 + self.jitter)))
+        if self.latency_distribution == "normal":
+            return max(0.0, rng.gauss(median, median * self.jitter))
+        return median * math.exp(rng.gauss(0.0, self.jitter))
+
+
+def create_provider(name: str) -> LLMProvider:
+    """
+    Build the provider selected by LLM_PROVIDER
+
+    Args:
+        name: "gemini" or "fake"
+
+    Returns:
+        A new provider instance
+    """
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "fake":
+        return FakeProvider(
+            latency_distribution=FAKE_LLM_LATENCY_DISTRIBUTION,
+            latency_ms=FAKE_LLM_LATENCY_MS,
+            jitter=FAKE_LLM_LATENCY_JITTER,
+            tokens_per_second=FAKE_LLM_TOKENS_PER_SECOND,
+            response_tokens=FAKE_LLM_RESPONSE_TOKENS,
+            chunk_tokens=FAKE_LLM_CHUNK_TOKENS,
+            rate_limit_rate=FAKE_LLM_RATE_LIMIT_RATE,
+            timeout_rate=FAKE_LLM_TIMEOUT_RATE,
+            timeout_seconds=FAKE_LLM_TIMEOUT_SECONDS,
+            seed=FAKE_LLM_SEED
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER {name!r}, use 'gemini' or 'fake'")
@@ -0,0 +1,74 @@
+"""
+MongoDB Connection Pool Metrics
+pymongo pool event listener exposing utilization gauges for the client
+created by db_service.
+"""
+import threading
+from typing import Dict
+from pymongo import monitoring
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Counts pool connections and checkouts as pymongo reports them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gauges = {
+            "open_connections": 0,
+            "checked_out": 0,
+            "max_checked_out": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "pools_cleared": 0
+        }
+
+    def _adjust(self, name: str, delta: int):
+        with self._lock:
+            self._gauges[name] += delta
+            if name == "checked_out":
+                self._gauges["max_checked_out"] = max(self._gauges["max_checked_out"], self._gauges["checked_out"])
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._adjust("pools_cleared", 1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._adjust("open_connections", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._adjust("open_connections", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._adjust("checkout_failures", 1)
+
+    def connection_checked_out(self, event):
+        self._adjust("checkouts", 1)
+        self._adjust("checked_out", 1)
+
+    def connection_checked_in(self, event):
+        self._adjust("checked_out", -1)
+
+    def get_metrics(self, max_pool_size: int) -> Dict:
+        with self._lock:
+            gauges = dict(self._gauges)
+        gauges["max_pool_size"] = max_pool_size
+        gauges["utilization"] = round(gauges["checked_out"] / max_pool_size, 3) if max_pool_size else 0.0
+        return gauges
+
+
+# Global listener registered on the MongoClient
+pool_metrics = PoolMetricsListener()
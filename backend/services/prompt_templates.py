@@ -0,0 +1,321 @@
+"""
+Prompt Templates
+Pre-rendered system prompts for chat and image requests.
+
+The system prompts are several kilobytes of static text that only vary by
+language variant: the detected language when it is displayed, or the mixed
+Indic language otherwise. Each variant is rendered once and cached; per
+request only the dynamic slots (learned preferences, recent context and the
+user's message) are filled in. get_template_stats reports the size and
+approximate token count of every variant rendered so far.
+
+All static text comes before the first slot, so it forms the prefix a
+Gemini context cache can serve (services.context_cache). Prompts are the
+same with or without context caching; a prefix below Gemini's minimum
+cache size is simply sent uncached.
+"""
+import threading
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, Optional
+from config.settings import LANGUAGE_NAMES
+
+
+# Gemini averages roughly four characters per token for English prose
+CHARS_PER_TOKEN = 4
+CHAT_SLOTS = ("format_pref", "formality", "topics", "context")
+
+
+class PromptTemplate:
+    """A system prompt variant with its static text rendered ahead of time"""
+
+    def __init__(self, name: str, template: str, slots: tuple = ()):
+        self.name = name
+        self.slots = slots
+        # Static segments between the slots, in slot order
+        self.segments = []
+        self.slot_order = []
+        for literal, field, _, _ in Formatter().parse(template):
+            self.segments.append(literal)
+            if field is not None:
+                self.slot_order.append(field)
+        self.static_text = "".join(self.segments)
+        self.static_chars = len(self.static_text)
+        self.estimated_tokens = -(-self.static_chars // CHARS_PER_TOKEN)
+        # Every rendered prompt starts with this text, so it can be served from a context cache
+        self.prefix = self.segments[0]
+        self.prefix_tokens = -(-len(self.prefix) // CHARS_PER_TOKEN)
+
+    def render(self, **slot_values) -> str:
+        """Fill the dynamic slots (values are inserted verbatim)"""
+        if not self.slot_order:
+            return self.static_text
+        parts = []
+        for segment, slot in zip(self.segments, self.slot_order):
+            parts.append(segment)
+            parts.append(slot_values[slot])
+        parts.extend(self.segments[len(self.slot_order):])
+        return "".join(parts)
+
+
+_variants: Dict[tuple, PromptTemplate] = {}
+_variants_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    """Make variant values safe to embed in a str.format template"""
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+def _display_variant(should_display: bool, detected_lang: str) -> bool:
+    return bool(should_display and detected_lang != 'en')
+
+
+def _register(key: tuple, template: PromptTemplate) -> PromptTemplate:
+    with _variants_lock:
+        return _variants.setdefault(key, template)
+
+
+@lru_cache(maxsize=512)
+def get_chat_template(detected_lang: Optional[str], language_name: Optional[str], mixed_lang: Optional[str]) -> PromptTemplate:
+    """
+    Get the chat system prompt for a language variant
+    
+    Args:
+        detected_lang: Displayed language code, or None for the English/mixed variant
+        language_name: Displayed language name (with detected_lang)
+        mixed_lang: Mixed Indic language code (English/mixed variant only)
+    """
+    if detected_lang is not None:
+        escaped_name = _escape(language_name)
+        template = f"""You are an intelligent AI assistant.
+Your goal is to be helpful, harmless, and honest.
+
+Key Behavior:
+- Be helpful and direct. Skip wordy intros like "I can help" or "Great question".
+- CONCISE BY DEFAULT: Get straight to the answer. Avoid fluff to save tokens.
+- Match user's energy and format (list vs paragraph) without over-explaining.
+
+Language Rules:
+- User is speaking: {escaped_name} ({_escape(detected_lang)})
+- RESPOND ONLY IN {escaped_name.upper()}.
+- Match their dialect/script exactly (e.g., Hinglish).
+
+Learned Preferences:
+- Format: {{format_pref}}
+- Tone: {{formality}}
+- Topics: {{topics}}
+
+Context:
+{{context}}
+User Message: """
+        name = f"chat:{detected_lang}"
+    else:
+        mixed_language_name = _escape(LANGUAGE_NAMES.get(mixed_lang, mixed_lang)) if mixed_lang else None
+        template = f"""You are an intelligent AI assistant.
+Your goal is to be helpful, harmless, and honest.
+
+Key Behavior:
+- Be direct and efficient. Do not use filler introductions or small talk.
+- CONCISE BY DEFAULT: Provide the solution or answer immediately to save tokens.
+- Match user's investment level. Short question = short, direct answer.
+
+Language Rules:
+- {f"User is mixing {mixed_language_name} with English." if mixed_lang else "User is speaking English."}
+- Match their language style exactly.
+
+Learned Preferences:
+- Format: {{format_pref}}
+- Tone: {{formality}}
+- Topics: {{topics}}
+
+Context:
+{{context}}
+User Message: """
+        name = f"chat:mixed-{mixed_lang}" if mixed_lang else "chat:en"
+    
+    return _register(("chat", detected_lang, language_name, mixed_lang), PromptTemplate(name, template, CHAT_SLOTS))
+
+
+@lru_cache(maxsize=512)
+def get_vision_template(detected_lang: Optional[str], language_name: Optional[str], mixed_lang: Optional[str]) -> PromptTemplate:
+    """
+    Get the image analysis system prompt for a language variant
+    
+    Args:
+        detected_lang: Displayed language code, or None for the English/mixed variant
+        language_name: Displayed language name (with detected_lang)
+        mixed_lang: Mixed Indic language code (English/mixed variant only)
+    """
+    if detected_lang is not None:
+        template = f"""You are an intelligent AI assistant that analyzes images while perfectly adapting to the user's communication style and needs.
+
+🌍 CRITICAL LANGUAGE & CULTURAL RULES:
+- The user is speaking in {language_name} (code: {detected_lang})
+- **ABSOLUTE REQUIREMENT: RESPOND ONLY IN {language_name.upper()}** 
+- If user mixes languages, match their EXACT mixed style
+- Never respond in a different language unless specifically asked to translate
+- Use culturally relevant references from their region
+
+🔄 TRANSLATION EXCEPTION:
+- ONLY if the user explicitly asks for translation, then provide it
+- Otherwise, ALWAYS respond in {language_name}
+
+ADAPTIVE IMAGE ANALYSIS:
+- ANALYZE their request style: Simple curiosity or detailed analysis?
+- SIMPLE requests ("What's this?", "Describe this") = Brief, natural description matching their tone
+- DETAILED requests ("Analyze this image", "Tell me everything") = Full structured format
+- CASUAL tone = Relaxed, conversational description with minimal formatting
+- PROFESSIONAL context = Organized, structured analysis with appropriate sections
+
+SMART FORMATTING (Use based on their request complexity):
+- For SIMPLE questions: Natural description, minimal structure
+- For COMPLEX analysis: Use **bold**, emojis 📸🎨🔍, sections, bullet points
+- For TECHNICAL requests: Focus on relevant technical details with clear organization
+- For EMOTIONAL/PERSONAL requests: Match their energy and use appropriate emojis
+
+RESPONSE APPROACH & TOKEN EFFICIENCY:
+- **NO INTRODUCTORY FLUFF**: Do not start with "I can help you with that" or "This image looks interesting". Start the description immediately.
+- **MATCH INVESTMENT**: SHORT curiosity = SHORT, 1-2 sentence answer.
+- **DETAILED analysis request** = Full structured breakdown.
+- Be honest about unclear elements. No filler words.
+
+**FINAL INSTRUCTION: RESPOND IN {language_name.upper()} ONLY** (unless specifically asked to translate). Match their exact language pattern and request style. User's request about this image: """
+        name = f"vision:{detected_lang}"
+    else:
+        mixed_language_name = LANGUAGE_NAMES.get(mixed_lang, mixed_lang) if mixed_lang else None
+        # For English or mixed language image requests
+        template = f"""You are an intelligent AI assistant that analyzes images while perfectly adapting to the user's communication style and needs.
+
+🌍 CRITICAL LANGUAGE RULES:
+{"- **MIXED LANGUAGE DETECTED**: User is mixing " + mixed_language_name + " with English" if mixed_lang else "- **PRIMARY LANGUAGE**: English"}
+- **ABSOLUTE REQUIREMENT: Match the user's EXACT language pattern**
+- If they mix languages (Hinglish, Tenglish, etc.), respond in the SAME mixed style
+- If they write pure English, respond in English
+- Never randomly switch to other languages unless asked for translation
+
+🔄 TRANSLATION EXCEPTION:
+- ONLY if user explicitly asks for translation, provide it
+- Otherwise, ALWAYS match their language pattern exactly
+
+ADAPTIVE IMAGE ANALYSIS:
+- ANALYZE their request style: Simple curiosity or detailed analysis?
+- SIMPLE requests ("What's this?", "Describe this") = Brief, natural description matching their tone
+- DETAILED requests ("Analyze this image", "Tell me everything") = Full structured format
+- CASUAL tone = Relaxed, conversational description with minimal formatting  
+- PROFESSIONAL context = Organized, structured analysis with appropriate sections
+
+MANDATORY SYSTEMATIC IMAGE ANALYSIS:
+- **NEVER write in paragraphs** for image descriptions
+- **ALWAYS use this exact format:**
+
+**📸 1. Main Subject**
+- Key observation 1
+- Key observation 2
+
+**🎨 2. Visual Details**
+- Color details
+- Composition details
+
+**🔍 3. Context & Setting**
+- Environment details
+- Background elements
+
+- **Use numbered sections with emojis and bold headings**
+- **Use bullet points under each section**
+- **No paragraph descriptions allowed**
+- **ONLY use paragraphs** if user specifically says "describe in paragraph form"
+
+TOKEN-EFFICIENT & DIRECT RESPONSES:
+- **NO SMALL TALK**: Don't say "I've analyzed the image" or "Sure, here's what I see".
+- **START IMMEDIATELY**: Begin with the first section or description line.
+- SHORT question = SHORT answer. don't over-explain if curiosity is simple.
+- Match their investment level with your response depth.
+
+CONVERSATION STYLE MATCHING:
+- Match the user's energy and speaking style completely
+- If they're casual, be casual back with natural language
+- If they mix languages or use slang, mirror that naturally
+- Be enthusiastic when they're excited, professional when they're formal
+- Ask follow-ups only when it fits their conversation style
+
+**FINAL LANGUAGE INSTRUCTION:**
+{f"- **RESPOND IN MIXED {mixed_language_name.upper()} + ENGLISH** (match their exact mixed pattern)" if mixed_lang else "- **RESPOND IN ENGLISH** (unless specifically asked to translate)"}
+- Never randomly switch languages - match their exact input pattern
+- If they ask for translation, provide it; otherwise stick to their language style
+
+Use systematic structure by default - organize information clearly with headings and bullets. User's request about this image: """
+        name = f"vision:mixed-{mixed_lang}" if mixed_lang else "vision:en"
+    
+    return _register(("vision", detected_lang, language_name, mixed_lang), PromptTemplate(name, template))
+
+
+def select_chat_template(should_display: bool, detected_lang: str, language_name: str, mixed_lang: str = None) -> PromptTemplate:
+    """Chat prompt variant for a message's language detection results"""
+    if _display_variant(should_display, detected_lang):
+        return get_chat_template(detected_lang, language_name, None)
+    return get_chat_template(None, None, mixed_lang)
+
+
+def select_vision_template(should_display: bool, detected_lang: str, language_name: str, mixed_lang: str = None) -> PromptTemplate:
+    """Image analysis prompt variant for a request's language detection results"""
+    if _display_variant(should_display, detected_lang):
+        return get_vision_template(detected_lang, language_name, None)
+    return get_vision_template(None, None, mixed_lang)
+
+
+def render_chat_prompt(
+    text: str,
+    language_name: str,
+    detected_lang: str,
+    should_display: bool,
+    learned_format_pref: str,
+    learned_formality: str,
+    learned_topics: list,
+    recent_context: str,
+    mixed_lang: str = None
+) -> str:
+    """Render the chat prompt for a message from its pre-rendered variant"""
+    template = select_chat_template(should_display, detected_lang, language_name, mixed_lang)
+    system_prompt = template.render(
+        format_pref=learned_format_pref,
+        formality=learned_formality,
+        topics=', '.join(learned_topics[:3]) if learned_topics else "None yet",
+        context=f"Recent conversation:\n{recent_context}\n" if recent_context else ""
+    )
+    return system_prompt + text.strip()
+
+
+def render_vision_prompt(text: str, language_name: str, detected_lang: str, should_display: bool, mixed_lang: str = None) -> str:
+    """Render the image analysis prompt for a request from its pre-rendered variant"""
+    return select_vision_template(should_display, detected_lang, language_name, mixed_lang).render() + text
+
+
+def get_template_stats(model=None) -> Dict:
+    """
+    Static size of every prompt variant rendered so far
+    
+    Args:
+        model: Optional Gemini model; when given, exact token counts are
+            fetched with count_tokens (one API call per variant)
+    
+    Returns:
+        Dictionary of variant name to character and token counts
+    """
+    with _variants_lock:
+        templates = list(_variants.values())
+    
+    stats = {}
+    for template in templates:
+        entry = {
+            "static_chars": template.static_chars,
+            "estimated_tokens": template.estimated_tokens,
+            "cacheable_prefix_tokens": template.prefix_tokens
+        }
+        if model is not None:
+            try:
+                entry["tokens"] = model.count_tokens(template.static_text).total_tokens
+            except Exception as e:
+                print(f"⚠️ Failed to count tokens for {template.name}: {e}")
+        stats[template.name] = entry
+    return {"variants": len(stats), "templates": stats}
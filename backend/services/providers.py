@@ -0,0 +1,33 @@
+"""
+Dependency Providers
+FastAPI dependencies that hand routes their backing resources at request
+time instead of capturing them as module globals on import. Tests can
+swap any of them with app.dependency_overrides.
+"""
+import services.db_service as db_service
+import services.ai_service as ai_service
+from utils.concurrency import run_blocking
+
+
+async def get_chat_collection():
+    """MongoDB chat_history collection, or None in fallback in-memory mode"""
+    if db_service.reconnect_due():
+        await run_blocking(db_service.ensure_connection)
+    return db_service.get_chat_collection()
+
+
+async def get_db():
+    """MongoDB database, or None in fallback in-memory mode"""
+    if db_service.reconnect_due():
+        await run_blocking(db_service.ensure_connection)
+    return db_service.get_db()
+
+
+def get_text_provider():
+    """LLM provider for text chat (LLM_PROVIDER), created on first use"""
+    return ai_service.get_text_provider()
+
+
+def get_vision_provider():
+    """LLM provider for image chat (LLM_PROVIDER), created on first use"""
+    return ai_service.get_vision_provider()
@@ -0,0 +1,293 @@
+"""
+Response Cache
+Answers repeated short, context-free questions ("what is photosynthesis",
+greetings) without another Gemini round trip.
+
+Entries are keyed on the normalized message, the prompt variant (detected
+or mixed language) and the learned-preference tuple, i.e. everything the
+prompt is built from. Messages sent with recent conversation context are
+never cached. Lookups go through three tiers:
+
+1. exact match in a bounded in-process LRU with TTL
+2. optional near-duplicate match: MinHash signatures of character
+   shingles, bucketed with LSH bands, compared against
+   RESPONSE_CACHE_SIMILARITY_THRESHOLD
+3. optional exact match in the `response_cache` collection, shared by all
+   workers and expired by a TTL index
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from config.settings import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_MAX_MESSAGE_CHARS,
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    RESPONSE_CACHE_PERSISTENT
+)
+import services.db_service as db_service
+from utils.concurrency import run_blocking
+
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+TRAILING_PUNCTUATION = ' ?!.,;:'
+
+# MinHash: NUM_PERMUTATIONS hash functions h(x) = (a*x + b) mod p over
+# CRC32s of character shingles, split into LSH bands of BAND_SIZE rows
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 32
+BAND_SIZE = 4
+MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % MERSENNE_PRIME | 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % MERSENNE_PRIME)
+    for i in range(NUM_PERMUTATIONS)
+]
+
+
+def normalize_message(text: str) -> str:
+    """Case-, width- and whitespace-insensitive form of a message"""
+    normalized = unicodedata.normalize('NFKC', text).lower()
+    return WHITESPACE_PATTERN.sub(' ', normalized).strip(TRAILING_PUNCTUATION)
+
+
+def minhash_signature(text: str) -> tuple:
+    """MinHash signature of the text's character shingles"""
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+    return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def signature_similarity(first: tuple, second: tuple) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class ResponseCacheKey:
+    """Identifies a cacheable request: message, prompt variant and preferences"""
+    __slots__ = ("digest", "context", "normalized")
+
+    def __init__(self, normalized: str, context: str):
+        self.normalized = normalized
+        self.context = context
+        self.digest = hashlib.blake2b(f"{context}\x00{normalized}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+class _CacheEntry:
+    __slots__ = ("response", "expires_at", "context", "signature")
+
+    def __init__(self, response: str, expires_at: float, context: str, signature: Optional[tuple]):
+        self.response = response
+        self.expires_at = expires_at
+        self.context = context
+        self.signature = signature
+
+
+class ResponseCache:
+    """Tiered LRU + TTL cache of generated responses"""
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: int = 3600, max_message_chars: int = 200,
+                 similarity_threshold: float = 0.0, persistent: bool = False, enabled: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_message_chars = max_message_chars
+        self.similarity_threshold = similarity_threshold
+        self.persistent = persistent
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bands: Dict[tuple, set] = {}
+        self._lock = threading.Lock()
+        self._generation_seconds = 0.0
+        self._generations = 0
+        self._stats = {"exact_hits": 0, "similar_hits": 0, "persistent_hits": 0, "misses": 0, "stores": 0,
+                       "evictions": 0, "seconds_saved": 0.0}
+
+    def make_key(self, text: str, variant: str, preferences: tuple, has_context: bool) -> Optional[ResponseCacheKey]:
+        """
+        Build the cache key for a request, or None if it must not be cached
+
+        Args:
+            text: User's message
+            variant: Prompt variant name (encodes the language handling)
+            preferences: Learned-preference tuple the prompt was built with
+            has_context: Whether recent conversation was included in the prompt
+        """
+        if not self.enabled or has_context:
+            return None
+        normalized = normalize_message(text)
+        if not normalized or len(normalized) > self.max_message_chars:
+            return None
+        return ResponseCacheKey(normalized, f"{variant}|{preferences!r}")
+
+    async def get(self, key: Optional[ResponseCacheKey]) -> Optional[str]:
+        """Look a request up in every tier; returns the cached response or None"""
+        if key is None:
+            return None
+
+        response = self._get_local(key)
+        if response is None and self.persistent:
+            response = await run_blocking(self._get_persistent, key)
+            if response is not None:
+                self._put_local(key, response)
+                self._record_hit("persistent_hits")
+
+        if response is None:
+            self._stats["misses"] += 1
+        return response
+
+    async def put(self, key: Optional[ResponseCacheKey], response: str, generation_seconds: float):
+        """
+        Cache a freshly generated response
+
+        Args:
+            key: Key from make_key (None is ignored)
+            response: Generated response
+            generation_seconds: How long generation took, used to estimate time saved by hits
+        """
+        if key is None or not response:
+            return
+        self._generation_seconds += generation_seconds
+        self._generations += 1
+        self._put_local(key, response)
+        self._stats["stores"] += 1
+        if self.persistent:
+            await run_blocking(self._put_persistent, key, response)
+
+    def get_stats(self) -> Dict:
+        hits = self._stats["exact_hits"] + self._stats["similar_hits"] + self._stats["persistent_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "persistent": self.persistent,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "avg_generation_seconds": round(self._generation_seconds / self._generations, 3) if self._generations else 0.0,
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in self._stats.items()}
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+
+    def _record_hit(self, tier: str):
+        self._stats[tier] += 1
+        if self._generations:
+            self._stats["seconds_saved"] += self._generation_seconds / self._generations
+
+    def _get_local(self, key: ResponseCacheKey) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key.digest)
+            if entry is not None and entry.expires_at < now:
+                self._remove(key.digest)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key.digest)
+                response, tier = entry.response, "exact_hits"
+            elif self.similarity_threshold > 0:
+                response, tier = self._find_similar(key, now), "similar_hits"
+            else:
+                response = None
+
+        if response is not None:
+            self._record_hit(tier)
+        return response
+
+    def _find_similar(self, key: ResponseCacheKey, now: float) -> Optional[str]:
+        signature = minhash_signature(key.normalized)
+        candidates = set()
+        for band in self._band_keys(key.context, signature):
+            candidates.update(self._bands.get(band, ()))
+
+        best_digest, best_similarity = None, self.similarity_threshold
+        for digest in candidates:
+            entry = self._entries.get(digest)
+            if entry is None or entry.expires_at < now:
+                continue
+            similarity = signature_similarity(signature, entry.signature)
+            if similarity >= best_similarity:
+                best_digest, best_similarity = digest, similarity
+
+        if best_digest is None:
+            return None
+        self._entries.move_to_end(best_digest)
+        return self._entries[best_digest].response
+
+    def _put_local(self, key: ResponseCacheKey, response: str):
+        signature = minhash_signature(key.normalized) if self.similarity_threshold > 0 else None
+        with self._lock:
+            self._remove(key.digest)
+            self._entries[key.digest] = _CacheEntry(response, time.monotonic() + self.ttl_seconds, key.context, signature)
+            if signature is not None:
+                for band in self._band_keys(key.context, signature):
+                    self._bands.setdefault(band, set()).add(key.digest)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, digest: str):
+        entry = self._entries.pop(digest, None)
+        if entry is None or entry.signature is None:
+            return
+        for band in self._band_keys(entry.context, entry.signature):
+            members = self._bands.get(band)
+            if members is not None:
+                members.discard(digest)
+                if not members:
+                    del self._bands[band]
+
+    @staticmethod
+    def _band_keys(context: str, signature: tuple) -> List[tuple]:
+        return [(context, start, signature[start:start + BAND_SIZE]) for start in range(0, len(signature), BAND_SIZE)]
+
+    def _get_persistent(self, key: ResponseCacheKey) -> Optional[str]:
+        db = db_service.get_db()
+        if db is None:
+            return None
+        try:
+            document = db.response_cache.find_one(
+                {"_id": key.digest, "expires_at": {"$gt": datetime.utcnow()}},
+                {"response": 1}
+            )
+            return document["response"] if document else None
+        except Exception as e:
+            print(f"⚠️ Failed to read response cache: {e}")
+            return None
+
+    def _put_persistent(self, key: ResponseCacheKey, response: str):
+        db = db_service.get_db()
+        if db is None:
+            return
+        try:
+            now = datetime.utcnow()
+            db.response_cache.replace_one(
+                {"_id": key.digest},
+                {"response": response, "created_at": now, "expires_at": now + timedelta(seconds=self.ttl_seconds)},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to store response cache entry: {e}")
+
+
+# Global response cache instance
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_SIZE,
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    max_message_chars=RESPONSE_CACHE_MAX_MESSAGE_CHARS,
+    similarity_threshold=RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    persistent=RESPONSE_CACHE_PERSISTENT,
+    enabled=RESPONSE_CACHE_ENABLED
+)
@@ -0,0 +1,226 @@
+"""
+Session State Cache
+In-process cache of per-session conversation state (recent messages,
+learned preferences and the last detected language) so that each chat
+message does not re-read MongoDB.
+
+Entries are evicted least-recently-used first, expire after a TTL and are
+bounded both by count and by an approximate memory budget. db_service
+writes through to the cache whenever it stores interactions, preferences
+or feedback, and invalidates entries on deletion.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from config.settings import (
+    SESSION_CACHE_MAX_SESSIONS,
+    SESSION_CACHE_MAX_BYTES,
+    SESSION_CACHE_TTL_SECONDS,
+    SESSION_CACHE_RECENT_MESSAGES
+)
+
+
+ENTRY_OVERHEAD_BYTES = 512
+
+
+def _estimate_message_size(message: Dict) -> int:
+    """Rough memory footprint of a cached message document"""
+    return ENTRY_OVERHEAD_BYTES + len(message.get("user_input") or "") + len(message.get("bot_response") or "")
+
+
+class _SessionEntry:
+    __slots__ = ("messages", "messages_loaded", "preferences", "language", "expires_at", "size")
+
+    def __init__(self, ring_size: int):
+        self.messages = deque(maxlen=ring_size)  # oldest -> newest
+        self.messages_loaded = False
+        self.preferences: Optional[Dict] = None
+        self.language: Optional[tuple] = None
+        self.expires_at = 0.0
+        self.size = ENTRY_OVERHEAD_BYTES
+
+    def recompute_size(self):
+        self.size = ENTRY_OVERHEAD_BYTES + sum(_estimate_message_size(m) for m in self.messages)
+
+
+class SessionStateCache:
+    """Thread-safe LRU + TTL cache of session state keyed by session_id"""
+
+    def __init__(self, max_sessions: int, max_bytes: int, ttl_seconds: int, ring_size: int):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.ring_size = ring_size
+        self._entries: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get_recent_messages(self, session_id: str, limit: int) -> Optional[List[Dict]]:
+        """
+        Get cached recent messages, newest first
+
+        Returns:
+            List of message documents, or None on a cache miss
+        """
+        with self._lock:
+            entry = self._get_entry(session_id)
+            if entry is None or not entry.messages_loaded or limit > self.ring_size:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return [dict(m) for m in reversed(entry.messages)][:limit]
+
+    def set_recent_messages(self, session_id: str, messages: List[Dict]) -> List[Dict]:
+        """
+        Populate the ring buffer from a newest-first query result
+
+        Messages appended while the query was running are merged in by _id
+        rather than overwritten, and the cached copy of a message wins over
+        the queried one, since it carries every write-through since.
+
+        Returns:
+            The cached window, newest first
+        """
+        with self._lock:
+            entry = self._get_or_create(session_id)
+            merged = {m["_id"]: dict(m) for m in messages[:self.ring_size]}
+            merged.update((m["_id"], m) for m in entry.messages)
+            ordered = sorted(merged.values(), key=lambda m: m["timestamp"])
+            entry.messages.clear()
+            entry.messages.extend(ordered[-self.ring_size:])
+            entry.messages_loaded = True
+            self._resize(entry)
+            return [dict(m) for m in reversed(entry.messages)]
+
+    def append_message(self, session_id: str, message: Dict):
+        """
+        Write-through of a newly stored interaction
+
+        Recorded even before the session's history is loaded, so that a load
+        already in flight merges it in instead of caching a stale window.
+        """
+        with self._lock:
+            entry = self._get_or_create(session_id)
+            entry.messages.append(dict(message))
+            self._resize(entry)
+
+    def update_message(self, session_id: str, interaction_id: str, fields: Dict):
+        """Write-through of an update to a cached interaction (e.g. feedback)"""
+        with self._lock:
+            entry = self._get_entry(session_id)
+            if entry is None:
+                return
+            for message in entry.messages:
+                if message.get("_id") == interaction_id:
+                    message.update(fields)
+
+    def get_preferences(self, session_id: str) -> Optional[Dict]:
+        """
+        Get cached learned preferences
+
+        Returns:
+            Preferences dictionary, or None on a cache miss
+        """
+        with self._lock:
+            entry = self._get_entry(session_id)
+            if entry is None or entry.preferences is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return dict(entry.preferences)
+
+    def set_preferences(self, session_id: str, preferences: Dict):
+        """Populate or write through learned preferences"""
+        with self._lock:
+            entry = self._get_or_create(session_id)
+            entry.preferences = dict(preferences)
+
+    def get_language_prior(self, session_id: str) -> Optional[tuple]:
+        """Last language detected in the session, as (script_class, detection_result)"""
+        with self._lock:
+            entry = self._get_entry(session_id)
+            return entry.language if entry is not None else None
+
+    def set_language_prior(self, session_id: str, script_class: str, detection: tuple):
+        with self._lock:
+            entry = self._get_or_create(session_id)
+            entry.language = (script_class, detection)
+
+    def prime_new_session(self, session_id: str):
+        """Record a brand-new session, whose history is known to be empty"""
+        with self._lock:
+            entry = self._get_or_create(session_id)
+            entry.messages_loaded = True
+            if entry.preferences is None:
+                entry.preferences = {}
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "sessions": len(self._entries),
+                "approx_bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                **self._stats
+            }
+
+    def _get_entry(self, session_id: str) -> Optional[_SessionEntry]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._remove(session_id)
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(session_id)
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        return entry
+
+    def _get_or_create(self, session_id: str) -> _SessionEntry:
+        entry = self._get_entry(session_id)
+        if entry is None:
+            entry = _SessionEntry(self.ring_size)
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[session_id] = entry
+            self._total_bytes += entry.size
+            self._evict()
+        return entry
+
+    def _resize(self, entry: _SessionEntry):
+        self._total_bytes -= entry.size
+        entry.recompute_size()
+        self._total_bytes += entry.size
+        self._evict()
+
+    def _remove(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_sessions or self._total_bytes > self.max_bytes):
+            session_id, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            self._stats["evictions"] += 1
+
+
+# Global session cache instance
+session_cache = SessionStateCache(
+    max_sessions=SESSION_CACHE_MAX_SESSIONS,
+    max_bytes=SESSION_CACHE_MAX_BYTES,
+    ttl_seconds=SESSION_CACHE_TTL_SECONDS,
+    ring_size=SESSION_CACHE_RECENT_MESSAGES
+)
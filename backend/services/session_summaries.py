@@ -0,0 +1,147 @@
+"""
+Session Summary Maintenance
+Keeps the materialized `sessions` collection (one document per chat
+session with its title, message count and latest activity) in step with
+`chat_history`, so the sidebar never has to aggregate the full history.
+
+Usage (one-shot backfill / repair of every session summary):
+    python -m services.session_summaries
+"""
+from datetime import datetime
+from typing import Dict
+from pymongo import ReturnDocument
+
+
+def record_message(db, document: Dict):
+    """
+    Fold a newly inserted chat_history document into its session summary
+
+    Args:
+        db: pymongo Database instance
+        document: The inserted chat_history document
+    """
+    db.sessions.update_one(
+        {"_id": document["session_id"]},
+        {
+            "$inc": {"message_count": 1},
+            "$max": {"latest_timestamp": document["timestamp"]},
+            "$setOnInsert": {
+                "first_message": document.get("user_input", ""),
+                "first_message_id": document["_id"],
+                "created_at": document["timestamp"]
+            }
+        },
+        upsert=True
+    )
+
+
+def record_deletion(db, document: Dict):
+    """
+    Account for a deleted chat_history document in its session summary
+
+    Args:
+        db: pymongo Database instance
+        document: The deleted chat_history document
+    """
+    session_id = document.get("session_id")
+    if not session_id:
+        return
+
+    summary = db.sessions.find_one_and_update(
+        {"_id": session_id},
+        {"$inc": {"message_count": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if summary is None:
+        return
+
+    if summary["message_count"] <= 0:
+        db.sessions.delete_one({"_id": session_id, "message_count": {"$lte": 0}})
+    elif summary.get("first_message_id") == document.get("_id") or summary.get("latest_timestamp") == document.get("timestamp"):
+        # The title or latest activity came from the deleted message
+        repair_session(db, session_id)
+
+
+def remove_session(db, session_id: str):
+    """Drop the summary for a deleted session"""
+    db.sessions.delete_one({"_id": session_id})
+
+
+def repair_session(db, session_id: str):
+    """Recompute one session's summary from chat_history"""
+    messages = db.chat_history.find(
+        {"session_id": session_id},
+        {"user_input": 1, "timestamp": 1}
+    ).sort("timestamp", 1)
+
+    first = None
+    latest = None
+    count = 0
+    for message in messages:
+        if first is None:
+            first = message
+        latest = message
+        count += 1
+
+    if count == 0:
+        remove_session(db, session_id)
+        return
+
+    db.sessions.replace_one(
+        {"_id": session_id},
+        {
+            "message_count": count,
+            "latest_timestamp": latest.get("timestamp"),
+            "first_message": first.get("user_input", ""),
+            "first_message_id": first["_id"],
+            "created_at": first.get("timestamp")
+        },
+        upsert=True
+    )
+
+
+def rebuild_all(db) -> int:
+    """
+    Rebuild every session summary from chat_history in one server-side
+    aggregation and drop summaries for sessions that no longer exist
+
+    Args:
+        db: pymongo Database instance
+
+    Returns:
+        Number of session summaries after the rebuild
+    """
+    started_at = datetime.utcnow()
+    db.chat_history.aggregate([
+        {"$match": {"session_id": {"$exists": True, "$ne": None}}},
+        {"$sort": {"session_id": 1, "timestamp": 1}},
+        {"$group": {
+            "_id": "$session_id",
+            "message_count": {"$sum": 1},
+            "latest_timestamp": {"$max": "$timestamp"},
+            "first_message": {"$first": "$user_input"},
+            "first_message_id": {"$first": "$_id"},
+            "created_at": {"$first": "$timestamp"}
+        }},
+        {"$set": {"rebuilt_at": started_at}},
+        {"$merge": {"into": "sessions", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ], allowDiskUse=True)
+
+    # Summaries upserted by live traffic during the rebuild are kept
+    db.sessions.delete_many({"$or": [
+        {"rebuilt_at": {"$lt": started_at}},
+        {"rebuilt_at": {"$exists": False}, "latest_timestamp": {"$lt": started_at}}
+    ]})
+    return db.sessions.count_documents({})
+
+
+if __name__ == "__main__":
+    import services.db_service as db_service
+
+    db_service.initialize_mongodb()
+    database = db_service.get_db()
+    if database is None:
+        raise SystemExit("MongoDB unavailable")
+
+    total = rebuild_all(database)
+    print(f"✅ Rebuilt {total} session summaries")
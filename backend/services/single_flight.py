@@ -0,0 +1,137 @@
+"""
+Single-Flight Request Coalescing
+Concurrent requests for the same key share one upstream call.
+
+do() runs one coroutine per key and hands its result (or exception) to
+every caller waiting on that key. stream() does the same for async
+generators: the upstream stream is consumed once and every subscriber
+receives all chunks, including those produced before it joined. The
+upstream call is shielded from a single caller's cancellation; a shared
+stream is only abandoned once its last subscriber has gone.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class _SharedStream:
+    """One upstream async generator fanned out to any number of subscribers"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._updated = asyncio.Event()
+
+    async def pump(self, source: AsyncIterator):
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            await source.aclose()
+
+    async def subscribe(self):
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._updated.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.task is not None:
+                # Nobody is listening any more: stop generating
+                self.task.cancel()
+
+    def _notify(self):
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+
+class SingleFlight:
+    """Coalesces identical in-flight calls and streams by key"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self._stats = {"calls": 0, "coalesced": 0, "streams": 0, "coalesced_stream_subscribers": 0}
+
+    async def do(self, key: str, func: Callable[[], Awaitable]):
+        """
+        Await func() once per key across concurrent callers
+
+        Args:
+            key: Identity of the call (e.g. a hash of the full prompt)
+            func: Zero-argument coroutine function making the upstream call
+
+        Returns:
+            The shared result
+        """
+        if not self.enabled:
+            return await func()
+
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda finished: self._forget(self._calls, key, finished))
+            self._stats["calls"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        # A cancelled caller must not cancel the call other callers are waiting on
+        return await asyncio.shield(task)
+
+    def stream(self, key: str, func: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """
+        Subscribe to the shared stream for key, starting func() if none is running
+
+        Args:
+            key: Identity of the stream (e.g. a hash of the full prompt)
+            func: Zero-argument function returning the upstream async generator
+
+        Returns:
+            Async generator of all chunks of the shared stream
+        """
+        if not self.enabled:
+            return func()
+
+        shared = self._streams.get(key)
+        if shared is None or shared.done:
+            shared = _SharedStream()
+            shared.task = asyncio.ensure_future(shared.pump(func()))
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda _: self._forget(self._streams, key, shared))
+            self._stats["streams"] += 1
+        else:
+            self._stats["coalesced_stream_subscribers"] += 1
+        return shared.subscribe()
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight_calls": len(self._calls),
+            "in_flight_streams": len(self._streams),
+            **self._stats
+        }
+
+    @staticmethod
+    def _forget(registry: Dict, key: str, value):
+        if registry.get(key) is value:
+            del registry[key]
+        if isinstance(value, asyncio.Task) and not value.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            value.exception()
@@ -0,0 +1,190 @@
+"""
+Write-Behind Buffer
+Groups chat_history and user_feedback inserts into insert_many batches.
+
+Documents are flushed by a background thread when a batch fills up or the
+flush interval elapses, and on shutdown through the app lifespan. When the
+buffer reaches its pending limit the writer flushes inline, so memory stays
+bounded and producers slow down to the database's pace. Documents waiting
+in the buffer remain visible through pending() so session reads can
+overlay them.
+
+scripts/bench_write_buffer.py compares it with insert_one per document.
+"""
+import threading
+from typing import Callable, Dict, List, Optional
+from pymongo.errors import BulkWriteError
+from config.settings import (
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_INTERVAL_MS,
+    WRITE_BEHIND_MAX_PENDING
+)
+
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class WriteBehindBuffer:
+    """Thread-safe buffer that writes documents to one collection in batches"""
+
+    def __init__(self, collection_name: str, batch_size: int = 100, flush_interval: float = 0.2, max_pending: int = 5000):
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._documents: List[Dict] = []
+        self._in_flight: List[Dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._get_db: Optional[Callable] = None
+        self._stats = {
+            "buffered": 0,
+            "written": 0,
+            "batches": 0,
+            "backpressure_flushes": 0,
+            "failed_batches": 0,
+            "dropped": 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, get_db: Callable):
+        """
+        Start the background flusher
+
+        Args:
+            get_db: Callable returning the current pymongo Database (or None)
+        """
+        if self.running:
+            return
+        self._get_db = get_db
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.collection_name}", daemon=True)
+        self._thread.start()
+        print(f"🧺 Write-behind buffer started for {self.collection_name} (batch {self.batch_size})")
+
+    def stop(self):
+        """Stop the flusher and write out everything still buffered"""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        with self._lock:
+            if self._documents:
+                print(f"⚠️ Write-behind buffer for {self.collection_name} stopped with {len(self._documents)} unwritten documents")
+
+    def add(self, document: Dict):
+        """Buffer a document for insertion"""
+        with self._lock:
+            self._documents.append(document)
+            self._stats["buffered"] += 1
+            pending = len(self._documents)
+            if pending >= self.max_pending:
+                self._stats["backpressure_flushes"] += 1
+
+        if pending >= self.max_pending:
+            # Backpressure: the writer pays for the flush instead of growing the buffer
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all buffered documents; returns once in-flight batches have landed"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._documents[:self.batch_size]
+                    del self._documents[:self.batch_size]
+                    self._in_flight = batch
+                if not batch:
+                    return
+                written = self._write(batch)
+                with self._lock:
+                    self._in_flight = []
+                    if not written:
+                        self._requeue(batch)
+                if not written:
+                    return
+
+    def pending(self, predicate: Callable[[Dict], bool]) -> List[Dict]:
+        """Buffered (not yet written) documents matching predicate, oldest first"""
+        with self._lock:
+            return [dict(document) for document in self._in_flight + self._documents if predicate(document)]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "collection": self.collection_name,
+                "running": self.running,
+                "pending": len(self._documents) + len(self._in_flight),
+                "batch_size": self.batch_size,
+                "max_pending": self.max_pending,
+                **self._stats
+            }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Write-behind flush failed for {self.collection_name}: {e}")
+
+    def _write(self, batch: List[Dict]) -> bool:
+        """Insert one batch; returns False if it should be retried later"""
+        db = self._get_db() if self._get_db else None
+        if db is None:
+            self._stats["failed_batches"] += 1
+            return False
+
+        try:
+            db[self.collection_name].insert_many(batch, ordered=False)
+            self._stats["written"] += len(batch)
+        except BulkWriteError as e:
+            # Unordered: everything but the failed documents was written.
+            # Duplicate keys come from a retried batch that partly landed.
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+            self._stats["written"] += e.details.get("nInserted", 0)
+            if errors:
+                self._stats["dropped"] += len(errors)
+                print(f"⚠️ {len(errors)} {self.collection_name} documents rejected: {errors[0].get('errmsg')}")
+        except Exception as e:
+            self._stats["failed_batches"] += 1
+            print(f"⚠️ Write-behind batch for {self.collection_name} failed: {e}")
+            return False
+
+        self._stats["batches"] += 1
+        return True
+
+    def _requeue(self, batch: List[Dict]):
+        """Put a failed batch back in front, dropping the oldest documents beyond max_pending"""
+        self._documents[:0] = batch
+        overflow = len(self._documents) - self.max_pending
+        if overflow > 0:
+            del self._documents[:overflow]
+            self._stats["dropped"] += overflow
+            print(f"⚠️ Write-behind buffer for {self.collection_name} full, dropped {overflow} documents")
+
+
+# Global write-behind buffers (started by the app lifespan when WRITE_BEHIND_ENABLED)
+chat_history_buffer = WriteBehindBuffer(
+    "chat_history",
+    batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=WRITE_BEHIND_FLUSH_INTERVAL_MS / 1000,
+    max_pending=WRITE_BEHIND_MAX_PENDING
+)
+feedback_buffer = WriteBehindBuffer(
+    "user_feedback",
+    batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=WRITE_BEHIND_FLUSH_INTERVAL_MS / 1000,
+    max_pending=WRITE_BEHIND_MAX_PENDING
+)
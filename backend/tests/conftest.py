@@ -0,0 +1,41 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Tests import the backend's modules the way the app does (config, services, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """
+    A database wired into db_service: a throwaway database on the server at
+    TEST_MONGODB_URI if set, otherwise an in-memory mongomock database
+    """
+    import services.db_service as db_service
+    from services.db_indexes import ensure_indexes
+    from services.session_cache import session_cache
+
+    uri = os.getenv("TEST_MONGODB_URI")
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri)
+        database = client[f"test_{uuid.uuid4().hex[:12]}"]
+    else:
+        mongomock = pytest.importorskip("mongomock")
+        client = mongomock.MongoClient()
+        database = client.guru_multibot
+
+    ensure_indexes(database)
+    monkeypatch.setattr(db_service, "client", client)
+    monkeypatch.setattr(db_service, "db", database)
+    monkeypatch.setattr(db_service, "chat_collection", database.chat_history)
+    session_cache.clear()
+    yield database
+
+    session_cache.clear()
+    if uri:
+        client.drop_database(database.name)
+    client.close()
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+import routes.chat as chat_route
+import services.ai_service as ai_service
+from models.schemas import ChatRequest
+from services.llm_providers import LLMProvider
+from services.response_cache import ResponseCache
+
+
+class ScriptedProvider(LLMProvider):
+    """Returns the scripted responses in order; "" stands for an empty completion"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def generate(self, contents, template=None):
+        raise NotImplementedError
+
+    async def generate_async(self, contents, template=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+    async def stream(self, contents, template=None):
+        raise NotImplementedError
+        yield
+
+
+def test_fallback_response_is_not_cached(monkeypatch):
+    monkeypatch.setattr(chat_route, "response_cache", ResponseCache(enabled=True))
+    provider = ScriptedProvider(["", "Canberra."])
+    http_request = SimpleNamespace(client=SimpleNamespace(host="127.0.0.1"))
+
+    async def ask():
+        response = await chat_route.chat_endpoint(
+            ChatRequest(message="capital of australia?"), http_request, chat_collection=None, text_provider=provider
+        )
+        return response["response"]
+
+    assert asyncio.run(ask()) == ai_service.FALLBACK_RESPONSE
+    assert asyncio.run(ask()) == "Canberra."
+    assert asyncio.run(ask()) == "Canberra."
+    assert provider.calls == 2
@@ -0,0 +1,119 @@
+import asyncio
+import importlib
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import config.settings as settings
+import services.context_cache as context_cache_module
+import services.prompt_templates as prompt_templates
+from services.context_cache import ContextCacheManager
+
+
+class FakeCachedContent:
+    """Records calls the way genai.caching.CachedContent would receive them"""
+    created = []
+
+    def __init__(self, model, system_instruction, ttl):
+        self.model = model
+        self.system_instruction = system_instruction
+        self.ttl_updates = [ttl]
+
+    @classmethod
+    def create(cls, model, display_name, system_instruction, ttl):
+        cached_content = cls(model, system_instruction, ttl)
+        cls.created.append(cached_content)
+        return cached_content
+
+    def update(self, ttl):
+        self.ttl_updates.append(ttl)
+
+
+class FakeGenai:
+    caching = SimpleNamespace(CachedContent=FakeCachedContent)
+    GenerativeModel = SimpleNamespace(
+        from_cached_content=lambda cached_content: SimpleNamespace(cached_content=cached_content)
+    )
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(context_cache_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def reset_fake():
+    FakeCachedContent.created = []
+
+
+def test_prompts_do_not_depend_on_context_caching(monkeypatch):
+    prompt = prompt_templates.render_chat_prompt(
+        text="hello", language_name="English", detected_lang="en", should_display=False,
+        learned_format_pref="list", learned_formality="casual", learned_topics=[], recent_context=""
+    )
+    for enabled in (True, False):
+        monkeypatch.setattr(settings, "CONTEXT_CACHE_ENABLED", enabled)
+        reloaded = importlib.reload(prompt_templates)
+        assert reloaded.render_chat_prompt(
+            text="hello", language_name="English", detected_lang="en", should_display=False,
+            learned_format_pref="list", learned_formality="casual", learned_topics=[], recent_context=""
+        ) == prompt
+
+
+def test_cache_model_is_the_request_model():
+    assert settings.CONTEXT_CACHE_MODEL.split("/", 1)[1] == settings.GEMINI_MODEL_NAME.split("/")[-1]
+    assert context_cache_module.context_cache.model_name == settings.CONTEXT_CACHE_MODEL
+
+
+def test_create_reuse_and_ttl_refresh(clock):
+    manager = ContextCacheManager(
+        "models/test-model", ttl_seconds=600, min_tokens=1, enabled=True, refresh_margin_seconds=60, genai=FakeGenai
+    )
+    template = prompt_templates.select_chat_template(False, "en", "English")
+    prompt = template.render(format_pref="list", formality="casual", topics="None yet", context="") + "hello"
+    regular_model = object()
+
+    async def resolve():
+        return await manager.resolve(template, prompt, regular_model)
+
+    # First request creates the cache for the request model and sends only the uncached rest
+    cached_model, rest = asyncio.run(resolve())
+    assert len(FakeCachedContent.created) == 1
+    cached_content = FakeCachedContent.created[0]
+    assert cached_content.model == "models/test-model"
+    assert cached_content.system_instruction == template.prefix
+    assert cached_model.cached_content is cached_content
+    assert prompt == template.prefix + rest
+
+    # Later requests within the TTL reuse it
+    clock.now += 300
+    assert asyncio.run(resolve())[0] is cached_model
+    assert len(FakeCachedContent.created) == 1
+
+    # Close to expiry the TTL is extended instead of creating a new cache
+    clock.now += 250
+    assert asyncio.run(resolve())[0] is cached_model
+    assert len(FakeCachedContent.created) == 1
+    assert cached_content.ttl_updates == [timedelta(seconds=600), timedelta(seconds=600)]
+    assert manager.get_stats()["refreshed"] == 1
+    assert manager.get_stats()["hits"] == 3
+
+
+def test_small_prefix_uses_full_prompt(clock):
+    manager = ContextCacheManager("models/test-model", min_tokens=10 ** 6, enabled=True, genai=FakeGenai)
+    template = prompt_templates.select_vision_template(False, "en", "English")
+    regular_model = object()
+
+    assert asyncio.run(manager.resolve(template, "prompt", regular_model)) == (regular_model, "prompt")
+    assert FakeCachedContent.created == []
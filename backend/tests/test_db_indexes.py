@@ -0,0 +1,156 @@
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+import services.db_service as db_service
+from services.db_indexes import INDEX_SPECS, _winning_stages, ensure_indexes, planned_queries, verify_query_plans
+from services.learning_queue import MongoLearningJobStore
+from services.session_cache import session_cache
+
+
+def _explain(stage_tree):
+    return {"queryPlanner": {"winningPlan": stage_tree}}
+
+
+def test_winning_stages_flattens_plan_tree():
+    explain_result = _explain({
+        "stage": "LIMIT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "session_id_timestamp"}}
+    })
+
+    assert _winning_stages(explain_result) == ["LIMIT", "FETCH", "IXSCAN"]
+
+
+def test_winning_stages_follows_sbe_query_plan():
+    explain_result = _explain({"queryPlan": {"stage": "SORT", "inputStages": [{"stage": "COLLSCAN"}]}})
+
+    assert _winning_stages(explain_result) == ["SORT", "COLLSCAN"]
+
+
+def _shape(value):
+    """A filter with its values replaced, keeping field names and operators"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _shape(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_shape(item) for item in value)
+    return "?"
+
+
+class RecordingCursor:
+    def __init__(self, cursor, query):
+        self.cursor = cursor
+        self.query = query
+
+    def sort(self, key, direction=None):
+        self.query["sort"] = ((key, direction),) if direction is not None else tuple(key)
+        self.cursor = self.cursor.sort(key, direction) if direction is not None else self.cursor.sort(key)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+
+class RecordingCollection:
+    """Records the filter and sort of every read and delete issued on a collection"""
+
+    def __init__(self, collection, queries):
+        self.collection = collection
+        self.queries = queries
+
+    def _record(self, query_filter):
+        query = {"collection": self.collection.name, "filter": _shape(query_filter or {}), "sort": ()}
+        self.queries.append(query)
+        return query
+
+    def find(self, query_filter=None, *args, **kwargs):
+        query = self._record(query_filter)
+        return RecordingCursor(self.collection.find(query_filter, *args, **kwargs), query)
+
+    def find_one(self, query_filter=None, *args, **kwargs):
+        self._record(query_filter)
+        return self.collection.find_one(query_filter, *args, **kwargs)
+
+    def delete_many(self, query_filter, *args, **kwargs):
+        self._record(query_filter)
+        return self.collection.delete_many(query_filter, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+class RecordingDatabase:
+    def __init__(self, database):
+        self.database = database
+        self.queries = []
+
+    def __getitem__(self, name):
+        return RecordingCollection(self.database[name], self.queries)
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def _signature(query):
+    return query["collection"], query["filter"], query["sort"]
+
+
+def test_plan_check_covers_the_queries_db_service_issues(mongo_db, monkeypatch):
+    recording = RecordingDatabase(mongo_db)
+    planned_queries(recording)
+    planned = {_signature(query) for query in recording.queries}
+
+    recording.queries.clear()
+    monkeypatch.setattr(db_service, "db", recording)
+    monkeypatch.setattr(db_service, "chat_collection", recording.chat_history)
+    session_cache.clear()
+    before = datetime(2025, 1, 1)
+
+    db_service.get_recent_messages("s1")
+    db_service.get_session_messages("s1")
+    db_service.get_session_messages_page("s1")
+    db_service.get_session_messages_page("s1", before=before)
+    db_service.get_interaction_by_id("s1_1")
+    db_service.get_sessions_page()
+    db_service.get_sessions_page(before=(before, "s1"))
+    db_service.get_learned_preferences("s1")
+    db_service.calculate_learning_effectiveness()
+    db_service.delete_session("s1")
+    MongoLearningJobStore().load_pending()
+
+    issued = {_signature(query) for query in recording.queries if query["collection"] in INDEX_SPECS}
+    assert issued, recording.queries
+    assert issued <= planned, issued - planned
+
+
+def test_planned_collections_have_index_specs(mongo_db):
+    recording = RecordingDatabase(mongo_db)
+    planned_queries(recording)
+
+    assert {query["collection"] for query in recording.queries} <= set(INDEX_SPECS)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_MONGODB_URI"), reason="TEST_MONGODB_URI not set")
+def test_query_plans_use_indexes_on_mongodb():
+    from pymongo import MongoClient
+
+    client = MongoClient(os.getenv("TEST_MONGODB_URI"))
+    database = client[f"test_{uuid.uuid4().hex[:12]}"]
+    try:
+        # Without indexes the planner has nothing but collection scans
+        database.chat_history.insert_one({"_id": "probe", "session_id": "index-check", "timestamp": datetime.utcnow()})
+        assert not verify_query_plans(database)["get_recent_messages"]["uses_index"]
+
+        ensure_indexes(database)
+        report = verify_query_plans(database)
+        assert set(report) == set(planned_queries(database))
+        for query_name, result in report.items():
+            assert result["uses_index"], f"{query_name}: {result['stages']}"
+    finally:
+        client.drop_database(database.name)
+        client.close()
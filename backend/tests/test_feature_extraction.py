@@ -0,0 +1,14 @@
+from scripts.bench_feature_extraction import baseline_features, make_corpus
+import services.learning_service as learning_service
+
+
+def test_extractor_matches_per_feature_implementation():
+    for user_input, bot_response in make_corpus(3000):
+        assert learning_service.extract_interaction_features(user_input, bot_response) == baseline_features(user_input, bot_response), (user_input, bot_response)
+
+
+def test_batch_matches_single_extraction():
+    corpus = make_corpus(50, seed=11)
+    assert learning_service.extract_features_batch(corpus) == [
+        learning_service.extract_interaction_features(user_input, bot_response) for user_input, bot_response in corpus
+    ]
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import services.db_service as db_service
+from utils.interaction import learn_from_feedback
+
+
+FEEDBACK_SUBMISSIONS = 100
+
+
+def _submit_feedback(interaction_id: str, feedback_type: str):
+    """What POST /feedback does for an interaction that is already stored"""
+    feedback_data = {
+        "feedback_type": feedback_type,
+        "feedback_text": "",
+        "feedback_timestamp": datetime.utcnow()
+    }
+    interaction = db_service.update_interaction_feedback(interaction_id, feedback_data)
+    assert interaction is not None
+    learn_from_feedback(interaction, feedback_data)
+
+
+def test_parallel_feedback_loses_no_updates(mongo_db):
+    session_id = "feedback-race"
+    db_service.store_interaction("text", "hi", "hello!", session_id=session_id)
+    interaction_ids = [
+        db_service.store_interaction(
+            "text", f"list {index} things", "1. one\n2. two", session_id=session_id,
+            input_patterns={"request_type": "structured"}, response_format={"format_type": "list"}
+        )[1]
+        for index in range(FEEDBACK_SUBMISSIONS)
+    ]
+    feedback_types = ["thumbs_up", "too_long", "too_short", "format_mismatch"]
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        list(pool.map(
+            _submit_feedback,
+            interaction_ids,
+            [feedback_types[index % len(feedback_types)] for index in range(FEEDBACK_SUBMISSIONS)]
+        ))
+
+    learned = mongo_db.learned_patterns.find_one({"session_id": session_id})
+    assert learned["total_feedback_count"] == FEEDBACK_SUBMISSIONS
+    assert len(learned["feedback_history"]) == 20
+    assert mongo_db.chat_history.count_documents({"user_feedback": {"$ne": None}}) == FEEDBACK_SUBMISSIONS
+    assert mongo_db.user_feedback.count_documents({"session_id": session_id}) == FEEDBACK_SUBMISSIONS
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from scripts.bench_script_detection import baseline_detect_mixed_indian_language, make_corpus
+from utils.language import detect_language, detect_mixed_indian_language, is_plain_english
+
+
+# Questions in Latin-script languages that share short words with English
+NOT_ENGLISH = [
+    ("Was ist das Wetter in Berlin?", "de"),
+    ("Es ist so kalt in Hamburg", "de"),
+    ("Wat is het weer in Amsterdam vandaag?", "nl"),
+    ("Hoe laat is het in Tokio?", "nl"),
+]
+
+
+@pytest.mark.parametrize("text, language", NOT_ENGLISH)
+def test_english_fast_path_skips_other_languages(text, language):
+    assert not is_plain_english(text)
+    assert detect_language(text)[0] == language
+
+
+@pytest.mark.parametrize("text", [
+    "What is the weather in Berlin today?",
+    "Can you explain how photosynthesis works?",
+    "Please tell me about the history of Rome",
+])
+def test_english_fast_path_answers_plain_english(text):
+    assert is_plain_english(text)
+    assert detect_language(text) == ("en", 0.99, False)
+
+
+def test_script_detection_matches_per_script_scans():
+    rng = random.Random(5)
+    alphabet = "abc xyz" + "".join(chr(codepoint) for codepoint in range(0x0900, 0x0d80, 7))
+    texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(5000)]
+    texts += [text for texts_of_kind in make_corpus(50, 120).values() for text in texts_of_kind]
+
+    for text in texts:
+        assert detect_mixed_indian_language(text) == baseline_detect_mixed_indian_language(text), text
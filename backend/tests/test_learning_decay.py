@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+import services.db_service as db_service
+import services.learning_service as learning_service
+
+
+def _learn(session_id, request_type, count, observed_at, interaction_count):
+    counts = learning_service.count_preferences([{"request_type": request_type}] * count)
+    return db_service.increment_learned_patterns(session_id, counts, interaction_count, observed_at=observed_at)
+
+
+def test_recent_interactions_outweigh_older_ones_in_a_session(mongo_db):
+    started_at = datetime(2026, 3, 2, 9, 0)
+    _learn("decay", "paragraph", 6, started_at, 6)
+    learned = _learn("decay", "structured", 3, started_at + timedelta(hours=2), 9)
+
+    preferences = learning_service.preferences_from_counts(learned["preference_counts"])
+    assert preferences["preferred_format"] == "structured"
+
+
+def test_weights_within_minutes_stay_comparable():
+    observed_at = datetime(2026, 3, 2, 9, 0)
+    landmark = learning_service.decay_landmark(observed_at)
+    ratio = learning_service.decay_weight(observed_at + timedelta(minutes=10), landmark) / learning_service.decay_weight(observed_at, landmark)
+    assert 1.0 < ratio < 1.2
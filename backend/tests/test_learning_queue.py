@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import routes.feedback as feedback_route
+import services.db_service as db_service
+from models.schemas import FeedbackRequest
+from services.learning_queue import LearningQueue, MongoLearningJobStore
+
+
+def _interaction(interaction_id: str, user_input: str, bot_response: str):
+    return {"interaction_id": interaction_id, "input_type": "text", "user_input": user_input, "bot_response": bot_response}
+
+
+def test_feedback_on_queued_interaction_learns_and_survives_replay(mongo_db, monkeypatch):
+    release = threading.Event()
+    processed = []
+
+    def processor(session_id, interactions):
+        # The first batch holds the only worker, so later batches stay queued
+        release.wait(timeout=10)
+        processed.append((session_id, interactions))
+
+    queue = LearningQueue(workers=1, job_store=MongoLearningJobStore())
+    monkeypatch.setattr(feedback_route, "learning_queue", queue)
+
+    async def scenario():
+        await queue.start(processor)
+        await queue.enqueue("blocker", _interaction("blocker_1", "hi", "hello"))
+        await asyncio.sleep(0.05)
+        await queue.enqueue("feedback-queued", _interaction(
+            "queued_1", "Please list the steps to bake bread", "1. Mix\n2. Knead\n3. Bake"
+        ))
+
+        await feedback_route.submit_feedback(
+            FeedbackRequest(interaction_id="queued_1", session_id="feedback-queued", feedback_type="format_mismatch"),
+            SimpleNamespace(client=SimpleNamespace(host="127.0.0.1")),
+            chat_collection=mongo_db.chat_history
+        )
+
+        # A restart before the worker gets to it replays the job with the feedback
+        job = mongo_db.learning_jobs.find_one({"_id": "queued_1"})
+        assert job["interaction"]["user_feedback"]["feedback_type"] == "format_mismatch"
+
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+    analysis = mongo_db.user_feedback.find_one({"interaction_id": "queued_1"})
+    assert analysis["input_patterns"]["request_type"] == "structured"
+    assert analysis["response_format"]["format_type"] != ""
+    assert db_service.get_learned_preferences("feedback-queued")["preferred_format"] == "structured"
+    stored = dict(processed)["feedback-queued"][0]
+    assert stored["user_feedback"]["feedback_type"] == "format_mismatch"
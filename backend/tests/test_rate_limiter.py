@@ -0,0 +1,35 @@
+import os
+import uuid
+
+import pytest
+
+import services.db_service as db_service
+from utils.rate_limiter import InMemoryTokenBucketBackend, MongoTokenBucketBackend
+
+
+def test_in_memory_bucket_refills_and_evicts():
+    backend = InMemoryTokenBucketBackend(max_keys=2)
+    assert [backend.acquire("a", 2, 1.0, 0.0) for _ in range(3)] == [True, True, False]
+    assert backend.acquire("a", 2, 1.0, 1.0)
+    backend.acquire("b", 2, 1.0, 1.0)
+    backend.acquire("c", 2, 1.0, 1.0)
+    assert list(backend.buckets) == ["b", "c"]
+
+
+@pytest.mark.skipif(not os.getenv("TEST_MONGODB_URI"), reason="TEST_MONGODB_URI not set")
+def test_shared_bucket_ignores_worker_clocks(monkeypatch):
+    from pymongo import MongoClient
+
+    client = MongoClient(os.getenv("TEST_MONGODB_URI"))
+    database = client[f"test_{uuid.uuid4().hex[:12]}"]
+    monkeypatch.setattr(db_service, "db", database)
+    try:
+        backend = MongoTokenBucketBackend(time_window=60)
+        # Workers whose clocks are an hour apart share one bucket: skew must not refill it
+        skewed_clocks = [0.0, 3600.0, -3600.0, 7200.0]
+        results = [backend.acquire("client", 3, 0.001, now) for now in skewed_clocks]
+        assert results == [True, True, True, False]
+        assert database.rate_limits.find_one({"_id": "client"})["updated_at"].year >= 2024
+    finally:
+        client.drop_database(database.name)
+        client.close()
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import services.db_service as db_service
+from services.session_cache import SessionStateCache, session_cache
+
+
+START = datetime(2026, 1, 1)
+
+
+def _message(index: int, **fields):
+    return {"_id": f"m{index}", "timestamp": START + timedelta(seconds=index), "user_input": f"q{index}", **fields}
+
+
+def _ids(messages):
+    return [message["_id"] for message in messages]
+
+
+def test_fill_keeps_messages_appended_during_the_load():
+    cache = SessionStateCache(max_sessions=10, max_bytes=10 ** 6, ttl_seconds=60, ring_size=4)
+    loaded = [_message(2), _message(1)]  # newest first, as queried
+    cache.append_message("s", _message(3))  # stored while the query ran
+
+    assert _ids(cache.set_recent_messages("s", loaded)) == ["m3", "m2", "m1"]
+    assert _ids(cache.get_recent_messages("s", 4)) == ["m3", "m2", "m1"]
+
+
+def test_fill_prefers_cached_copies_and_keeps_the_newest_window():
+    cache = SessionStateCache(max_sessions=10, max_bytes=10 ** 6, ttl_seconds=60, ring_size=3)
+    cache.append_message("s", _message(4))
+    cache.update_message("s", "m4", {"user_feedback": {"feedback_type": "thumbs_up"}})
+
+    cache.set_recent_messages("s", [_message(4), _message(3), _message(2), _message(1)])
+
+    recent = cache.get_recent_messages("s", 3)
+    assert _ids(recent) == ["m4", "m3", "m2"]
+    assert recent[0]["user_feedback"] == {"feedback_type": "thumbs_up"}
+
+
+def test_message_stored_during_history_query_is_not_lost(mongo_db, monkeypatch):
+    session_id = "fill-race"
+    db_service.store_interaction("text", "first", "one", session_id=session_id)
+    session_cache.clear()
+
+    find = db_service.chat_collection.find
+    stored = []
+
+    def find_then_store(*args, **kwargs):
+        # The query's result set is fixed before another request stores a message
+        cursor = list(find(*args, **kwargs).sort("timestamp", -1).limit(20))
+        if not stored:
+            stored.append(db_service.store_interaction(
+                "text", "second", "two", session_id=session_id, timestamp=datetime.utcnow() + timedelta(seconds=1)
+            )[1])
+        return _FixedCursor(cursor)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db_service.chat_collection, "find", find_then_store, raising=False)
+        recent = db_service.get_recent_messages(session_id, limit=5)
+    assert [m["user_input"] for m in recent] == ["second", "first"]
+
+    cached = session_cache.get_recent_messages(session_id, 5)
+    assert [m["user_input"] for m in cached] == ["second", "first"]
+
+
+class _FixedCursor(list):
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
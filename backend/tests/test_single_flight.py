@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+import services.ai_service as ai_service
+from services.llm_providers import LLMProvider
+from services.single_flight import SingleFlight
+
+
+CONCURRENT_REQUESTS = 50
+
+
+class CountingProvider(LLMProvider):
+    """Counts upstream calls; calls (and stream chunks after the first) wait until the test releases them"""
+
+    name = "counting"
+
+    def __init__(self, chunks=("Photo", "synthesis ", "explained.")):
+        self.chunks = list(chunks)
+        self.calls = 0
+        self.streams_started = 0
+        self.streams_closed = 0
+        self.release = asyncio.Event()
+
+    def generate(self, contents, template=None):
+        self.calls += 1
+        return "".join(self.chunks)
+
+    async def generate_async(self, contents, template=None):
+        self.calls += 1
+        await self.release.wait()
+        return f"answer to {contents}"
+
+    async def stream(self, contents, template=None):
+        self.streams_started += 1
+        try:
+            for index, chunk in enumerate(self.chunks):
+                if index:
+                    await self.release.wait()
+                yield chunk
+        finally:
+            self.streams_closed += 1
+
+
+@pytest.fixture(autouse=True)
+def fresh_flight(monkeypatch):
+    monkeypatch.setattr(ai_service, "text_flight", SingleFlight(enabled=True))
+
+
+def test_identical_requests_reach_the_provider_once():
+    async def scenario():
+        provider = CountingProvider()
+        requests = [
+            asyncio.ensure_future(ai_service.generate_text_response_async("same prompt", provider=provider))
+            for _ in range(CONCURRENT_REQUESTS)
+        ]
+        await asyncio.sleep(0)
+        provider.release.set()
+        return provider, await asyncio.gather(*requests)
+
+    provider, responses = asyncio.run(scenario())
+    assert provider.calls == 1
+    assert responses == ["answer to same prompt"] * CONCURRENT_REQUESTS
+    assert ai_service.text_flight.get_stats()["coalesced"] == CONCURRENT_REQUESTS - 1
+
+
+def test_different_prompts_are_not_coalesced():
+    async def scenario():
+        provider = CountingProvider()
+        provider.release.set()
+        return provider, await asyncio.gather(
+            ai_service.generate_text_response_async("first", provider=provider),
+            ai_service.generate_text_response_async("second", provider=provider)
+        )
+
+    provider, responses = asyncio.run(scenario())
+    assert provider.calls == 2
+    assert responses == ["answer to first", "answer to second"]
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call():
+    async def scenario():
+        provider = CountingProvider()
+        requests = [
+            asyncio.ensure_future(ai_service.generate_text_response_async("same prompt", provider=provider))
+            for _ in range(CONCURRENT_REQUESTS)
+        ]
+        await asyncio.sleep(0)
+        requests[0].cancel()
+        await asyncio.sleep(0)
+        provider.release.set()
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        return provider, results
+
+    provider, results = asyncio.run(scenario())
+    assert provider.calls == 1
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == ["answer to same prompt"] * (CONCURRENT_REQUESTS - 1)
+    assert ai_service.text_flight.get_stats()["in_flight_calls"] == 0
+
+
+def test_identical_streams_share_one_upstream_stream():
+    async def consume(provider, stop_after=None):
+        received = []
+        stream = ai_service.stream_text_response("same prompt", provider=provider)
+        try:
+            async for chunk in stream:
+                received.append(chunk)
+                if stop_after is not None and len(received) == stop_after:
+                    break
+        finally:
+            await stream.aclose()
+        return "".join(received)
+
+    async def scenario():
+        provider = CountingProvider()
+        # One client disconnects after the first chunk; the rest read to the end
+        readers = [asyncio.ensure_future(consume(provider, stop_after=1))]
+        readers += [asyncio.ensure_future(consume(provider)) for _ in range(CONCURRENT_REQUESTS - 1)]
+        await asyncio.sleep(0)
+        provider.release.set()
+        return provider, await asyncio.gather(*readers)
+
+    provider, texts = asyncio.run(scenario())
+    assert provider.streams_started == 1
+    assert provider.streams_closed == 1
+    assert texts[0] == "Photo"
+    assert texts[1:] == ["Photosynthesis explained."] * (CONCURRENT_REQUESTS - 1)
+
+
+def test_stream_is_abandoned_when_every_subscriber_leaves():
+    async def scenario():
+        provider = CountingProvider()
+        streams = [ai_service.stream_text_response("same prompt", provider=provider) for _ in range(3)]
+        for stream in streams:
+            assert await stream.__anext__() == "Photo"
+        for stream in streams:
+            await stream.aclose()
+        # Let the cancelled upstream task unwind
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return provider
+
+    provider = asyncio.run(scenario())
+    assert provider.streams_started == 1
+    assert provider.streams_closed == 1
+    assert ai_service.text_flight.get_stats()["in_flight_streams"] == 0
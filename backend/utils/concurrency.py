@@ -0,0 +1,31 @@
+"""
+Concurrency Helpers
+Runs blocking calls (pymongo, PIL, etc.) on a bounded thread pool so that
+async route handlers never stall the event loop
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import BLOCKING_IO_MAX_WORKERS
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_IO_MAX_WORKERS,
+    thread_name_prefix="blocking-io"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking callable on the shared thread pool
+    
+    Args:
+        func: Synchronous callable to execute
+        *args: Positional arguments for the callable
+        **kwargs: Keyword arguments for the callable
+    
+    Returns:
+        Whatever the callable returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,159 @@
+"""
+Image Preprocessing
+Shrinks uploads before they are sent to Gemini vision: JPEGs are decoded
+at reduced scale with Image.draft, EXIF orientation is applied, the image
+is downscaled to IMAGE_MAX_EDGE and re-encoded without metadata at
+IMAGE_ENCODE_QUALITY. The result is handed to Gemini as an encoded blob,
+so the SDK does not re-encode the full-resolution image (as lossless
+WebP) on the event loop. A digest of the normalized pixels and a
+perceptual hash are computed along the way for the image result cache.
+
+CPU-bound: call preprocess_image through utils.concurrency.run_blocking.
+
+scripts/bench_image_preprocessing.py benchmarks it against a fake vision model.
+"""
+import hashlib
+import io
+import threading
+import time
+from typing import BinaryIO, Dict, Optional, Union
+from PIL import Image, ImageOps
+from config.settings import IMAGE_MAX_EDGE, IMAGE_ENCODE_FORMAT, IMAGE_ENCODE_QUALITY, MAX_IMAGE_PIXELS, IMAGE_CACHE_HASH_SIZE
+
+
+ENCODE_MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+class ImageTooLargeError(ValueError):
+    """The image header declares more pixels than MAX_IMAGE_PIXELS"""
+
+
+_stats_lock = threading.Lock()
+_stats = {"images": 0, "original_bytes": 0, "processed_bytes": 0, "total_seconds": 0.0}
+
+
+class PreprocessedImage:
+    """A downscaled, re-encoded image ready to send to Gemini (the decoded pixels are not kept)"""
+
+    def __init__(self, size: tuple, data: bytes, mime_type: str, original_size: tuple, original_bytes: int,
+                 perceptual_hash: int = 0, content_digest: str = ""):
+        self.size = size
+        self.perceptual_hash = perceptual_hash
+        self.content_digest = content_digest
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self.original_bytes = original_bytes
+
+    def as_blob(self) -> Dict:
+        """Inline blob accepted by generate_content in place of a PIL image"""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def difference_hash(image: Image.Image, hash_size: int = IMAGE_CACHE_HASH_SIZE) -> int:
+    """
+    Perceptual difference hash (dHash) of an image
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale grid and
+    each bit records whether a cell is brighter than its right neighbour, so
+    re-encoding, rescaling and small edits flip only a few bits.
+
+    Args:
+        image: Decoded image
+        hash_size: Grid height; the hash has hash_size ** 2 bits
+
+    Returns:
+        The hash as an integer
+    """
+    width = hash_size + 1
+    pixels = image.resize((width, hash_size), Image.Resampling.BOX).convert("L").tobytes()
+    value = 0
+    for row in range(0, len(pixels), width):
+        for column in range(row, row + hash_size):
+            value = (value << 1) | (pixels[column] > pixels[column + 1])
+    return value
+
+
+def preprocess_image(
+    image_source: Union[bytes, BinaryIO],
+    max_edge: int = IMAGE_MAX_EDGE,
+    encode_format: str = IMAGE_ENCODE_FORMAT,
+    quality: int = IMAGE_ENCODE_QUALITY,
+    original_bytes: Optional[int] = None,
+    max_pixels: int = MAX_IMAGE_PIXELS
+) -> PreprocessedImage:
+    """
+    Downscale, orient, strip and re-encode an uploaded image
+
+    Args:
+        image_source: Uploaded file contents, or a seekable binary file
+        max_edge: Longest side of the output, in pixels
+        encode_format: "WEBP" or "JPEG"
+        quality: Lossy encoder quality (1-100)
+        original_bytes: Upload size when image_source is a file
+        max_pixels: Largest width * height accepted
+
+    Returns:
+        PreprocessedImage with the encoded bytes and output size
+
+    Raises:
+        ImageTooLargeError: The header declares more than max_pixels pixels
+    """
+    started_at = time.perf_counter()
+    if isinstance(image_source, (bytes, bytearray)):
+        original_bytes = len(image_source)
+        image_source = io.BytesIO(image_source)
+    original_bytes = original_bytes or 0
+
+    # Image.open only parses the header, so bombs are rejected before decoding
+    try:
+        image = Image.open(image_source)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
+    original_size = image.size
+    if original_size[0] * original_size[1] > max_pixels:
+        raise ImageTooLargeError(f"Image is {original_size[0]}x{original_size[1]} pixels (max {max_pixels})")
+
+    if image.format == 'JPEG':
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still covers max_edge
+        image.draft('RGB', (max_edge, max_edge))
+
+    # Apply the EXIF orientation so the model sees the photo upright
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+    encode_format = encode_format if encode_format in ENCODE_MIME_TYPES else "WEBP"
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    target_mode = "RGBA" if has_alpha and encode_format == "WEBP" else "RGB"
+    if image.mode != target_mode:
+        image = image.convert(target_mode)
+
+    perceptual_hash = difference_hash(image)
+    content_digest = hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+
+    # Saving without exif/icc arguments drops the metadata
+    output = io.BytesIO()
+    image.save(output, format=encode_format, quality=quality)
+    data = output.getvalue()
+
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["original_bytes"] += original_bytes
+        _stats["processed_bytes"] += len(data)
+        _stats["total_seconds"] += time.perf_counter() - started_at
+
+    return PreprocessedImage(image.size, data, ENCODE_MIME_TYPES[encode_format], original_size, original_bytes,
+                             perceptual_hash, content_digest)
+
+
+def get_preprocessing_stats() -> Dict:
+    """Bytes saved by preprocessing and its mean cost"""
+    with _stats_lock:
+        images = _stats["images"]
+        return {
+            "images": images,
+            "original_bytes": _stats["original_bytes"],
+            "processed_bytes": _stats["processed_bytes"],
+            "bytes_saved": _stats["original_bytes"] - _stats["processed_bytes"],
+            "avg_ms": round(_stats["total_seconds"] * 1000 / images, 2) if images else 0.0
+        }
@@ -1,13 +1,26 @@
 import services.db_service as db_service
 import services.learning_service as learning_service
+from services.learning_queue import learning_queue
+from utils.concurrency import run_blocking
 from datetime import datetime
+from typing import Dict, List
 
-def store_interaction(input_type, user_input, bot_response, session_id=None, language_code=None, user_feedback=None):
+def store_interaction(input_type, user_input, bot_response, session_id=None, language_code=None, user_feedback=None, interaction_id=None, learn=True):
     """Wrapper function for db_service.store_interaction to maintain compatibility"""
+    session_id, interaction_id, input_patterns = _store_with_features(
+        input_type, user_input, bot_response, session_id, language_code, user_feedback, interaction_id
+    )
+    
+    # Learn from this interaction for future improvements
+    if learn:
+        learn_from_interactions(session_id, [input_patterns])
+    
+    return session_id, interaction_id
+
+def _store_with_features(input_type, user_input, bot_response, session_id, language_code, user_feedback, interaction_id, timestamp=None):
+    """Extract learning features, store the interaction and return its input patterns"""
     # Analyze patterns before storing using learning_service
-    input_patterns = learning_service.analyze_input_patterns(user_input)
-    response_format = learning_service.detect_response_format(bot_response)
-    interaction_context = learning_service.extract_context_features(user_input, bot_response)
+    features = learning_service.extract_interaction_features(user_input, bot_response)
     
     # Store using db_service
     session_id, interaction_id = db_service.store_interaction(
@@ -17,47 +30,109 @@ def store_interaction(input_type, user_input, bot_response, session_id=None, lan
         session_id=session_id,
         language_code=language_code,
         user_feedback=user_feedback,
-        input_patterns=input_patterns,
-        response_format=response_format,
-        interaction_context=interaction_context
+        input_patterns=features["input_patterns"],
+        response_format=features["response_format"],
+        interaction_context=features["interaction_context"],
+        interaction_id=interaction_id,
+        timestamp=timestamp
     )
+    return session_id, interaction_id, features["input_patterns"]
+
+def process_session_interactions(session_id, interactions):
+    """
+    Persist a batch of queued interactions for one session, then learn once
     
-    # Learn from this interaction for future improvements
-    chat_collection = db_service.get_chat_collection()
-    if chat_collection is not None:
-        learn_from_interaction({
-            "_id": interaction_id,
-            "session_id": session_id,
-            "user_input": user_input,
-            "bot_response": bot_response,
-            "input_patterns": input_patterns,
-            "response_format": response_format,
-            "interaction_context": interaction_context
-        })
+    Used by the background learning queue, which coalesces interactions
+    that arrive for the same session while earlier work is still pending.
+    """
+    input_patterns_list = []
+    for interaction in interactions:
+        _, _, input_patterns = _store_with_features(
+            interaction["input_type"],
+            interaction["user_input"],
+            interaction["bot_response"],
+            session_id,
+            interaction.get("language_code"),
+            interaction.get("user_feedback"),
+            interaction["interaction_id"],
+            interaction.get("timestamp")
+        )
+        input_patterns_list.append(input_patterns)
     
-    return session_id, interaction_id
+    learn_from_interactions(session_id, input_patterns_list)
+
+
+async def record_interaction(input_type, user_input, bot_response, session_id=None, language_code=None):
+    """
+    Assign IDs for an interaction and hand persistence + learning to the
+    background learning queue. Falls back to storing inline when the queue
+    is not running or is full.
+    
+    Returns:
+        tuple: (session_id, interaction_id)
+    """
+    session_id, interaction_id = db_service.assign_interaction_ids(session_id)
+    interaction = {
+        "interaction_id": interaction_id,
+        "input_type": input_type,
+        "user_input": user_input,
+        "bot_response": bot_response,
+        "language_code": language_code,
+        "timestamp": datetime.utcnow()
+    }
+    
+    if await learning_queue.enqueue(session_id, interaction):
+        return session_id, interaction_id
+    
+    return await run_blocking(
+        store_interaction, input_type, user_input, bot_response, session_id, language_code,
+        interaction_id=interaction_id
+    )
+
+
+def get_recent_messages(session_id: str, limit: int = 3) -> List[Dict]:
+    """
+    Recent messages for conversation context, newest first, including
+    interactions still waiting in the background learning queue
+    """
+    recent = db_service.get_recent_messages(session_id, limit)
+    queued = learning_queue.queued_messages(session_id)
+    if not queued:
+        return recent
+    
+    # A batch being written can already be in the session cache as well
+    stored_ids = {message.get("_id") for message in recent}
+    recent = recent + [message for message in queued if message["_id"] not in stored_ids]
+    recent.sort(key=lambda message: message["timestamp"], reverse=True)
+    return recent[:limit]
+
 
 def learn_from_interaction(interaction_data):
     """Learn patterns from successful interactions to improve future responses"""
+    learn_from_interactions(interaction_data["session_id"], [interaction_data.get("input_patterns", {})])
+
+def learn_from_interactions(session_id, input_patterns_list):
+    """
+    Fold new interactions into the session's decayed preference counters
+    and refresh the preferences derived from them
+    """
     try:
-        chat_collection = db_service.get_chat_collection()
-        if chat_collection is None:
+        if db_service.get_chat_collection() is None:
             return
         
-        # Analyze recent interactions for learning patterns using db_service
-        recent_interactions = db_service.get_recent_interactions(
-            interaction_data["session_id"],
-            limit=5
+        preference_counts = learning_service.count_preferences(input_patterns_list)
+        learned = db_service.increment_learned_patterns(
+            session_id, preference_counts, len(input_patterns_list), observed_at=datetime.utcnow()
         )
+        if learned is None:
+            return
         
         # Learn user preferences for this session
-        user_preferences = learning_service.analyze_user_preferences(recent_interactions)
-        
-        # Store learned patterns using db_service
+        user_preferences = learning_service.preferences_from_counts(learned.get("preference_counts"))
         db_service.store_learned_patterns(
-            session_id=interaction_data["session_id"],
+            session_id=session_id,
             user_preferences=user_preferences,
-            interaction_count=len(recent_interactions)
+            interaction_count=learned.get("interaction_count", 0)
         )
             
     except Exception as e:
@@ -99,27 +174,12 @@ def learn_from_feedback(interaction, feedback_data):
 def update_learned_patterns_from_feedback(session_id, interaction, feedback_data):
     """Update learned patterns based on user feedback"""
     try:
-        db = db_service.get_db()
-        if db is None:
-            return
-        
         feedback_type = feedback_data["feedback_type"]
         
-        # Get current learned patterns
-        learning_collection = db.learned_patterns
-        current_patterns = learning_collection.find_one({"session_id": session_id})
-        if not current_patterns:
-            current_patterns = {
-                "session_id": session_id,
-                "user_preferences": {},
-                "feedback_history": [],
-                "last_updated": datetime.utcnow()
-            }
-        
-        # Update patterns using db_service
+        # Update patterns using db_service (a single atomic update, no read)
         db_service.update_learned_patterns_from_feedback(
             session_id=session_id,
-            current_patterns=current_patterns,
+            preference_updates=learning_service.feedback_preference_updates(feedback_type, interaction),
             feedback_type=feedback_type,
             interaction=interaction,
             feedback_timestamp=feedback_data["feedback_timestamp"]
@@ -1,85 +1,301 @@
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional
 from langdetect import detect_langs, DetectorFactory
 from langdetect.lang_detect_exception import LangDetectException
+from config.settings import LANGUAGE_CACHE_SIZE, LANGUAGE_PRIOR_MAX_CHARS, LANGUAGE_PRIOR_MAX_CONFIDENCE, LANGUAGE_PRIOR_MIN_PROBABILITY
+from services.session_cache import session_cache
 
 # Set seed for consistent language detection
 DetectorFactory.seed = 0
 
-def detect_language(text: str) -> tuple:
+_NOT_COMPUTED = object()
+
+# Frequent English words that are not also common words in other Latin-script
+# languages (so no "was", "in", "is", "so", "an", "am", "will", ...); pure-ASCII
+# text with enough of them is answered as English without running the n-gram model
+ENGLISH_STOPWORDS = frozenset([
+    'the', 'are', 'were', 'been', 'you', 'your', 'they', 'their', 'she', 'our', 'this', 'that', 'these',
+    'those', 'what', 'which', 'who', 'how', 'why', 'when', 'where', 'does', 'did', 'could', 'would',
+    'should', 'can', 'with', 'about', 'and', 'not', 'from', 'please', 'tell', 'explain', 'write', 'have',
+    'there', 'some'
+])
+ENGLISH_WORD_PATTERN = re.compile(r"[a-z']+")
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Coarse writing-system classes used to decide whether a session's previous
+# language can break a tie for a follow-up message
+SCRIPT_CLASS_PATTERNS = {
+    'latin': re.compile('[A-Za-z\u00c0-\u024f]'),
+    'cyrillic': re.compile('[\u0400-\u04ff]'),
+    'greek': re.compile('[\u0370-\u03ff]'),
+    'arabic': re.compile('[\u0600-\u06ff\u0750-\u077f]'),
+    'hebrew': re.compile('[\u0590-\u05ff]'),
+    'thai': re.compile('[\u0e00-\u0e7f]'),
+    'cjk': re.compile('[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]'),
+}
+
+DETECTION_TIERS = ['short_text', 'english_fast_path', 'indic_script', 'cache', 'model', 'session_prior']
+
+_detection_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_detection_lock = threading.Lock()
+_tier_stats = {tier: {"count": 0, "total_seconds": 0.0} for tier in DETECTION_TIERS}
+
+
+def _record_tier(tier: str, started_at: float):
+    stats = _tier_stats[tier]
+    stats["count"] += 1
+    stats["total_seconds"] += time.perf_counter() - started_at
+
+
+def get_detection_stats() -> Dict[str, Any]:
+    """Share of detections answered by each tier and their mean latency"""
+    total = sum(stats["count"] for stats in _tier_stats.values())
+    return {
+        "total_detections": total,
+        "cache_size": len(_detection_cache),
+        "tiers": {
+            tier: {
+                "count": stats["count"],
+                "hit_rate": round(stats["count"] / total, 3) if total else 0.0,
+                "avg_ms": round(stats["total_seconds"] * 1000 / stats["count"], 3) if stats["count"] else 0.0
+            }
+            for tier, stats in _tier_stats.items()
+        }
+    }
+
+
+def is_plain_english(text: str) -> bool:
+    """ASCII text whose words are largely common English function words"""
+    if not text.isascii():
+        return False
+    words = ENGLISH_WORD_PATTERN.findall(text.lower())
+    if not words:
+        return False
+    hits = sum(1 for word in words if word in ENGLISH_STOPWORDS)
+    return hits >= 2 and hits / len(words) >= 0.25
+
+
+def get_script_class(text: str) -> Optional[str]:
+    """Dominant non-Indic writing system of the text"""
+    if text.isascii():
+        return 'latin'
+    counts = {name: len(pattern.findall(text)) for name, pattern in SCRIPT_CLASS_PATTERNS.items()}
+    script_class = max(counts, key=counts.get)
+    return script_class if counts[script_class] else None
+
+
+def detect_language(text: str, mixed_lang=_NOT_COMPUTED, session_id: Optional[str] = None) -> tuple:
     """
     Detect the language of input text with confidence, handling mixed languages.
+    
+    Cheap tiers run before the langdetect model: short text, an English
+    fast path, Indic script ranges and a bounded LRU cache. The session's
+    previous language only breaks ties: it replaces an ambiguous model
+    answer for a short follow-up in the same writing system, and only when
+    the model also considered that language likely.
+    
+    Pass mixed_lang when detect_mixed_indian_language has already run on
+    the same text to avoid scanning it twice.
     Returns tuple: (language_code, confidence, should_display)
     """
+    started_at = time.perf_counter()
     try:
         # Clean text for better detection
         cleaned_text = text.strip()
         
         # Return None for very short text to avoid inaccurate detection
         if len(cleaned_text) < 5:
+            _record_tier('short_text', started_at)
             return ('en', 0.0, False)  # Don't show detection for short text
         
+        if is_plain_english(cleaned_text):
+            result = ('en', 0.99, False)
+            if session_id:
+                # Keep the prior current so an older language cannot resurface
+                session_cache.set_language_prior(session_id, 'latin', result)
+            _record_tier('english_fast_path', started_at)
+            return result
+        
         # Check for Indian scripts first (more reliable than langdetect for mixed text)
-        indian_lang = detect_mixed_indian_language(cleaned_text)
+        indian_lang = detect_mixed_indian_language(cleaned_text) if mixed_lang is _NOT_COMPUTED else mixed_lang
         if indian_lang:
+            _record_tier('indic_script', started_at)
             return (indian_lang, 0.95, True)  # High confidence for script detection
         
-        # Get language probabilities for other languages
-        lang_probs = detect_langs(cleaned_text)
-        
-        if not lang_probs:
-            return ('en', 0.0, False)
+        normalized = WHITESPACE_PATTERN.sub(' ', cleaned_text.lower())
+        cache_key = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+        with _detection_lock:
+            cached = _detection_cache.get(cache_key)
+            if cached is not None:
+                _detection_cache.move_to_end(cache_key)
         
-        # Get the most likely language and its confidence
-        top_lang = lang_probs[0]
-        language_code = top_lang.lang
-        confidence = top_lang.prob
+        if cached is not None:
+            tier = 'cache'
+        else:
+            cached = _detect_with_model(cleaned_text)
+            with _detection_lock:
+                _detection_cache[cache_key] = cached
+                if len(_detection_cache) > LANGUAGE_CACHE_SIZE:
+                    _detection_cache.popitem(last=False)
+            tier = 'model'
+        result, probabilities = cached
         
-        # Filter out commonly mis-detected European languages for Indian English users
-        problematic_codes = ['fi', 'da', 'no', 'sv', 'et', 'lv', 'lt', 'so', 'cy', 'eu', 'mt', 'ga', 'is', 'fo', 'ca', 'pt', 'ro', 'sk', 'cs', 'hr', 'sl']
-        if language_code in problematic_codes:
-            return ('en', 0.0, False)  # Treat as English
+        script_class = get_script_class(cleaned_text) if session_id else None
+        if script_class:
+            prior = session_cache.get_language_prior(session_id)
+            if (prior and prior[0] == script_class and len(cleaned_text) <= LANGUAGE_PRIOR_MAX_CHARS
+                    and result[1] < LANGUAGE_PRIOR_MAX_CONFIDENCE and prior[1][0] != result[0]
+                    and probabilities.get(prior[1][0], 0.0) >= LANGUAGE_PRIOR_MIN_PROBABILITY):
+                result, tier = prior[1], 'session_prior'
+            session_cache.set_language_prior(session_id, script_class, result)
         
-        # Only show language detection if confidence is high enough
-        should_display = confidence > 0.85 and language_code != 'en'
-        
-        return (language_code, confidence, should_display)
+        _record_tier(tier, started_at)
+        return result
         
     except (LangDetectException, Exception) as e:
         print(f"Language detection error: {e}")
         return ('en', 0.0, False)  # Default to English, don't display
 
 
-def detect_mixed_indian_language(text: str) -> str:
-    """Detect mixed Indian languages with English"""
-    # Check for Telugu script
-    if any('\u0c00' <= char <= '\u0c7f' for char in text):
-        return 'te'  # Telugu
+def detect_languages_batch(texts: List[str], executor: Optional[Executor] = None, chunksize: int = 64) -> List[tuple]:
+    """
+    Detect the language of many texts, e.g. for backfills and analytics
+    
+    Args:
+        texts: Texts to classify
+        executor: Optional executor (typically a ProcessPoolExecutor) to
+            spread langdetect across CPU cores; runs inline when omitted
+        chunksize: Texts handed to each worker per task
+    
+    Returns:
+        List of (language_code, confidence, should_display), one per text
+    """
+    if executor is None:
+        return [detect_language(text) for text in texts]
+    return list(executor.map(detect_language, texts, chunksize=chunksize))
+
+
+def _detect_with_model(cleaned_text: str) -> tuple:
+    """
+    Run the langdetect n-gram model and apply our display rules
+    
+    Returns:
+        tuple: ((language_code, confidence, should_display), {language_code: probability})
+    """
+    # Get language probabilities for other languages
+    lang_probs = detect_langs(cleaned_text)
+    
+    if not lang_probs:
+        return ('en', 0.0, False), {}
+    probabilities = {candidate.lang: candidate.prob for candidate in lang_probs}
     
-    # Check for Hindi/Devanagari script
-    if any('\u0900' <= char <= '\u097f' for char in text):
-        return 'hi'  # Hindi
+    # Get the most likely language and its confidence
+    top_lang = lang_probs[0]
+    language_code = top_lang.lang
+    confidence = top_lang.prob
     
-    # Check for Bengali script
-    if any('\u0980' <= char <= '\u09ff' for char in text):
-        return 'bn'  # Bengali
+    # Filter out commonly mis-detected European languages for Indian English users
+    problematic_codes = ['fi', 'da', 'no', 'sv', 'et', 'lv', 'lt', 'so', 'cy', 'eu', 'mt', 'ga', 'is', 'fo', 'ca', 'pt', 'ro', 'sk', 'cs', 'hr', 'sl']
+    if language_code in problematic_codes:
+        return ('en', 0.0, False), probabilities  # Treat as English
     
-    # Check for Tamil script
-    if any('\u0b80' <= char <= '\u0bff' for char in text):
-        return 'ta'  # Tamil
+    # Only show language detection if confidence is high enough
+    should_display = confidence > 0.85 and language_code != 'en'
     
-    # Check for Gujarati script
-    if any('\u0a80' <= char <= '\u0aff' for char in text):
-        return 'gu'  # Gujarati
+    return (language_code, confidence, should_display), probabilities
+
+
+# Indic Unicode blocks are 128 code points each, starting at U+0900, so a
+# character's block is (ord(char) - 0x0900) >> 7.
+INDIC_BLOCK_START = 0x0900
+INDIC_BLOCK_SCRIPTS = {
+    0: 'hi',  # Devanagari  U+0900-U+097F
+    1: 'bn',  # Bengali     U+0980-U+09FF
+    2: 'pa',  # Gurmukhi    U+0A00-U+0A7F
+    3: 'gu',  # Gujarati    U+0A80-U+0AFF
+    5: 'ta',  # Tamil       U+0B80-U+0BFF
+    6: 'te',  # Telugu      U+0C00-U+0C7F
+    7: 'kn',  # Kannada     U+0C80-U+0CFF
+    8: 'ml',  # Malayalam   U+0D00-U+0D7F
+}
+
+# When several scripts appear, the first one in this order is reported
+INDIC_SCRIPT_PRIORITY = ['te', 'hi', 'bn', 'ta', 'gu', 'kn', 'ml', 'pa']
+
+INDIC_CHARS_PATTERN = re.compile('[\u0900-\u0d7f]+')
+
+# Character class range of each script's block
+_INDIC_BLOCK_RANGES = {
+    lang_code: '%s-%s' % (chr(INDIC_BLOCK_START + (block << 7)), chr(INDIC_BLOCK_START + (block << 7) + 127))
+    for block, lang_code in INDIC_BLOCK_SCRIPTS.items()
+}
+INDIC_SCRIPTS_PATTERN = re.compile('[%s]' % ''.join(_INDIC_BLOCK_RANGES.values()))
+# Per script: a pattern matching any script that takes priority over it
+INDIC_HIGHER_PRIORITY_PATTERNS = {
+    lang_code: re.compile('[%s]' % ''.join(_INDIC_BLOCK_RANGES[higher] for higher in INDIC_SCRIPT_PRIORITY[:rank]))
+    for rank, lang_code in enumerate(INDIC_SCRIPT_PRIORITY) if rank
+}
+
+
+def count_indic_scripts(text: str) -> Dict[str, int]:
+    """
+    Count characters per Indic script in a single pass over the text.
+    Non-Indic text is skipped by one regex scan, so cost is dominated by
+    the Indic characters actually present.
     
-    # Check for Kannada script
-    if any('\u0c80' <= char <= '\u0cff' for char in text):
-        return 'kn'  # Kannada
+    Returns:
+        Dictionary of language code to character count (scripts present only)
+    """
+    indic_runs = INDIC_CHARS_PATTERN.findall(text)
+    if not indic_runs:
+        return {}
     
-    # Check for Malayalam script
-    if any('\u0d00' <= char <= '\u0d7f' for char in text):
-        return 'ml'  # Malayalam
+    counts = {}
+    for codepoint, count in Counter(map(ord, ''.join(indic_runs))).items():
+        lang_code = INDIC_BLOCK_SCRIPTS.get((codepoint - INDIC_BLOCK_START) >> 7)
+        if lang_code:
+            counts[lang_code] = counts.get(lang_code, 0) + count
+    return counts
+
+
+def get_script_mix(text: str) -> Dict[str, Any]:
+    """
+    Describe how much of the text is written in Indic scripts
     
-    # Check for Punjabi script
-    if any('\u0a00' <= char <= '\u0a7f' for char in text):
-        return 'pa'  # Punjabi
+    Returns:
+        Dictionary with per-script counts, the dominant script and the
+        ratio of Indic characters to all letters
+    """
+    counts = count_indic_scripts(text)
+    indic_total = sum(counts.values())
+    letters = sum(1 for char in text if char.isalpha()) if indic_total else 0
+    return {
+        "script_counts": counts,
+        "dominant_script": max(counts, key=counts.get) if counts else None,
+        "mixing_ratio": round(indic_total / letters, 3) if letters else 0.0
+    }
+
+
+def detect_mixed_indian_language(text: str) -> str:
+    """
+    Detect mixed Indian languages with English
     
-    return None
+    ASCII text is rejected without a scan. Otherwise the first Indic
+    character gives a candidate script, and each further scan only looks
+    for scripts that take priority over the current candidate, so a
+    single-script message is usually scanned once or twice.
+    """
+    if text.isascii():
+        return None
+    lang_code = None
+    match = INDIC_SCRIPTS_PATTERN.search(text)
+    while match:
+        lang_code = INDIC_BLOCK_SCRIPTS[(ord(match.group()) - INDIC_BLOCK_START) >> 7]
+        higher = INDIC_HIGHER_PRIORITY_PATTERNS.get(lang_code)
+        match = higher.search(text, match.end()) if higher else None
+    return lang_code
@@ -1,33 +1,114 @@
-from datetime import datetime, timedelta
-from collections import defaultdict
+import time
+from collections import OrderedDict
 from fastapi import HTTPException
-from config.settings import RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_TIME_WINDOW
+from pymongo import ReturnDocument
+from config.settings import RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_TIME_WINDOW, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_BACKEND
+from utils.concurrency import run_blocking
+import services.db_service as db_service
+
+
+class InMemoryTokenBucketBackend:
+    """
+    Token buckets for the current process. Each key holds two floats
+    (tokens, last_refill) and keys are evicted least-recently-used first
+    once max_keys is reached, so memory stays bounded.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    def acquire(self, key: str, capacity: float, refill_rate: float, now: float) -> bool:
+        tokens, last_refill = self.buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - last_refill) * refill_rate)
+
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return allowed
+
+
+class MongoTokenBucketBackend:
+    """
+    Token buckets shared by every worker, stored in the `rate_limits`
+    collection. Refill and take happen in one atomic pipeline update;
+    idle buckets expire through a TTL index on expires_at.
+    """
+
+    def __init__(self, time_window: int):
+        self.time_window = time_window
+
+    def acquire(self, key: str, capacity: float, refill_rate: float, now: float = None) -> bool:
+        """
+        Take a token from the shared bucket
+
+        Refills are computed from the server clock ($$NOW), not `now`, so
+        clock skew between workers sharing a bucket cannot add or withhold
+        tokens.
+        """
+        db = db_service.get_db()
+        if db is None:
+            raise RuntimeError("MongoDB unavailable for rate limiting")
+
+        # A bucket written before updated_at became a server date gets no refill this once
+        last_refill = {"$cond": [{"$eq": [{"$type": "$updated_at"}, "date"]}, "$updated_at", "$$NOW"]}
+        elapsed_seconds = {"$divide": [{"$subtract": ["$$NOW", last_refill]}, 1000]}
+        refilled = {"$min": [
+            capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", capacity]},
+                {"$multiply": [{"$max": [elapsed_seconds, 0]}, refill_rate]}
+            ]}
+        ]}
+        bucket = db.rate_limits.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": "$$NOW"}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": {"$add": ["$$NOW", self.time_window * 2 * 1000]}
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"allowed": 1}
+        )
+        return bool(bucket and bucket.get("allowed"))
+
 
 class RateLimiter:
-    def __init__(self, max_requests: int = 30, time_window: int = 60):
+    def __init__(self, max_requests: int = 30, time_window: int = 60, backend=None, max_keys: int = 100000):
         self.max_requests = max_requests
         self.time_window = time_window
-        self.requests = defaultdict(list)
-    
+        self.refill_rate = max_requests / time_window  # tokens per second
+        self.local_backend = InMemoryTokenBucketBackend(max_keys=max_keys)
+        self.backend = backend or self.local_backend
+
     async def check_rate_limit(self, client_ip: str):
         try:
-            now = datetime.now()
-            
-            # Clean old requests
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if now - req_time < timedelta(seconds=self.time_window)
-            ]
-            
+            now = time.time()
+
+            if self.backend is self.local_backend:
+                allowed = self.local_backend.acquire(client_ip, self.max_requests, self.refill_rate, now)
+            else:
+                try:
+                    allowed = await run_blocking(self.backend.acquire, client_ip, self.max_requests, self.refill_rate, now)
+                except Exception as e:
+                    # Shared backend unavailable: enforce the per-worker limit instead
+                    print(f"Shared rate limiter unavailable, using local limits: {e}")
+                    allowed = self.local_backend.acquire(client_ip, self.max_requests, self.refill_rate, now)
+
             # Check rate limit
-            if len(self.requests[client_ip]) >= self.max_requests:
+            if not allowed:
                 raise HTTPException(
-                    status_code=429, 
+                    status_code=429,
                     detail="Rate limit exceeded. Please try again later."
                 )
-            
-            # Add current request
-            self.requests[client_ip].append(now)
         except HTTPException:
             # Re-raise HTTPException as it's an expected flow for rate limiting
             raise
@@ -40,5 +121,9 @@ class RateLimiter:
             )
 
 # Global rate limiter instance
-rate_limiter = RateLimiter(max_requests=RATE_LIMIT_MAX_REQUESTS, time_window=RATE_LIMIT_TIME_WINDOW)
-
+rate_limiter = RateLimiter(
+    max_requests=RATE_LIMIT_MAX_REQUESTS,
+    time_window=RATE_LIMIT_TIME_WINDOW,
+    backend=MongoTokenBucketBackend(RATE_LIMIT_TIME_WINDOW) if RATE_LIMIT_BACKEND == 'mongo' else None,
+    max_keys=RATE_LIMIT_MAX_KEYS
+)
@@ -0,0 +1,210 @@
+"""
+Upload Ingest
+Validates and decodes /image-chat uploads without holding them in memory.
+
+Starlette's multipart parser spools each uploaded file to a
+SpooledTemporaryFile (in memory up to 1MB, on disk beyond). On top of that:
+
+- UploadSizeLimitMiddleware rejects an oversized request body while it is
+  still being received, instead of after the whole body has been spooled
+- validate_image_upload checks the real file type from its magic bytes
+  rather than trusting the client's Content-Type
+- decode_image_upload decodes straight from the spool (memory-mapped once
+  it is on disk) instead of reading the upload into a bytes object first,
+  rejects images whose header declares more than MAX_IMAGE_PIXELS pixels,
+  and lets at most IMAGE_DECODE_CONCURRENCY full-resolution decodes run at
+  once, since those buffers dominate peak memory under concurrent uploads
+
+scripts/bench_uploads.py compares peak memory of this path with reading
+uploads into bytes.
+"""
+import asyncio
+import io
+import json
+import mmap
+import os
+from typing import BinaryIO, Iterable, Optional
+from fastapi import HTTPException, UploadFile
+from PIL import UnidentifiedImageError
+from config.settings import MAX_FILE_SIZE, ALLOWED_IMAGE_TYPES, IMAGE_DECODE_CONCURRENCY
+from utils.concurrency import run_blocking
+from utils.image_processing import PreprocessedImage, ImageTooLargeError, preprocess_image
+
+
+SNIFF_BYTES = 16
+# Multipart boundaries and the text fields sent alongside the file
+FORM_OVERHEAD_BYTES = 64 * 1024
+# Starlette's in-memory spool limit for uploaded files (larger ones are on disk)
+SPOOL_MAX_SIZE = 1024 * 1024
+
+_decode_slots = asyncio.Semaphore(max(1, IMAGE_DECODE_CONCURRENCY))
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Detect an image type from the first bytes of a file
+
+    Args:
+        head: At least the first 12 bytes of the file
+
+    Returns:
+        MIME type, or None if the signature is not a supported image
+    """
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+async def validate_image_upload(upload: UploadFile, max_bytes: int = MAX_FILE_SIZE) -> str:
+    """
+    Check an uploaded image's size and real type without reading all of it
+
+    Args:
+        upload: Uploaded file
+        max_bytes: Largest accepted file size
+
+    Returns:
+        MIME type detected from the file's signature
+    """
+    size = upload.size if upload.size is not None else await run_blocking(_file_size, upload.file)
+    if size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File too large. Max size: {max_bytes // (1024 * 1024)}MB")
+
+    head = await upload.read(SNIFF_BYTES)
+    await upload.seek(0)
+    mime_type = sniff_image_type(head)
+    if mime_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=415, detail="Unsupported file type. Use JPEG, PNG, GIF, or WebP")
+    return mime_type
+
+
+async def decode_image_upload(upload: UploadFile) -> PreprocessedImage:
+    """
+    Preprocess a validated upload off the event loop
+
+    Waiting uploads queue here rather than on the shared thread pool, so
+    they do not hold threads needed by database calls.
+
+    Args:
+        upload: Uploaded file that passed validate_image_upload
+
+    Returns:
+        PreprocessedImage ready to send to Gemini
+    """
+    async with _decode_slots:
+        return await run_blocking(preprocess_upload, upload.file, upload.size)
+
+
+def preprocess_upload(file: BinaryIO, size: Optional[int] = None) -> PreprocessedImage:
+    """
+    Preprocess an uploaded image directly from its spooled file
+
+    CPU-bound: use decode_image_upload from async code.
+
+    Args:
+        file: The upload's file object (UploadFile.file)
+        size: Upload size in bytes, for stats
+
+    Returns:
+        PreprocessedImage ready to send to Gemini
+    """
+    mapped = _map_file(file, size)
+    try:
+        if mapped is None:
+            file.seek(0)
+        return preprocess_image(mapped if mapped is not None else file, original_bytes=size)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=415, detail="Image could not be decoded")
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+
+def _map_file(file: BinaryIO, size: Optional[int] = None) -> Optional[mmap.mmap]:
+    """Read-only mmap of file once it lives on disk, else None"""
+    if size is None:
+        size = _file_size(file)
+    if size <= SPOOL_MAX_SIZE:
+        # Small enough to still be spooled in memory, where fileno() would
+        # roll it over to disk: read it in place instead
+        return None
+    try:
+        file.flush()
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def _file_size(file: BinaryIO) -> int:
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END)
+    file.seek(position)
+    return size
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that caps request bodies on the given paths
+
+    Requests announcing a larger Content-Length are rejected before their
+    body is read; chunked bodies are counted as they arrive and cut off as
+    soon as they pass the limit.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing as-is
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Request body too large"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
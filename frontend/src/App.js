@@ -32,7 +32,13 @@ function App() {
     handleImageUpload,
     deleteSession,
     deleteAllChatHistory,
-    selectSession
+    selectSession,
+    hasMoreSessions,
+    isLoadingSessions,
+    loadMoreSessions,
+    hasOlderMessages,
+    isLoadingOlder,
+    loadOlderMessages
   } = useChat();
 
   const {
@@ -257,6 +263,9 @@ function App() {
         }}
         onDeleteSession={deleteSession}
         onDeleteAll={deleteAllChatHistory}
+        hasMoreSessions={hasMoreSessions}
+        isLoadingSessions={isLoadingSessions}
+        onLoadMoreSessions={loadMoreSessions}
         onNewChat={() => {
           startNewChat();
           setMobileMenuOpen(false); // Close menu on mobile
@@ -280,6 +289,9 @@ function App() {
           onImageUpload={() => fileInputRef.current?.click()}
           messagesEndRef={messagesEndRef}
           fileInputRef={fileInputRef}
+          hasOlderMessages={hasOlderMessages}
+          isLoadingOlder={isLoadingOlder}
+          onLoadOlder={loadOlderMessages}
         />
 
         <ChatInput
@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useLayoutEffect, useRef } from 'react';
 import ChatMessage from './ChatMessage';
 
 function ChatWindow({
@@ -11,10 +11,48 @@ function ChatWindow({
   onImageUpload,
   messagesEndRef,
   fileInputRef,
+  hasOlderMessages,
+  isLoadingOlder,
+  onLoadOlder,
 }) {
+  const containerRef = useRef(null);
+  const scrollAnchorRef = useRef(null);
+
+  const loadOlder = () => {
+    const container = containerRef.current;
+    if (!container || !hasOlderMessages || isLoadingOlder) return;
+    // Remember the position so the prepended page does not shift the view
+    scrollAnchorRef.current = {
+      firstId: messages[0]?.id,
+      scrollTop: container.scrollTop,
+      scrollHeight: container.scrollHeight,
+    };
+    onLoadOlder();
+  };
+
+  useLayoutEffect(() => {
+    const anchor = scrollAnchorRef.current;
+    const container = containerRef.current;
+    if (!anchor || !container) return;
+    if (messages[0]?.id !== anchor.firstId) {
+      container.scrollTop = anchor.scrollTop + (container.scrollHeight - anchor.scrollHeight);
+      scrollAnchorRef.current = null;
+    } else if (!isLoadingOlder) {
+      scrollAnchorRef.current = null;
+    }
+  }, [messages, isLoadingOlder]);
+
+  const lastScrollTopRef = useRef(0);
+  const handleScroll = (e) => {
+    // Only when the user scrolls up, not while auto-scrolling down to the latest message
+    const { scrollTop } = e.currentTarget;
+    if (scrollTop < lastScrollTopRef.current && scrollTop < 80) loadOlder();
+    lastScrollTopRef.current = scrollTop;
+  };
+
   return (
     <div className="chat-window">
-      <div className="messages-container">
+      <div className="messages-container" ref={containerRef} onScroll={handleScroll}>
         {/* Welcome Screen */}
         {!selectedSession && messages.length === 0 && (
           <div style={{
@@ -107,6 +145,26 @@ function ChatWindow({
 
         {/* Chat Messages */}
         <div style={{ width: "100%", maxWidth: "800px", margin: "0 auto" }}>
+          {hasOlderMessages && (
+            <div style={{ display: "flex", justifyContent: "center", margin: "8px 0 16px" }}>
+              <button
+                onClick={loadOlder}
+                disabled={isLoadingOlder}
+                style={{
+                  padding: "6px 16px",
+                  background: "transparent",
+                  border: "1px solid var(--glass-border)",
+                  borderRadius: "var(--radius-sm)",
+                  color: "var(--text-muted)",
+                  fontSize: "0.8rem",
+                  cursor: isLoadingOlder ? "default" : "pointer",
+                  transition: "var(--transition)"
+                }}
+              >
+                {isLoadingOlder ? "Loading..." : "Load older messages"}
+              </button>
+            </div>
+          )}
           {messages.map((msg, index) => (
             <ChatMessage
               key={msg.id || index}
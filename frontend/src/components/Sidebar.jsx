@@ -10,7 +10,17 @@ function Sidebar({
   onDeleteSession,
   onDeleteAll,
   onNewChat,
+  hasMoreSessions,
+  isLoadingSessions,
+  onLoadMoreSessions,
 }) {
+  const handleScroll = (e) => {
+    const { scrollTop, scrollHeight, clientHeight } = e.currentTarget;
+    if (hasMoreSessions && !isLoadingSessions && scrollHeight - scrollTop - clientHeight < 80) {
+      onLoadMoreSessions();
+    }
+  };
+
   return (
     <div className={`sidebar ${collapsed ? 'collapsed' : 'expanded'} ${mobileOpen ? 'mobile-open' : ''}`}>
       <div className="sidebar-header">
@@ -50,7 +60,7 @@ function Sidebar({
         </button>
       </div>
 
-      <div className="sidebar-content" style={{ flex: 1, overflowY: "auto", padding: "0 16px" }}>
+      <div className="sidebar-content" style={{ flex: 1, overflowY: "auto", padding: "0 16px" }} onScroll={handleScroll}>
         {!collapsed && (
           <div style={{ 
             fontSize: "0.75rem", 
@@ -97,6 +107,25 @@ function Sidebar({
             )}
           </div>
         ))}
+
+        {hasMoreSessions && !collapsed && (
+          <button
+            onClick={onLoadMoreSessions}
+            disabled={isLoadingSessions}
+            style={{
+              width: "100%",
+              padding: "8px",
+              margin: "4px 0 12px",
+              background: "transparent",
+              border: "none",
+              color: "var(--text-dim)",
+              fontSize: "0.8rem",
+              cursor: isLoadingSessions ? "default" : "pointer"
+            }}
+          >
+            {isLoadingSessions ? "Loading..." : "Load more"}
+          </button>
+        )}
       </div>
 
       {sessions.length > 0 && !collapsed && (
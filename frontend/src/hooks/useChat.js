@@ -3,6 +3,7 @@ import {
   sendChatMessage, 
   sendImageMessage, 
   fetchChatHistory, 
+  fetchSessionMessages, 
   deleteSessionById, 
   deleteAllHistory 
 } from '../services/api';
@@ -16,12 +17,25 @@ export const useChat = () => {
   const [currentInput, setCurrentInput] = useState("");
   const [selectedImage, setSelectedImage] = useState(null);
   const [processingMessages, setProcessingMessages] = useState(new Set());
+  const [sessionsCursor, setSessionsCursor] = useState(null);
+  const [isLoadingSessions, setIsLoadingSessions] = useState(false);
+  const [olderMessagesBefore, setOlderMessagesBefore] = useState(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
 
   const activeRequestsRef = useRef(new Map());
   const messagesEndRef = useRef(null);
+  // Bumped on every session switch, so responses for a previous session are dropped
+  const selectionRef = useRef(0);
+  const loadingOlderRef = useRef(false);
+  const loadingSessionsRef = useRef(false);
+  const skipAutoScrollRef = useRef(false);
 
-  // Auto-scroll to bottom of chat
+  // Auto-scroll to bottom of chat (but not when older messages are prepended)
   useEffect(() => {
+    if (skipAutoScrollRef.current) {
+      skipAutoScrollRef.current = false;
+      return;
+    }
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
@@ -32,13 +46,33 @@ export const useChat = () => {
 
   const refreshChatSessions = async () => {
     try {
-      const sessions = await fetchChatHistory();
+      const { sessions, nextCursor } = await fetchChatHistory();
       setChatSessions(sessions);
+      setSessionsCursor(nextCursor);
     } catch (error) {
       console.error("Error fetching chat history:", error);
     }
   };
 
+  const loadMoreSessions = async () => {
+    if (!sessionsCursor || loadingSessionsRef.current) return;
+    loadingSessionsRef.current = true;
+    setIsLoadingSessions(true);
+    try {
+      const { sessions, nextCursor } = await fetchChatHistory(sessionsCursor);
+      setChatSessions((prev) => {
+        const known = new Set(prev.map((session) => session.session_id));
+        return [...prev, ...sessions.filter((session) => !known.has(session.session_id))];
+      });
+      setSessionsCursor(nextCursor);
+    } catch (error) {
+      console.error("Error fetching more chat history:", error);
+    } finally {
+      loadingSessionsRef.current = false;
+      setIsLoadingSessions(false);
+    }
+  };
+
   const cancelActiveRequests = () => {
     activeRequestsRef.current.forEach((controller) => controller.abort());
     activeRequestsRef.current.clear();
@@ -48,6 +82,8 @@ export const useChat = () => {
 
   const startNewChat = () => {
     cancelActiveRequests();
+    selectionRef.current += 1;
+    setOlderMessagesBefore(null);
     setMessages([]);
     setSelectedSession(null);
     setCurrentSessionId(null);
@@ -229,32 +265,70 @@ export const useChat = () => {
     e.target.value = ""; // Reset input
   };
 
-  const selectSession = (session) => {
+  // Convert stored session messages to display format
+  const toDisplayMessages = (sessionMessages) => {
+    const displayMessages = [];
+    sessionMessages.forEach((msg) => {
+      const key = msg._id || `${msg.session_id}_${msg.timestamp}`;
+      // Add user message
+      displayMessages.push({
+        id: `${key}-user`,
+        text: msg.user_input,
+        sender: "user",
+      });
+      // Add AI response
+      displayMessages.push({
+        id: `${key}-ai`,
+        text: msg.bot_response,
+        sender: "ai",
+        detectedLanguage: msg.language_code,
+        languageName: msg.language_name,
+        sessionId: msg.session_id,
+        interactionId: key,
+      });
+    });
+    return displayMessages;
+  };
+
+  const selectSession = async (session) => {
     cancelActiveRequests();
+    const selection = ++selectionRef.current;
     setSelectedSession(session);
     setCurrentSessionId(session.session_id);
+    setOlderMessagesBefore(null);
 
-    // Convert session messages to display format
-    const displayMessages = [];
-    session.messages.forEach((msg, index) => {
-        // Add user message
-        displayMessages.push({
-            id: msg.id * 2 - 1,
-            text: msg.user_input,
-            sender: "user",
-        });
-        // Add AI response
-        displayMessages.push({
-            id: msg.id * 2,
-            text: msg.bot_response,
-            sender: "ai",
-            detectedLanguage: msg.language_code,
-            languageName: msg.language_name,
-            sessionId: msg.session_id,
-            interactionId: msg._id || `${msg.session_id}_${msg.id * 2}`,
-        });
-    });
-    setMessages(displayMessages);
+    let page = { messages: [], nextBefore: null };
+    try {
+      page = await fetchSessionMessages(session.session_id);
+    } catch (error) {
+      console.error("Error fetching session messages:", error);
+    }
+
+    // The user picked another session while this one was loading
+    if (selection !== selectionRef.current) return;
+
+    setMessages(toDisplayMessages(page.messages));
+    setOlderMessagesBefore(page.nextBefore);
+  };
+
+  const loadOlderMessages = async () => {
+    if (!olderMessagesBefore || !currentSessionId || loadingOlderRef.current) return;
+    const selection = selectionRef.current;
+    loadingOlderRef.current = true;
+    setIsLoadingOlder(true);
+    try {
+      const page = await fetchSessionMessages(currentSessionId, olderMessagesBefore);
+      if (selection !== selectionRef.current) return;
+
+      skipAutoScrollRef.current = true;
+      setMessages((prev) => [...toDisplayMessages(page.messages), ...prev]);
+      setOlderMessagesBefore(page.nextBefore);
+    } catch (error) {
+      console.error("Error fetching older messages:", error);
+    } finally {
+      loadingOlderRef.current = false;
+      setIsLoadingOlder(false);
+    }
   };
 
   return {
@@ -278,6 +352,12 @@ export const useChat = () => {
     handleImageUpload,
     deleteSession,
     deleteAllChatHistory,
-    selectSession
+    selectSession,
+    hasMoreSessions: Boolean(sessionsCursor),
+    isLoadingSessions,
+    loadMoreSessions,
+    hasOlderMessages: Boolean(olderMessagesBefore),
+    isLoadingOlder,
+    loadOlderMessages
   };
 };
@@ -90,10 +90,18 @@ export const transcribeAudio = async (audioBlob) => {
 };
 
 // History API
-export const fetchChatHistory = async () => {
-  const response = await fetch(`${API_BASE_URL}/chat-history`);
+export const fetchChatHistory = async (cursor = null) => {
+  const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+  const response = await fetch(`${API_BASE_URL}/sessions${params}`);
   const data = await response.json();
-  return data.sessions || [];
+  return { sessions: data.sessions || [], nextCursor: data.next_cursor || null };
+};
+
+export const fetchSessionMessages = async (sessionId, before = null) => {
+  const params = before ? `?before=${encodeURIComponent(before)}` : "";
+  const response = await fetch(`${API_BASE_URL}/session/${sessionId}/messages${params}`);
+  const data = await response.json();
+  return { messages: data.messages || [], nextBefore: data.next_before || null };
 };
 
 export const deleteSessionById = async (sessionId) => {